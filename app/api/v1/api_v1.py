@@ -3,15 +3,23 @@ from fastapi import APIRouter
 from app.api.v1.endpoints import (
     audios,
     defaults,
+    jobs,
+    media,
+    movie_uploads,
     movies,
     music,
     reel_texts,
     reels,
+    storage,
     translations,
     users,
 )
 
 api_router = APIRouter()
+# Registered before movies so /movies/uploads is not taken for a movie id.
+api_router.include_router(
+    movie_uploads.router, prefix="/movies/uploads", tags=["movies"]
+)
 api_router.include_router(movies.router, prefix="/movies", tags=["movies"])
 api_router.include_router(audios.router, prefix="/audios", tags=["audios"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
@@ -26,3 +34,6 @@ api_router.include_router(
     translations.router, prefix="/translations", tags=["translations"]
 )
 api_router.include_router(music.router, prefix="/music", tags=["music"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+api_router.include_router(storage.router, prefix="/storage", tags=["storage"])
+api_router.include_router(media.router, prefix="/media", tags=["media"])
@@ -0,0 +1,86 @@
+import os
+import tempfile
+from collections.abc import Callable
+
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+from python_multipart.multipart import parse_options_header
+from starlette.datastructures import FormData
+from starlette.formparsers import MultiPartException, MultiPartParser
+from starlette.types import Message, Receive
+
+# Room for the multipart boundaries, headers and form fields that come with
+# the uploaded file.
+FORM_OVERHEAD = 64 * 1024
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Request body exceeds {max_bytes} bytes.",
+    )
+
+
+def _limited_receive(receive: Receive, max_bytes: int) -> Receive:
+    received = 0
+
+    async def limited() -> Message:
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise _too_large(max_bytes)
+        return message
+
+    return limited
+
+
+class _NamedFileParser(MultiPartParser):
+    # Files go to a named temporary file rather than a memory spool that
+    # rolls over into an anonymous one, so services can read the upload by
+    # its path instead of copying it to disk a second time.
+    def on_headers_finished(self):
+        super().on_headers_finished()
+        upload = self._current_part.file
+        if upload is None:
+            return
+        upload.file.close()
+        upload.file = tempfile.NamedTemporaryFile(
+            prefix="upload_", suffix=os.path.splitext(upload.filename)[1]
+        )
+        self._files_to_close_on_error[-1] = upload.file
+
+
+class _UploadRequest(Request):
+    async def _get_form(self, **kwargs) -> FormData:
+        content_type, _ = parse_options_header(self.headers.get("Content-Type"))
+        if self._form is None and content_type == b"multipart/form-data":
+            parser = _NamedFileParser(self.headers, self.stream(), **kwargs)
+            try:
+                self._form = await parser.parse()
+            except MultiPartException as exc:
+                raise HTTPException(status_code=400, detail=exc.message)
+        return await super()._get_form(**kwargs)
+
+
+def body_limit_route(max_bytes: Callable[[], int]) -> type[APIRoute]:
+    # Rejects oversized uploads while they stream in, before the multipart
+    # parser has spooled the whole body to disk.
+    class BodyLimitRoute(APIRoute):
+        def get_route_handler(self) -> Callable:
+            handler = super().get_route_handler()
+
+            async def limited_handler(request: Request) -> Response:
+                limit = max_bytes() + FORM_OVERHEAD
+                content_length = request.headers.get("content-length", "")
+                if content_length.isdigit() and int(content_length) > limit:
+                    raise _too_large(limit)
+                request = _UploadRequest(
+                    request.scope, _limited_receive(request.receive, limit)
+                )
+                return await handler(request)
+
+            return limited_handler
+
+    return BodyLimitRoute
@@ -1,17 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlmodel import Session
 
 import app.services.auth as auth_services
 from app.core.storage.backends import (
-    SupabaseStorageBackend,
-    get_supabase_storage,
+    StorageBackend,
+    get_storage,
 )
 from app.db.models.user import User
 from app.db.session import get_session
-from app.models.transcription.transcription_model import TranscriptionModel
+from app.models.jobs.job_kind import JobKind
 from app.schemas.audio import AudioCreate, AudioRead, AudioTranscriptionCreate
+from app.schemas.job import JobRead
 from app.schemas.srt import SrtBase
-from app.services import audio as crud_audio
+from app.services import audio as crud_audio, jobs as services_jobs
 
 router = APIRouter()
 
@@ -41,11 +42,11 @@ def read_audio(
 @router.delete("/{audio_id}/admin", status_code=204)
 def delete_audio(
     audio_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_session),
-    storage: SupabaseStorageBackend = Depends(get_supabase_storage),
     _: User = Depends(auth_services.require_admin),
 ):
-    success = crud_audio.delete_audio(db, storage, audio_id)
+    success = crud_audio.delete_audio(db, audio_id, background_tasks)
     if not success:
         raise HTTPException(status_code=404, detail="Audio not found")
     return None
@@ -55,7 +56,7 @@ def delete_audio(
 def create_audio(
     audio_info: AudioCreate,
     db: Session = Depends(get_session),
-    storage: SupabaseStorageBackend = Depends(get_supabase_storage),
+    storage: StorageBackend = Depends(get_storage),
     current_user: User = Depends(auth_services.get_current_user),
 ):
     if audio_info.text is None or audio_info.text.strip() == "":
@@ -68,11 +69,31 @@ def create_audio(
     return audio
 
 
+@router.post("/jobs", response_model=JobRead, status_code=202)
+def enqueue_audio(
+    audio_info: AudioCreate,
+    db: Session = Depends(get_session),
+    current_user: User = Depends(auth_services.get_current_user),
+):
+    services_jobs.require_queue_backend()
+    if audio_info.text is None or audio_info.text.strip() == "":
+        raise HTTPException(
+            status_code=400, detail="Text field cannot be empty"
+        )
+    job = services_jobs.enqueue_job(
+        db,
+        JobKind.GenerateAudio.value,
+        {"audio": audio_info.model_dump(mode="json")},
+        current_user.uidd,
+    )
+    return services_jobs.to_job_read(job)
+
+
 @router.post("/transcribe", response_model=SrtBase)
 def transcribe_audio(
     transcription_info: AudioTranscriptionCreate,
     db: Session = Depends(get_session),
-    storage: SupabaseStorageBackend = Depends(get_supabase_storage),
+    storage: StorageBackend = Depends(get_storage),
     current_user: User = Depends(auth_services.get_current_user),
 ):
     audio = crud_audio.get_audio_by_user(
@@ -82,30 +103,55 @@ def transcribe_audio(
         raise HTTPException(status_code=404, detail="Audio not found")
 
     try:
-        audio_bytes = storage.download_file(audio.file_path.split("//")[-1])
+        media = storage.download_to(audio.file_path.split("//")[-1])
     except Exception:
         raise HTTPException(
             status_code=500, detail="Could not download audio file"
         )
 
-    return crud_audio.transcribe_audio_file(
+    with media:
+        return crud_audio.transcribe_audio_file(
+            db,
+            storage,
+            audio.id,
+            media,
+            transcription_info.transcription_model,
+        )
+
+
+@router.post("/transcribe/jobs", response_model=JobRead, status_code=202)
+def enqueue_transcription(
+    transcription_info: AudioTranscriptionCreate,
+    db: Session = Depends(get_session),
+    current_user: User = Depends(auth_services.get_current_user),
+):
+    services_jobs.require_queue_backend()
+    audio = crud_audio.get_audio_by_user(
+        db, current_user.uidd, transcription_info.audio_id
+    )
+    if not audio:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    job = services_jobs.enqueue_job(
         db,
-        storage,
-        audio.id,
-        audio_bytes,
-        transcription_info.transcription_model,
+        JobKind.TranscribeAudio.value,
+        {
+            "audio_id": audio.id,
+            "model": transcription_info.transcription_model.value,
+        },
+        current_user.uidd,
     )
+    return services_jobs.to_job_read(job)
 
 
 @router.delete("/{audio_id}", status_code=204)
 def delete_audio_by_user(
     audio_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_session),
-    storage: SupabaseStorageBackend = Depends(get_supabase_storage),
     current_user: User = Depends(auth_services.get_current_user),
 ):
     success = crud_audio.delete_audio_by_user(
-        db, current_user.uidd, storage, audio_id
+        db, current_user.uidd, audio_id, background_tasks
     )
     if not success:
         raise HTTPException(status_code=404, detail="Audio not found")
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import Session
+
+from app.db.models.user import User
+from app.db.session import get_session
+from app.schemas.job import JobRead
+from app.services import auth as auth_services, jobs as services_jobs
+
+router = APIRouter()
+
+
+# Admin-only endpoints
+@router.get("/admin/dead", response_model=list[JobRead])
+def get_dead_jobs(
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_session),
+    _: User = Depends(auth_services.require_admin),
+):
+    return [
+        services_jobs.to_job_read(job)
+        for job in services_jobs.get_dead_jobs(db, skip=skip, limit=limit)
+    ]
+
+
+@router.post("/{job_id}/admin/retry", response_model=JobRead)
+def retry_dead_job(
+    job_id: int,
+    db: Session = Depends(get_session),
+    _: User = Depends(auth_services.require_admin),
+):
+    job = services_jobs.retry_dead_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Dead job not found")
+    return services_jobs.to_job_read(job)
+
+
+# User-specific endpoints
+@router.get("/", response_model=list[JobRead])
+def get_jobs_by_user(
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_session),
+    current_user: User = Depends(auth_services.get_current_user),
+):
+    return [
+        services_jobs.to_job_read(job)
+        for job in services_jobs.get_jobs_by_user(
+            db, current_user.uidd, skip=skip, limit=limit
+        )
+    ]
+
+
+@router.get("/{job_id}", response_model=JobRead)
+def get_job_by_user(
+    job_id: int,
+    db: Session = Depends(get_session),
+    current_user: User = Depends(auth_services.get_current_user),
+):
+    job = services_jobs.get_job_by_user(db, current_user.uidd, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return services_jobs.to_job_read(job)
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Request
+from sqlmodel import Session
+
+import app.services.auth as auth_services
+from app.core.storage.backends import StorageBackend, get_storage
+from app.db.models.user import User
+from app.db.session import get_session
+from app.models.media.media_kind import MediaKind
+from app.services import media as services_media
+
+router = APIRouter()
+
+
+@router.api_route("/{kind}/{media_id}", methods=["GET", "HEAD"])
+def read_media(
+    kind: MediaKind,
+    media_id: int,
+    request: Request,
+    db: Session = Depends(get_session),
+    storage: StorageBackend = Depends(get_storage),
+    current_user: User = Depends(auth_services.get_current_user),
+):
+    key = services_media.get_media_key(db, current_user, kind, media_id)
+    return services_media.media_response(
+        storage, key, request.headers, request.method
+    )
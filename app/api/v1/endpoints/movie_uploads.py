@@ -0,0 +1,125 @@
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    Request,
+    Response,
+)
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+
+import app.services.auth as auth_services
+from app.api.v1.body_limit import body_limit_route
+from app.core.config import settings
+from app.core.storage.backends import (
+    StorageBackend,
+    get_storage,
+)
+from app.db.models.user import User
+from app.db.session import get_session
+from app.schemas.movie import MovieRead
+from app.schemas.movie_upload import (
+    MovieUploadCreate,
+    MovieUploadExpiry,
+    MovieUploadRead,
+)
+from app.services import movie_upload as services_movie_upload
+
+router = APIRouter(
+    route_class=body_limit_route(lambda: settings.MOVIE_UPLOAD_CHUNK_MAX_BYTES)
+)
+
+
+def _offset_headers(response: Response, upload: MovieUploadRead):
+    # tus style headers, so clients can resume with a HEAD request.
+    response.headers["Upload-Offset"] = str(upload.offset)
+    response.headers["Upload-Length"] = str(upload.size)
+    response.headers["Cache-Control"] = "no-store"
+
+
+# Admin-only endpoints
+@router.post("/admin/expire", response_model=MovieUploadExpiry)
+def expire_uploads(
+    db: Session = Depends(get_session),
+    _: User = Depends(auth_services.require_admin),
+):
+    return services_movie_upload.expire_uploads(db)
+
+
+# User-specific endpoints
+@router.post("/", response_model=MovieUploadRead, status_code=201)
+def create_upload(
+    upload_info: MovieUploadCreate,
+    response: Response,
+    db: Session = Depends(get_session),
+    current_user: User = Depends(auth_services.get_current_user),
+):
+    upload = services_movie_upload.create_upload(
+        db, current_user.uidd, upload_info
+    )
+    _offset_headers(response, upload)
+    return upload
+
+
+@router.api_route(
+    "/{upload_id}", methods=["GET", "HEAD"], response_model=MovieUploadRead
+)
+def read_upload(
+    upload_id: str,
+    response: Response,
+    db: Session = Depends(get_session),
+    current_user: User = Depends(auth_services.get_current_user),
+):
+    upload = services_movie_upload.get_upload(db, current_user.uidd, upload_id)
+    _offset_headers(response, upload)
+    return upload
+
+
+@router.patch("/{upload_id}", response_model=MovieUploadRead)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    db: Session = Depends(get_session),
+    current_user: User = Depends(auth_services.get_current_user),
+):
+    await run_in_threadpool(
+        services_movie_upload.get_upload, db, current_user.uidd, upload_id
+    )
+    # Chunks may arrive in any order and in parallel, each one is written
+    # to its own file as it streams in.
+    chunk = await services_movie_upload.spool_chunk(upload_id, request.stream())
+    upload = await run_in_threadpool(
+        services_movie_upload.store_chunk,
+        db,
+        current_user.uidd,
+        upload_id,
+        upload_offset,
+        chunk,
+    )
+    _offset_headers(response, upload)
+    return upload
+
+
+@router.post("/{upload_id}/finalize", response_model=MovieRead, status_code=201)
+def finalize_upload(
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_session),
+    storage: StorageBackend = Depends(get_storage),
+    current_user: User = Depends(auth_services.get_current_user),
+):
+    return services_movie_upload.finalize_upload(
+        db, current_user.uidd, storage, upload_id, background_tasks
+    )
+
+
+@router.delete("/{upload_id}", status_code=204)
+def delete_upload(
+    upload_id: str,
+    db: Session = Depends(get_session),
+    current_user: User = Depends(auth_services.get_current_user),
+):
+    services_movie_upload.delete_upload(db, current_user.uidd, upload_id)
@@ -1,17 +1,28 @@
-from fastapi import APIRouter, Depends, File, Form, UploadFile
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    Form,
+    UploadFile,
+)
 from sqlmodel import Session
 
 import app.services.auth as auth_services
+from app.api.v1.body_limit import body_limit_route
+from app.core.config import settings
 from app.core.storage.backends import (
-    SupabaseStorageBackend,
-    get_supabase_storage,
+    StorageBackend,
+    get_storage,
 )
 from app.db.models.user import User
 from app.db.session import get_session
 from app.schemas.movie import MovieCreate, MovieRead, MovieReadBasic
 from app.services import movie as services_movie
 
-router = APIRouter()
+router = APIRouter(
+    route_class=body_limit_route(lambda: settings.MOVIE_UPLOAD_MAX_BYTES)
+)
 
 
 # Admin-only endpoints
@@ -37,29 +48,30 @@ def read_movie(
 @router.delete("/{movie_id}/admin", status_code=204)
 def delete_movie(
     movie_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_session),
-    storage: SupabaseStorageBackend = Depends(get_supabase_storage),
     _: User = Depends(auth_services.require_admin),
 ):
-    services_movie.delete_movie(db, storage, movie_id)
+    services_movie.delete_movie(db, movie_id, background_tasks)
 
 
 # User-specific endpoints
 @router.post("/", response_model=MovieRead, status_code=201)
 def create_movie(
+    background_tasks: BackgroundTasks,
     title: str = Form(...),
     description: str = Form(...),
     native_lang: str = Form(...),
     movie_file: UploadFile = File(...),
     db: Session = Depends(get_session),
-    storage: SupabaseStorageBackend = Depends(get_supabase_storage),
+    storage: StorageBackend = Depends(get_storage),
     current_user: User = Depends(auth_services.get_current_user),
 ):
     movie_info = MovieCreate(
         title=title, description=description, native_lang=native_lang
     )
     return services_movie.create_movie(
-        db, current_user.uidd, storage, movie_file, movie_info
+        db, current_user.uidd, storage, movie_file, movie_info, background_tasks
     )
 
 
@@ -95,10 +107,10 @@ def read_user_movie(
 @router.delete("/{movie_id}", status_code=204)
 def delete_user_movie(
     movie_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_session),
-    storage: SupabaseStorageBackend = Depends(get_supabase_storage),
     current_user: User = Depends(auth_services.get_current_user),
 ):
     services_movie.delete_movie_by_user(
-        db, current_user.uidd, storage, movie_id
+        db, current_user.uidd, movie_id, background_tasks
     )
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, File, Form, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, UploadFile
 from sqlmodel import Session
 
 import app.services.auth as auth_services
+from app.api.v1.body_limit import body_limit_route
+from app.core.config import settings
 from app.core.storage.backends import (
-    SupabaseStorageBackend,
-    get_supabase_storage,
+    StorageBackend,
+    get_storage,
 )
 from app.db.models.music import Music
 from app.db.models.user import User
@@ -12,7 +14,9 @@ from app.db.session import get_session
 from app.schemas.music import MusicCreate, MusicRead
 from app.services import music as services_music
 
-router = APIRouter()
+router = APIRouter(
+    route_class=body_limit_route(lambda: settings.MUSIC_UPLOAD_MAX_BYTES)
+)
 
 
 # Admin-only endpoints
@@ -38,11 +42,11 @@ def read_music(
 @router.delete("/{music_id}/admin", status_code=204)
 def delete_music(
     music_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_session),
-    storage: SupabaseStorageBackend = Depends(get_supabase_storage),
     _: User = Depends(auth_services.require_admin),
 ):
-    services_music.delete_music(db, storage, music_id)
+    services_music.delete_music(db, music_id, background_tasks)
 
 
 # User-specific endpoints
@@ -51,7 +55,7 @@ def create_music(
     title: str = Form(...),
     music_file: UploadFile = File(...),
     db: Session = Depends(get_session),
-    storage: SupabaseStorageBackend = Depends(get_supabase_storage),
+    storage: StorageBackend = Depends(get_storage),
     current_user: User = Depends(auth_services.get_current_user),
 ):
     music_info = MusicCreate(title=title)
@@ -84,10 +88,10 @@ def read_user_music(
 @router.delete("/{music_id}", status_code=204)
 def delete_user_music(
     music_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_session),
-    storage: SupabaseStorageBackend = Depends(get_supabase_storage),
     current_user: User = Depends(auth_services.get_current_user),
 ):
     services_music.delete_music_by_user(
-        db, current_user.uidd, storage, music_id
+        db, current_user.uidd, music_id, background_tasks
     )
@@ -1,18 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlmodel import Session
 
-from app.core.storage.backends import (
-    SupabaseStorageBackend,
-    get_supabase_storage,
-)
 from app.db.models.user import User
 from app.db.session import get_session
-from app.schemas.reel import ReelCreate, ReelRead, ReelWithAudio
+from app.schemas.reel import (
+    ReelBatchCreate,
+    ReelCreate,
+    ReelJobRead,
+    ReelWithAudio,
+)
+from app.schemas.render_cache import RenderCacheEviction, RenderCacheStats
 from app.services import (
     audio as services_audio,
     auth as auth_services,
     movie as services_movie,
     reel as services_reel,
+    render_cache as services_render_cache,
+    render_jobs as services_render_jobs,
 )
 
 router = APIRouter()
@@ -29,6 +33,23 @@ def get_reels(
     return services_reel.get_reels(db, skip=skip, limit=limit)
 
 
+@router.get("/admin/render-cache", response_model=RenderCacheStats)
+def get_render_cache_stats(
+    db: Session = Depends(get_session),
+    _: User = Depends(auth_services.require_admin),
+):
+    return services_render_cache.get_stats(db)
+
+
+@router.post("/admin/render-cache/evict", response_model=RenderCacheEviction)
+def evict_render_cache(
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_session),
+    _: User = Depends(auth_services.require_admin),
+):
+    return services_render_cache.evict(db, background_tasks)
+
+
 @router.get("/admin/{reel_id}", response_model=ReelWithAudio)
 def get_reel(
     reel_id: int,
@@ -42,11 +63,28 @@ def get_reel(
 
 
 # User-specific endpoints
-@router.post("/", response_model=ReelRead, status_code=201)
+def _get_reel_audio(db: Session, user_id: int, audio_id: int | None, movie):
+    db_audio = (
+        services_audio.get_audio_by_user(db, user_id, audio_id)
+        if audio_id
+        else None
+    )
+
+    if db_audio is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+
+    if db_audio.duration is None or db_audio.duration > movie.duration:
+        raise HTTPException(
+            status_code=400,
+            detail="Audio duration cannot be longer than movie duration",
+        )
+    return db_audio
+
+
+@router.post("/", response_model=ReelJobRead, status_code=202)
 def generate_reel(
     reel_req: ReelCreate,
     db: Session = Depends(get_session),
-    storage: SupabaseStorageBackend = Depends(get_supabase_storage),
     current_user: User = Depends(auth_services.get_current_user),
 ):
     db_movie = services_movie.get_movie_by_user(
@@ -55,50 +93,57 @@ def generate_reel(
     if not db_movie:
         raise HTTPException(status_code=404, detail="Movie not found")
 
-    db_audio = (
-        services_audio.get_audio_by_user(
-            db, current_user.uidd, reel_req.audio_id
-        )
-        if reel_req.audio_id
-        else None
+    db_audio = _get_reel_audio(
+        db, current_user.uidd, reel_req.audio_id, db_movie
     )
 
-    if db_audio is None:
-        raise HTTPException(status_code=404, detail="Audio not found")
+    return services_render_jobs.submit_render_job(
+        db, reel_req, db_movie.type, db_audio.language, current_user.uidd
+    )
 
-    if db_audio.duration is None or db_audio.duration > db_movie.duration:
-        raise HTTPException(
-            status_code=400,
-            detail="Audio duration cannot be longer than movie duration",
-        )
 
-    movie = storage.download_file(f"{db_movie.id}.{db_movie.type}")
-    audio = None
-    if reel_req.audio_id:
-        audio = storage.download_file(f"audio_{reel_req.audio_id}.wav")
-
-    srt = None
-    if reel_req.include_srt:
-        srt = storage.download_file(f"transcription_{reel_req.audio_id}.srt")
-
-    music = None
-    if reel_req.music_id:
-        music = storage.download_file(f"music_{reel_req.music_id}.wav")
-
-    reel = services_reel.create_reel(
-        db,
-        storage,
-        reel_req,
-        movie,
-        audio,
-        music,
-        reel_req.music_volume,
-        srt,
-        db_audio.language,
-        current_user.uidd,
+@router.post("/batch", response_model=ReelJobRead, status_code=202)
+def generate_reel_batch(
+    batch_req: ReelBatchCreate,
+    db: Session = Depends(get_session),
+    current_user: User = Depends(auth_services.get_current_user),
+):
+    db_movie = services_movie.get_movie_by_user(
+        db, current_user.uidd, batch_req.movie_id
     )
+    if not db_movie:
+        raise HTTPException(status_code=404, detail="Movie not found")
 
-    return reel
+    langs = [
+        _get_reel_audio(
+            db, current_user.uidd, variant.audio_id, db_movie
+        ).language
+        for variant in batch_req.variants
+    ]
+
+    return services_render_jobs.submit_render_batch_job(
+        db, batch_req, db_movie.type, langs, current_user.uidd
+    )
+
+
+@router.get("/jobs", response_model=list[ReelJobRead])
+def get_render_jobs_by_user(
+    db: Session = Depends(get_session),
+    current_user: User = Depends(auth_services.get_current_user),
+):
+    return services_render_jobs.get_render_jobs_by_user(db, current_user.uidd)
+
+
+@router.get("/jobs/{job_id}", response_model=ReelJobRead)
+def get_render_job_by_user(
+    job_id: str,
+    db: Session = Depends(get_session),
+    current_user: User = Depends(auth_services.get_current_user),
+):
+    job = services_render_jobs.get_render_job(db, job_id, current_user.uidd)
+    if not job:
+        raise HTTPException(status_code=404, detail="Render job not found")
+    return job
 
 
 @router.get("/", response_model=list[ReelWithAudio])
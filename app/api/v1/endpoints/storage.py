@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from sqlmodel import Session
+
+from app.core.storage.backends import (
+    LocalStorageBackend,
+    StorageBackend,
+    get_storage,
+)
+from app.db.models.user import User
+from app.db.session import get_session
+from app.schemas.storage import StorageCollection, StorageReconciliation
+from app.services import (
+    auth as auth_services,
+    storage_gc as services_storage_gc,
+)
+
+router = APIRouter()
+
+
+# Admin-only endpoints
+@router.post("/admin/collect", response_model=StorageCollection)
+def collect_storage(
+    db: Session = Depends(get_session),
+    storage: StorageBackend = Depends(get_storage),
+    _: User = Depends(auth_services.require_admin),
+):
+    return services_storage_gc.collect(db, storage)
+
+
+@router.post("/admin/reconcile", response_model=StorageReconciliation)
+def reconcile_storage(
+    db: Session = Depends(get_session),
+    storage: StorageBackend = Depends(get_storage),
+    _: User = Depends(auth_services.require_admin),
+):
+    return services_storage_gc.reconcile(db, storage)
+
+
+@router.get("/{file_path:path}")
+def read_file(
+    file_path: str,
+    storage: StorageBackend = Depends(get_storage),
+):
+    # Only the local backend is served from here, Supabase objects have
+    # their own public URLs.
+    if not isinstance(storage, LocalStorageBackend):
+        raise HTTPException(status_code=404, detail="File not found")
+    key = file_path.lstrip("/")
+    try:
+        exists = storage.exists(key)
+    except ValueError:
+        exists = False
+    if not exists:
+        raise HTTPException(status_code=404, detail="File not found")
+    # Uvicorn has no pathsend extension, FileResponse reads the file in
+    # chunks and sends them through the event loop. sendfile is only used
+    # when objects are written (LocalStorageBackend uploads and copies).
+    return FileResponse(storage.local_path(key))
@@ -4,8 +4,8 @@ from sqlmodel import Session, select
 import app.services.auth as auth_services
 import app.services.user as user_services
 from app.core.storage.backends import (
-    SupabaseStorageBackend,
-    get_supabase_storage,
+    StorageBackend,
+    get_storage,
 )
 from app.db.models.user import User
 from app.db.session import get_session
@@ -29,7 +29,7 @@ router = APIRouter()
 def register_user(
     user_data: UserRegister,
     db: Session = Depends(get_session),
-    storage: SupabaseStorageBackend = Depends(get_supabase_storage),
+    storage: StorageBackend = Depends(get_storage),
 ):
     return user_services.register_user(user_data, db, storage)
 
@@ -0,0 +1,150 @@
+import numpy as np
+import soundfile as sf
+
+DEFAULT_SAMPLE_RATE = 44100
+DEFAULT_CHANNELS = 2
+# Speech detection and gain smoothing windows, in seconds.
+ENVELOPE_WINDOW = 0.05
+DUCKING_SMOOTHING = 0.15
+LIMITER_BLOCK = 0.01
+SPEECH_THRESHOLD = 0.02
+LIMITER_CEILING = 0.98
+
+
+def load_audio(
+    path: str,
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+    channels: int = DEFAULT_CHANNELS,
+) -> np.ndarray:
+    samples, source_rate = sf.read(path, dtype="float32", always_2d=True)
+    if samples.shape[1] != channels:
+        # Mono is spread to every channel, anything else is downmixed first.
+        samples = np.repeat(
+            samples.mean(axis=1, keepdims=True), channels, axis=1
+        )
+    return resample(samples, source_rate, sample_rate)
+
+
+def resample(
+    samples: np.ndarray, source_rate: int, target_rate: int
+) -> np.ndarray:
+    if source_rate == target_rate or not len(samples):
+        return samples
+    frames = int(round(len(samples) * target_rate / source_rate))
+    source_times = np.arange(len(samples)) / source_rate
+    target_times = np.arange(frames) / target_rate
+    return np.stack(
+        [
+            np.interp(target_times, source_times, channel)
+            for channel in samples.T
+        ],
+        axis=1,
+    ).astype(np.float32)
+
+
+def fit_to_length(samples: np.ndarray, frames: int) -> np.ndarray:
+    if not len(samples):
+        return np.zeros((frames, samples.shape[1]), dtype=np.float32)
+    if len(samples) < frames:
+        samples = np.tile(samples, (-(-frames // len(samples)), 1))
+    return samples[:frames]
+
+
+def pad_to_length(samples: np.ndarray, frames: int) -> np.ndarray:
+    if len(samples) >= frames:
+        return samples[:frames]
+    return np.pad(samples, ((0, frames - len(samples)), (0, 0)))
+
+
+def _moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    # Centered box filter in O(n) through a cumulative sum.
+    if window <= 1 or not len(values):
+        return values
+    cumsum = np.cumsum(np.concatenate([[0.0], values]), dtype=np.float64)
+    half = window // 2
+    hi = np.minimum(np.arange(len(values)) + half + 1, len(values))
+    lo = np.maximum(np.arange(len(values)) - half, 0)
+    return ((cumsum[hi] - cumsum[lo]) / (hi - lo)).astype(np.float32)
+
+
+def ducking_gain(
+    voice: np.ndarray, sample_rate: int, ducking_db: float
+) -> np.ndarray:
+    # ducking_db is how far the music is lowered under speech. Either sign
+    # means a cut, music is never raised over the voice.
+    envelope = _moving_average(
+        np.abs(voice).max(axis=1), int(sample_rate * ENVELOPE_WINDOW)
+    )
+    gain = np.where(
+        envelope > SPEECH_THRESHOLD, 10 ** (-abs(ducking_db) / 20), 1.0
+    ).astype(np.float32)
+    return _moving_average(gain, int(sample_rate * DUCKING_SMOOTHING))
+
+
+def limit(
+    samples: np.ndarray,
+    sample_rate: int,
+    ceiling: float = LIMITER_CEILING,
+) -> np.ndarray:
+    if not len(samples):
+        return samples
+    block = max(1, int(sample_rate * LIMITER_BLOCK))
+    peaks = np.abs(samples).max(axis=1)
+    blocks = -(-len(peaks) // block)
+    peaks = np.pad(peaks, (0, blocks * block - len(peaks)))
+    block_peaks = peaks.reshape(blocks, block).max(axis=1)
+    # Each block takes the stricter gain of itself and its neighbours, so
+    # the smoothed curve is already down when a peak arrives.
+    block_gain = np.minimum(1.0, ceiling / np.maximum(block_peaks, 1e-9))
+    block_gain = np.minimum(
+        block_gain,
+        np.minimum(
+            np.concatenate([block_gain[1:], [1.0]]),
+            np.concatenate([[1.0], block_gain[:-1]]),
+        ),
+    )
+    gain = np.repeat(block_gain, block)[: len(samples)]
+    gain = np.minimum(gain, _moving_average(gain, block))
+    return np.clip(samples * gain[:, None].astype(samples.dtype), -1.0, 1.0)
+
+
+def mix(
+    duration: float,
+    voice_path: str | None = None,
+    music_path: str | None = None,
+    music_volume: float = 0.2,
+    ducking_db: float = 0.0,
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+) -> np.ndarray:
+    frames = int(round(duration * sample_rate))
+    mixed = np.zeros((frames, DEFAULT_CHANNELS), dtype=np.float32)
+
+    voice = None
+    if voice_path:
+        voice = pad_to_length(load_audio(voice_path, sample_rate), frames)
+        mixed += voice
+
+    if music_path:
+        music = fit_to_length(load_audio(music_path, sample_rate), frames)
+        music = music * music_volume
+        if voice is not None and ducking_db:
+            music *= ducking_gain(voice, sample_rate, ducking_db)[:, None]
+        mixed += music
+
+    return limit(mixed, sample_rate)
+
+
+def write_mix(
+    output_path: str,
+    duration: float,
+    voice_path: str | None = None,
+    music_path: str | None = None,
+    music_volume: float = 0.2,
+    ducking_db: float = 0.0,
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+) -> str:
+    samples = mix(
+        duration, voice_path, music_path, music_volume, ducking_db, sample_rate
+    )
+    sf.write(output_path, samples, sample_rate, subtype="FLOAT")
+    return output_path
@@ -0,0 +1,99 @@
+from bisect import bisect_right
+from collections.abc import Callable
+
+import numpy as np
+from moviepy import VideoClip
+from moviepy.tools import compute_position
+
+from app.core.glyph_cache import Glyph
+
+Subtitle = tuple[tuple[float, float], str]
+
+
+class SubtitleCompositor:
+    # Draws subtitle glyphs straight into the decoded frame. The frame is
+    # copied into a buffer reused for every frame and only the glyph's
+    # bounding box is blended, frames without an active cue are passed
+    # through untouched.
+    def __init__(
+        self,
+        subtitles: list[Subtitle],
+        get_glyph: Callable[[str], Glyph],
+        position: tuple[str, str],
+    ):
+        self.cues = sorted(subtitles, key=lambda sub: sub[0][0])
+        self.starts = [start for (start, _), _ in self.cues]
+        self.get_glyph = get_glyph
+        self.position = position
+        self._frame: np.ndarray | None = None
+        self._scratch = np.empty(0, dtype=np.float32)
+        self._cue_index: int | None = None
+        self._glyph: Glyph | None = None
+
+    def _active_cue(self, t: float) -> int | None:
+        idx = bisect_right(self.starts, t) - 1
+        if idx < 0 or t >= self.cues[idx][0][1]:
+            return None
+        return idx
+
+    def _glyph_for(self, idx: int) -> Glyph:
+        # Consecutive frames of one cue share the bitmap.
+        if idx != self._cue_index:
+            self._glyph = self.get_glyph(self.cues[idx][1])
+            self._cue_index = idx
+        return self._glyph
+
+    def _frame_buffer(self, frame: np.ndarray) -> np.ndarray:
+        if self._frame is None or self._frame.shape != frame.shape:
+            self._frame = np.empty(frame.shape, dtype=np.uint8)
+        np.copyto(self._frame, frame, casting="unsafe")
+        return self._frame
+
+    def _scratch_buffer(self, height: int, width: int) -> np.ndarray:
+        size = height * width * 3
+        if self._scratch.size < size:
+            self._scratch = np.empty(size, dtype=np.float32)
+        return self._scratch[:size].reshape(height, width, 3)
+
+    def compose(self, frame: np.ndarray, t: float) -> np.ndarray:
+        idx = self._active_cue(t)
+        if idx is None:
+            return frame
+        glyph = self._glyph_for(idx)
+        glyph_height, glyph_width = glyph.mask.shape
+        if not glyph_height or not glyph_width:
+            return frame
+
+        frame_height, frame_width = frame.shape[:2]
+        clip_height, clip_width = glyph.size
+        x, y = compute_position(
+            (clip_width, clip_height),
+            (frame_width, frame_height),
+            self.position,
+        )
+        top, left = y + glyph.top, x + glyph.left
+        y0, x0 = max(top, 0), max(left, 0)
+        y1 = min(top + glyph_height, frame_height)
+        x1 = min(left + glyph_width, frame_width)
+        if y0 >= y1 or x0 >= x1:
+            return frame
+
+        out = self._frame_buffer(frame)
+        region = out[y0:y1, x0:x1]
+        rows = slice(y0 - top, y1 - top)
+        cols = slice(x0 - left, x1 - left)
+        alpha = glyph.mask[rows, cols, None]
+        # region += (glyph - region) * alpha, in a reused float buffer.
+        blend = self._scratch_buffer(y1 - y0, x1 - x0)
+        np.subtract(glyph.rgb[rows, cols], region, out=blend, dtype=np.float32)
+        blend *= alpha
+        blend += region
+        np.rint(blend, out=blend)
+        np.copyto(region, blend, casting="unsafe")
+        return out
+
+    def clip(self, base_clip) -> VideoClip:
+        return VideoClip(
+            lambda t: self.compose(base_clip.get_frame(t), t),
+            duration=base_clip.duration,
+        )
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
@@ -18,13 +19,100 @@ class Settings(BaseSettings):
     SUPABASE_URL: str = os.getenv("SUPABASE_URL")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY")
     BUCKET: str = os.getenv("BUCKET")
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "supabase")
+    LOCAL_STORAGE_ROOT: str = os.getenv("LOCAL_STORAGE_ROOT", "storage")
+    LOCAL_STORAGE_URL: str = os.getenv(
+        "LOCAL_STORAGE_URL", "http://localhost:8000/api/v1/storage"
+    )
+    STORAGE_CONCURRENCY: int = os.getenv("STORAGE_CONCURRENCY", 4)
+    STORAGE_TIMEOUT: float = os.getenv("STORAGE_TIMEOUT", 60)
+    STORAGE_GC_BATCH_SIZE: int = os.getenv("STORAGE_GC_BATCH_SIZE", 100)
+    STORAGE_GC_MAX_ATTEMPTS: int = os.getenv("STORAGE_GC_MAX_ATTEMPTS", 5)
+    STORAGE_ORPHAN_GRACE: int = os.getenv("STORAGE_ORPHAN_GRACE", 24 * 3600)
+    STORAGE_CACHE_ENABLED: bool = os.getenv("STORAGE_CACHE_ENABLED", True)
+    STORAGE_CACHE_DIR: str = os.getenv(
+        "STORAGE_CACHE_DIR",
+        os.path.join(tempfile.gettempdir(), "storage_cache"),
+    )
+    STORAGE_CACHE_MAX_BYTES: int = os.getenv(
+        "STORAGE_CACHE_MAX_BYTES", 5 * 1024**3
+    )
 
     FFMPEG_CODEC: str = os.getenv("FFMPEG_CODEC")
     FFMPEG_THREADS: str = os.getenv("FFMPEG_THREADS")
+    FFMPEG_BINARY: str = os.getenv("FFMPEG_BINARY", "ffmpeg")
+    FFPROBE_BINARY: str = os.getenv("FFPROBE_BINARY", "ffprobe")
+    REEL_RENDER_ENGINE: str = os.getenv("REEL_RENDER_ENGINE", "moviepy")
+    RENDER_WORKERS: int = os.getenv("RENDER_WORKERS", 2)
+    RENDER_QUEUE_LIMIT: int = os.getenv("RENDER_QUEUE_LIMIT", 32)
+    RENDER_JOB_TTL: int = os.getenv("RENDER_JOB_TTL", 3600)
+    RENDER_SEGMENTS: int = os.getenv("RENDER_SEGMENTS", 1)
+    RENDER_SEGMENT_WORKERS: int = os.getenv(
+        "RENDER_SEGMENT_WORKERS", os.cpu_count() or 1
+    )
+
+    GLYPH_CACHE_MAX_BYTES: int = os.getenv(
+        "GLYPH_CACHE_MAX_BYTES", 64 * 1024**2
+    )
+    SUBTITLE_COMPOSITOR_ENABLED: bool = os.getenv(
+        "SUBTITLE_COMPOSITOR_ENABLED", True
+    )
+    CAPTION_GROUPING_ENABLED: bool = os.getenv("CAPTION_GROUPING_ENABLED", True)
+    CAPTION_MAX_CHARS: int = os.getenv("CAPTION_MAX_CHARS", 32)
+    CAPTION_MAX_DURATION: float = os.getenv("CAPTION_MAX_DURATION", 3.0)
+    CAPTION_MAX_PAUSE: float = os.getenv("CAPTION_MAX_PAUSE", 0.6)
+    ASS_SUBTITLES_ENABLED: bool = os.getenv("ASS_SUBTITLES_ENABLED", False)
+    AUDIO_PREMIX_ENABLED: bool = os.getenv("AUDIO_PREMIX_ENABLED", True)
+    # Cut applied to the music while the voice speaks, in dB (12 and -12
+    # both lower it by 12 dB). 0 turns ducking off.
+    MUSIC_DUCKING_DB: float = os.getenv("MUSIC_DUCKING_DB", 0)
+
+    MEZZANINE_ENABLED: bool = os.getenv("MEZZANINE_ENABLED", True)
+    MEZZANINE_CODEC: str = os.getenv("MEZZANINE_CODEC", "libx264")
+    MEZZANINE_CRF: int = os.getenv("MEZZANINE_CRF", 18)
+    MEZZANINE_KEYFRAME_SECONDS: float = os.getenv(
+        "MEZZANINE_KEYFRAME_SECONDS", 1
+    )
+
+    HLS_ENABLED: bool = os.getenv("HLS_ENABLED", True)
+    HLS_SEGMENT_SECONDS: float = os.getenv("HLS_SEGMENT_SECONDS", 2)
+    # Output height and video bitrate of each rendition, highest first.
+    HLS_VARIANTS: list[str] = ["1920:4500k", "1280:2500k", "854:1200k"]
+    HLS_AUDIO_BITRATE: str = os.getenv("HLS_AUDIO_BITRATE", "128k")
+
+    RENDER_CACHE_ENABLED: bool = os.getenv("RENDER_CACHE_ENABLED", True)
+    RENDER_CACHE_MAX_AGE_DAYS: int = os.getenv("RENDER_CACHE_MAX_AGE_DAYS", 30)
+    RENDER_CACHE_MAX_BYTES: int = os.getenv(
+        "RENDER_CACHE_MAX_BYTES", 20 * 1024**3
+    )
+
+    JOB_BACKEND: str = os.getenv("JOB_BACKEND", "local")
+    JOB_MAX_ATTEMPTS: int = os.getenv("JOB_MAX_ATTEMPTS", 5)
+    JOB_LEASE_SECONDS: int = os.getenv("JOB_LEASE_SECONDS", 60)
+    JOB_HEARTBEAT_SECONDS: int = os.getenv("JOB_HEARTBEAT_SECONDS", 15)
+    JOB_BACKOFF_BASE: float = os.getenv("JOB_BACKOFF_BASE", 10)
+    JOB_BACKOFF_MAX: float = os.getenv("JOB_BACKOFF_MAX", 900)
+    JOB_POLL_INTERVAL: float = os.getenv("JOB_POLL_INTERVAL", 2)
 
     GOOGLE_CLIENT_ID: str = os.getenv("GOOGLE_CLIENT_ID")
     SECRET_KEY: str = os.getenv("SECRET_KEY")
 
+    MOVIE_UPLOAD_MAX_BYTES: int = os.getenv(
+        "MOVIE_UPLOAD_MAX_BYTES", 2 * 1024**3
+    )
+    MOVIE_MAX_DURATION: int = os.getenv("MOVIE_MAX_DURATION", 1800)
+    MOVIE_UPLOAD_DIR: str = os.getenv(
+        "MOVIE_UPLOAD_DIR",
+        os.path.join(tempfile.gettempdir(), "movie_uploads"),
+    )
+    MOVIE_UPLOAD_CHUNK_MAX_BYTES: int = os.getenv(
+        "MOVIE_UPLOAD_CHUNK_MAX_BYTES", 64 * 1024**2
+    )
+    MOVIE_UPLOAD_TTL: int = os.getenv("MOVIE_UPLOAD_TTL", 24 * 3600)
+    MUSIC_UPLOAD_MAX_BYTES: int = os.getenv(
+        "MUSIC_UPLOAD_MAX_BYTES", 200 * 1024**2
+    )
+    MUSIC_MAX_DURATION: int = os.getenv("MUSIC_MAX_DURATION", 900)
     ALLOWED_VIDEO_EXTENSIONS: list[str] = [".mp4", ".mov"]
     ALLOWED_MUSIC_EXTENSIONS: list[str] = [".wav"]
     ALLOWED_AUDIO_EXTENSIONS: list[str] = [".wav"]
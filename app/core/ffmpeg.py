@@ -0,0 +1,133 @@
+import json
+import subprocess
+import tempfile
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from app.core.config import settings
+
+
+def run_ffmpeg(
+    args: list[str],
+    duration: float | None = None,
+    on_progress: Callable[[float], None] | None = None,
+) -> None:
+    command = [settings.FFMPEG_BINARY, "-hide_banner", "-y", *args]
+    if on_progress is None or not duration:
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {result.stderr[-2000:]}")
+        return
+
+    # -progress writes key=value blocks to stdout; stderr goes to a file so
+    # a chatty encoder can never block on a full pipe.
+    command[1:1] = ["-progress", "pipe:1", "-nostats"]
+    with tempfile.TemporaryFile(mode="w+") as stderr:
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=stderr, text=True
+        )
+        for line in process.stdout:
+            key, _, value = line.strip().partition("=")
+            if key == "out_time_us" and value.isdigit():
+                on_progress(min(int(value) / 1_000_000 / duration, 1.0))
+        if process.wait() != 0:
+            stderr.seek(0)
+            raise RuntimeError(f"ffmpeg failed: {stderr.read()[-2000:]}")
+    on_progress(1.0)
+
+
+@dataclass
+class MediaInfo:
+    duration: float
+    bit_rate: int | None = None
+    codec: str | None = None
+    width: int | None = None
+    height: int | None = None
+    fps: float | None = None
+    rotation: int = 0
+    has_audio: bool = False
+
+
+def _run_ffprobe(args: list[str]) -> str:
+    command = [settings.FFPROBE_BINARY, "-v", "error", *args]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {result.stderr[-2000:]}")
+    return result.stdout
+
+
+def probe_duration(path: str) -> float:
+    output = _run_ffprobe(
+        [
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            path,
+        ]
+    )
+    return float(output.strip())
+
+
+def _frame_rate(rate: str | None) -> float | None:
+    num, _, den = (rate or "").partition("/")
+    try:
+        fps = float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return fps or None
+
+
+def _rotation(stream: dict) -> int:
+    # Clockwise degrees, like the legacy "rotate" tag. The display matrix
+    # reports the counterclockwise angle.
+    for side_data in stream.get("side_data_list", []):
+        if "rotation" in side_data:
+            return -int(side_data["rotation"]) % 360
+    return int(stream.get("tags", {}).get("rotate", 0)) % 360
+
+
+def _int_or_none(value) -> int | None:
+    return int(value) if value not in (None, "", "N/A") else None
+
+
+def probe_media(path: str) -> MediaInfo:
+    # Container and first video stream in one ffprobe run.
+    probe = json.loads(
+        _run_ffprobe(["-show_format", "-show_streams", "-of", "json", path])
+    )
+    container = probe.get("format", {})
+    info = MediaInfo(
+        duration=float(container.get("duration") or 0),
+        bit_rate=_int_or_none(container.get("bit_rate")),
+    )
+    for stream in probe.get("streams", []):
+        if stream.get("codec_type") == "audio":
+            info.has_audio = True
+        if stream.get("codec_type") != "video" or info.codec is not None:
+            continue
+        info.codec = stream.get("codec_name")
+        info.width = _int_or_none(stream.get("width"))
+        info.height = _int_or_none(stream.get("height"))
+        info.fps = _frame_rate(stream.get("avg_frame_rate")) or _frame_rate(
+            stream.get("r_frame_rate")
+        )
+        info.rotation = _rotation(stream)
+    return info
+
+
+def extract_frame(path: str, output_path: str, at: float = 0) -> str:
+    # -ss before -i seeks on the demuxer to the keyframe before `at`, so
+    # only a few frames are decoded however long the input is.
+    run_ffmpeg(["-ss", f"{at:.3f}", "-i", path, "-frames:v", "1", output_path])
+    return output_path
+
+
+def escape_filter_value(value: str) -> str:
+    # Values inside a filtergraph are unescaped twice: once by the option
+    # parser and once by the graph parser.
+    for char in ("\\", "'", ":"):
+        value = value.replace(char, f"\\{char}")
+    for char in ("\\", "'", "[", "]", ",", ";"):
+        value = value.replace(char, f"\\{char}")
+    return value
@@ -0,0 +1,553 @@
+import os
+from collections.abc import Callable, Iterator
+from typing import TYPE_CHECKING
+
+import pysrt
+from PIL import ImageFont
+
+from app.core.config import settings
+from app.core.ffmpeg import (
+    escape_filter_value,
+    probe_duration,
+    probe_media,
+    run_ffmpeg,
+)
+from app.models.reel_generator.color import Color
+from app.models.reel_generator.horizontal_align import HorizontalAlign
+from app.models.reel_generator.vertical_align import VerticalAlign
+
+if TYPE_CHECKING:
+    from app.core.reel_generator import ReelGenerator
+
+# Match the defaults MoviePy's write_videofile uses for .mp4 outputs.
+DEFAULT_AUDIO_CODEC = "libmp3lame"
+DEFAULT_AUDIO_FPS = 44100
+DEFAULT_AUDIO_CHANNELS = 2
+DEFAULT_PIXEL_FORMAT = "yuv420p"
+STROKE_WIDTH = 4
+# The moov atom goes in front of the media data, so players can start
+# before the whole file has arrived.
+FASTSTART_PARAMS = ["-movflags", "+faststart"]
+HLS_PLAYLIST = "master.m3u8"
+HLS_AUDIO_CODEC = "aac"
+# MoviePy repeats the last frame for the extra second added after the
+# subtitles end, tpad does the same in the filtergraph.
+TAIL_PADDING = 1
+
+ASS_COLORS = {
+    Color.White: "&H00FFFFFF",
+    Color.Black: "&H00000000",
+}
+
+# ASS alignment follows the numpad layout: 1-3 bottom, 4-6 middle, 7-9 top.
+ASS_ROW_OFFSETS = {
+    VerticalAlign.Bottom: 0,
+    VerticalAlign.Center: 3,
+    VerticalAlign.Top: 6,
+}
+ASS_COLUMNS = {
+    HorizontalAlign.Left: 1,
+    HorizontalAlign.Center: 2,
+    HorizontalAlign.Right: 3,
+}
+
+
+def get_srt_duration(srt_path: str) -> float:
+    subs = pysrt.open(srt_path, encoding="utf-8")
+    if not subs:
+        return 0.0
+    return max(sub.end.ordinal for sub in subs) / 1000
+
+
+class FFmpegRenderer:
+    # Mirrors the MoviePy pipeline of ReelGenerator step by step, but runs
+    # all the per-frame work inside one ffmpeg process.
+    def __init__(self, generator: "ReelGenerator"):
+        self.generator = generator
+
+    def _ass_font_size(self) -> int:
+        # libass sizes fonts by their full line height while Pillow (and so
+        # MoviePy's TextClip) sizes them by the em square.
+        g = self.generator
+        font = ImageFont.truetype(g.font_path, g.font_size)
+        return sum(font.getmetrics())
+
+    def subtitle_style(self) -> dict:
+        g = self.generator
+        alignment = (
+            ASS_ROW_OFFSETS[g.vertical_align] + ASS_COLUMNS[g.horizontal_align]
+        )
+        return {
+            "PlayResX": g.video_width,
+            "PlayResY": g.video_height,
+            "ScaledBorderAndShadow": "yes",
+            "FontName": g.font_name,
+            "FontSize": self._ass_font_size(),
+            "PrimaryColour": ASS_COLORS[g.font_color],
+            "OutlineColour": ASS_COLORS[g.stroke_color],
+            "BorderStyle": 1,
+            "Outline": STROKE_WIDTH,
+            "Shadow": 0,
+            "Alignment": alignment,
+            "MarginL": 0,
+            "MarginR": 0,
+            "MarginV": g.text_margin,
+        }
+
+    def _subtitles_filter(self, srt_path: str) -> str:
+        g = self.generator
+        fonts_dir = os.path.dirname(g.font_path)
+        force_style = ",".join(
+            f"{key}={value}" for key, value in self.subtitle_style().items()
+        )
+        return (
+            f"subtitles=filename={escape_filter_value(srt_path)}"
+            f":fontsdir={escape_filter_value(fonts_dir)}"
+            f":original_size={g.video_width}x{g.video_height}"
+            f":force_style={escape_filter_value(force_style)}"
+        )
+
+    def ass_filter(self, ass_path: str, offset: float = 0) -> str:
+        # The ASS file already carries the style, libass draws it as is.
+        # offset is where the frames fed to the filter start in the reel.
+        fonts_dir = os.path.dirname(self.generator.font_path)
+        ass = (
+            f"ass=filename={escape_filter_value(ass_path)}"
+            f":fontsdir={escape_filter_value(fonts_dir)}"
+        )
+        if not offset:
+            return ass
+        # setpts drops the stream frame rate, fps puts it back.
+        return (
+            f"setpts=PTS+{offset}/TB,{ass},setpts=PTS-STARTPTS"
+            f",fps={self.generator.fps}"
+        )
+
+    def _geometry_filters(self) -> list[str]:
+        g = self.generator
+        return [
+            f"scale=-2:{g.video_height}",
+            f"crop='min(iw,{g.video_width})':{g.video_height}",
+            "setsar=1",
+            f"fps={g.fps}",
+        ]
+
+    def _video_filters(
+        self,
+        srt_path: str | None,
+        prescaled: bool = False,
+        source: str = "0:v",
+        label: str = "v",
+        ass_path: str | None = None,
+    ) -> str:
+        filters = [] if prescaled else self._geometry_filters()
+        filters.append(f"tpad=stop_mode=clone:stop_duration={TAIL_PADDING}")
+        if ass_path:
+            filters.append(self.ass_filter(ass_path))
+        elif srt_path:
+            filters.append(self._subtitles_filter(srt_path))
+        filters.append(f"format={DEFAULT_PIXEL_FORMAT}")
+        return f"[{source}]" + ",".join(filters) + f"[{label}]"
+
+    def _audio_filters(
+        self,
+        audio_input: int | None,
+        music_input: int | None,
+        music_volume: float,
+        label: str = "a",
+    ) -> str | None:
+        if music_input is None:
+            if audio_input is None:
+                return None
+            return f"[{audio_input}:a]apad[{label}]"
+
+        music = (
+            f"[{music_input}:a]volume={music_volume},"
+            "aloop=loop=-1:size=2147483647"
+        )
+        if audio_input is None:
+            return f"{music}[{label}]"
+        # normalize=0 keeps the plain sum CompositeAudioClip produces. The
+        # looped music carries on under the rest of the clip after the voice
+        # ends, like in the MoviePy mix; -t ends the output.
+        return (
+            f"{music}[{label}music];"
+            f"[{audio_input}:a][{label}music]amix=inputs=2:duration=longest"
+            f":dropout_transition=0:normalize=0[{label}]"
+        )
+
+    def _output_args(
+        self,
+        video_label: str,
+        audio_label: str | None,
+        duration: float,
+    ) -> list[str]:
+        g = self.generator
+        args = ["-map", f"[{video_label}]"]
+        if audio_label:
+            args += [
+                "-map",
+                f"[{audio_label}]",
+                "-c:a",
+                DEFAULT_AUDIO_CODEC,
+                "-ar",
+                str(DEFAULT_AUDIO_FPS),
+                "-ac",
+                str(DEFAULT_AUDIO_CHANNELS),
+            ]
+        args += ["-c:v", settings.FFMPEG_CODEC, "-r", str(g.fps)]
+        args += FASTSTART_PARAMS
+        if settings.FFMPEG_THREADS:
+            args += ["-threads", str(settings.FFMPEG_THREADS)]
+        # Always an explicit -t: apad and the looped music never end, and
+        # -shortest on such a graph buffers without bound instead of
+        # stopping with the video.
+        args += ["-t", f"{duration:.3f}"]
+        return args
+
+    def build_command(
+        self,
+        output_path: str,
+        movie_path: str,
+        audio_path: str | None,
+        srt_path: str | None,
+        music_path: str | None,
+        music_volume: float,
+        duration: float,
+        prescaled: bool = False,
+        ass_path: str | None = None,
+    ) -> list[str]:
+        args = ["-i", movie_path]
+        audio_input = music_input = None
+        next_input = 1
+        if audio_path:
+            args += ["-i", audio_path]
+            audio_input, next_input = next_input, next_input + 1
+        if music_path:
+            args += ["-i", music_path]
+            music_input = next_input
+
+        graph = [self._video_filters(srt_path, prescaled, ass_path=ass_path)]
+        audio_graph = self._audio_filters(
+            audio_input, music_input, music_volume
+        )
+        if audio_graph:
+            graph.append(audio_graph)
+
+        args += ["-filter_complex", ";".join(graph)]
+        args += self._output_args("v", "a" if audio_graph else None, duration)
+        args.append(output_path)
+        return args
+
+    def build_batch_command(
+        self,
+        movie_path: str,
+        variants: list[tuple],
+        output_paths: list[str],
+        durations: list[float],
+        prescaled: bool = False,
+    ) -> list[str]:
+        # One decode of the movie, one crop, then split into a branch per
+        # variant that only adds its own subtitles and audio.
+        args = ["-i", movie_path]
+        next_input = 1
+        base = [] if prescaled else self._geometry_filters()
+        base.append(f"split={len(variants)}")
+        graph = [
+            "[0:v]"
+            + ",".join(base)
+            + "".join(f"[base{idx}]" for idx in range(len(variants)))
+        ]
+        outputs = []
+        for idx, variant in enumerate(variants):
+            audio_path, srt_path, music_path, music_volume, ass_path = variant
+            audio_input = music_input = None
+            if audio_path:
+                args += ["-i", audio_path]
+                audio_input, next_input = next_input, next_input + 1
+            if music_path:
+                args += ["-i", music_path]
+                music_input, next_input = next_input, next_input + 1
+
+            graph.append(
+                self._video_filters(
+                    srt_path,
+                    True,
+                    source=f"base{idx}",
+                    label=f"v{idx}",
+                    ass_path=ass_path,
+                )
+            )
+            audio_graph = self._audio_filters(
+                audio_input, music_input, music_volume, label=f"a{idx}"
+            )
+            if audio_graph:
+                graph.append(audio_graph)
+            outputs += self._output_args(
+                f"v{idx}", f"a{idx}" if audio_graph else None, durations[idx]
+            )
+            outputs.append(output_paths[idx])
+
+        return args + ["-filter_complex", ";".join(graph)] + outputs
+
+    def render(
+        self,
+        output_path: str,
+        movie_path: str,
+        audio_path: str | None = None,
+        srt_path: str | None = None,
+        music_path: str | None = None,
+        music_volume: float = 0.2,
+        on_progress: Callable[[float], None] | None = None,
+        prescaled: bool = False,
+        ass_path: str | None = None,
+    ) -> str:
+        movie_duration = probe_duration(movie_path)
+        duration = movie_duration + TAIL_PADDING
+        if srt_path:
+            subtitles_duration = get_srt_duration(srt_path)
+            if subtitles_duration > movie_duration:
+                raise ValueError("Subtitles duration exceeds video duration.")
+            duration = subtitles_duration + TAIL_PADDING
+
+        run_ffmpeg(
+            self.build_command(
+                output_path,
+                movie_path,
+                audio_path,
+                srt_path,
+                music_path,
+                music_volume,
+                duration,
+                prescaled,
+                ass_path,
+            ),
+            duration=duration,
+            on_progress=on_progress,
+        )
+        return output_path
+
+    def render_batch(
+        self,
+        movie_path: str,
+        variants: list[tuple],
+        new_output_path: Callable[[], str],
+        prescaled: bool = False,
+    ) -> Iterator[tuple[int, str | Exception]]:
+        movie_duration = probe_duration(movie_path)
+        valid, durations = [], []
+        for idx, (_, srt_path, *_) in enumerate(variants):
+            # Every output gets an explicit -t: with -shortest on one output
+            # of a shared graph its infinite apad leg buffers without bound
+            # while the other outputs hold the split video back.
+            if not srt_path:
+                valid.append(idx)
+                durations.append(movie_duration + TAIL_PADDING)
+                continue
+            subtitles_duration = get_srt_duration(srt_path)
+            if subtitles_duration > movie_duration:
+                yield (
+                    idx,
+                    ValueError("Subtitles duration exceeds video duration."),
+                )
+                continue
+            valid.append(idx)
+            durations.append(subtitles_duration + TAIL_PADDING)
+        if not valid:
+            return
+
+        output_paths = [new_output_path() for _ in valid]
+        try:
+            run_ffmpeg(
+                self.build_batch_command(
+                    movie_path,
+                    [variants[idx] for idx in valid],
+                    output_paths,
+                    durations,
+                    prescaled,
+                )
+            )
+        except Exception as e:
+            for idx, output_path in zip(valid, output_paths):
+                os.remove(output_path)
+                yield idx, e
+            return
+        yield from zip(valid, output_paths)
+
+    def build_remux_command(
+        self,
+        output_path: str,
+        video_path: str,
+        audio_path: str | None,
+        music_path: str | None,
+        music_volume: float,
+        duration: float,
+    ) -> list[str]:
+        args = ["-i", video_path]
+        audio_input = music_input = None
+        if audio_path:
+            args += ["-i", audio_path]
+            audio_input = 1
+        if music_path:
+            args += ["-i", music_path]
+            music_input = 2 if audio_path else 1
+
+        args += ["-map", "0:v"]
+        audio_graph = self._audio_filters(
+            audio_input, music_input, music_volume
+        )
+        if audio_graph:
+            args += [
+                "-filter_complex",
+                audio_graph,
+                "-map",
+                "[a]",
+                "-c:a",
+                DEFAULT_AUDIO_CODEC,
+                "-ar",
+                str(DEFAULT_AUDIO_FPS),
+                "-ac",
+                str(DEFAULT_AUDIO_CHANNELS),
+            ]
+        args += ["-c:v", "copy", "-t", f"{duration:.3f}", *FASTSTART_PARAMS]
+        args.append(output_path)
+        return args
+
+    def remux(
+        self,
+        output_path: str,
+        video_path: str,
+        audio_path: str | None = None,
+        music_path: str | None = None,
+        music_volume: float = 0.2,
+    ) -> str:
+        run_ffmpeg(
+            self.build_remux_command(
+                output_path,
+                video_path,
+                audio_path,
+                music_path,
+                music_volume,
+                probe_duration(video_path),
+            )
+        )
+        return output_path
+
+    def build_mezzanine_command(
+        self, output_path: str, movie_path: str
+    ) -> list[str]:
+        g = self.generator
+        # A short, fixed GOP keeps seeking into the mezzanine cheap for
+        # every reel cut from it later.
+        gop = str(max(1, round(g.fps * settings.MEZZANINE_KEYFRAME_SECONDS)))
+        return [
+            "-i",
+            movie_path,
+            "-an",
+            "-vf",
+            ",".join(
+                [*self._geometry_filters(), f"format={DEFAULT_PIXEL_FORMAT}"]
+            ),
+            "-c:v",
+            settings.MEZZANINE_CODEC,
+            "-crf",
+            str(settings.MEZZANINE_CRF),
+            "-g",
+            gop,
+            "-keyint_min",
+            gop,
+            "-sc_threshold",
+            "0",
+            "-movflags",
+            "+faststart",
+            output_path,
+        ]
+
+    def render_mezzanine(self, output_path: str, movie_path: str) -> str:
+        run_ffmpeg(self.build_mezzanine_command(output_path, movie_path))
+        return output_path
+
+    def _hls_variants(self) -> list[tuple[int, str]]:
+        # Renditions taller than the reel itself are left out.
+        height = self.generator.video_height
+        variants = []
+        for variant in settings.HLS_VARIANTS:
+            variant_height, _, bitrate = variant.partition(":")
+            if int(variant_height) <= height:
+                variants.append((int(variant_height), bitrate))
+        return variants or [(height, settings.HLS_VARIANTS[-1].split(":")[1])]
+
+    def build_hls_command(
+        self, output_dir: str, video_path: str, has_audio: bool
+    ) -> list[str]:
+        # All renditions from one decode. Keyframes land on every segment
+        # boundary, so each segment can be played on its own and a player
+        # can switch renditions between any two of them.
+        g = self.generator
+        variants = self._hls_variants()
+        gop = str(max(1, round(g.fps * settings.HLS_SEGMENT_SECONDS)))
+        graph = [
+            f"[0:v]split={len(variants)}"
+            + "".join(f"[s{idx}]" for idx in range(len(variants)))
+        ]
+        graph += [
+            f"[s{idx}]scale=-2:{height},format={DEFAULT_PIXEL_FORMAT}[v{idx}]"
+            for idx, (height, _) in enumerate(variants)
+        ]
+        args = ["-i", video_path, "-filter_complex", ";".join(graph)]
+        stream_map = []
+        for idx, (_, bitrate) in enumerate(variants):
+            args += ["-map", f"[v{idx}]"]
+            args += [f"-b:v:{idx}", bitrate, f"-maxrate:v:{idx}", bitrate]
+            if has_audio:
+                args += ["-map", "0:a"]
+            stream_map.append(f"v:{idx},a:{idx}" if has_audio else f"v:{idx}")
+        args += [
+            "-c:v",
+            settings.FFMPEG_CODEC,
+            "-r",
+            str(g.fps),
+            "-g",
+            gop,
+            "-keyint_min",
+            gop,
+            "-sc_threshold",
+            "0",
+        ]
+        if has_audio:
+            args += [
+                "-c:a",
+                HLS_AUDIO_CODEC,
+                "-b:a",
+                settings.HLS_AUDIO_BITRATE,
+            ]
+        if settings.FFMPEG_THREADS:
+            args += ["-threads", str(settings.FFMPEG_THREADS)]
+        args += [
+            "-f",
+            "hls",
+            "-hls_time",
+            str(settings.HLS_SEGMENT_SECONDS),
+            "-hls_playlist_type",
+            "vod",
+            "-hls_segment_type",
+            "fmp4",
+            "-hls_flags",
+            "independent_segments",
+            "-hls_segment_filename",
+            os.path.join(output_dir, "%v", "segment_%03d.m4s"),
+            "-master_pl_name",
+            HLS_PLAYLIST,
+            "-var_stream_map",
+            " ".join(stream_map),
+            os.path.join(output_dir, "%v", "index.m3u8"),
+        ]
+        return args
+
+    def package_hls(self, output_dir: str, video_path: str) -> str:
+        run_ffmpeg(
+            self.build_hls_command(
+                output_dir, video_path, probe_media(video_path).has_audio
+            )
+        )
+        return os.path.join(output_dir, HLS_PLAYLIST)
@@ -0,0 +1,140 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+
+import numpy as np
+from moviepy import ImageClip
+
+from app.core.config import settings
+
+
+@dataclass
+class Glyph:
+    rgb: np.ndarray
+    mask: np.ndarray
+    top: int
+    left: int
+    size: tuple[int, int]
+
+    @property
+    def nbytes(self) -> int:
+        return self.rgb.nbytes + self.mask.nbytes
+
+
+class GlyphCache:
+    # Keeps rendered subtitle bitmaps per worker process. Only the opaque
+    # bounding box is stored, the full-size clip is rebuilt on a hit, which
+    # is a couple of array copies instead of a text layout with stroke.
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._glyphs: OrderedDict[Hashable, Glyph] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _crop(self, clip) -> Glyph:
+        rgb = clip.get_frame(0)
+        if clip.mask is None:
+            mask = np.ones(rgb.shape[:2], dtype=np.float32)
+        else:
+            mask = clip.mask.get_frame(0)
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        if not len(rows):
+            top = left = 0
+            bottom = right = 0
+        else:
+            top, bottom = rows[0], rows[-1] + 1
+            left, right = cols[0], cols[-1] + 1
+        return Glyph(
+            rgb=rgb[top:bottom, left:right].copy(),
+            mask=mask[top:bottom, left:right].astype(np.float32),
+            top=int(top),
+            left=int(left),
+            size=mask.shape[:2],
+        )
+
+    def _build_clip(self, glyph: Glyph):
+        height, width = glyph.size
+        bottom = glyph.top + glyph.mask.shape[0]
+        right = glyph.left + glyph.mask.shape[1]
+        rgb = np.zeros((height, width, 3), dtype=glyph.rgb.dtype)
+        rgb[glyph.top : bottom, glyph.left : right] = glyph.rgb
+        mask = np.zeros((height, width), dtype=np.float64)
+        mask[glyph.top : bottom, glyph.left : right] = glyph.mask
+        return ImageClip(rgb).with_mask(ImageClip(mask, is_mask=True))
+
+    def _store(self, key: Hashable, glyph: Glyph):
+        if glyph.nbytes > self.max_bytes:
+            return
+        previous = self._glyphs.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.nbytes
+        self._glyphs[key] = glyph
+        self._bytes += glyph.nbytes
+        while self._bytes > self.max_bytes:
+            _, evicted = self._glyphs.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def get_or_render(self, key: Hashable, render: Callable[[], ImageClip]):
+        with self._lock:
+            glyph = self._glyphs.get(key)
+            if glyph is not None:
+                self._glyphs.move_to_end(key)
+                self.hits += 1
+        if glyph is not None:
+            return self._build_clip(glyph)
+
+        clip = render()
+        if clip.mask is None:
+            return clip
+        glyph = self._crop(clip)
+        with self._lock:
+            self.misses += 1
+            self._store(key, glyph)
+        return clip
+
+    def get_glyph(
+        self, key: Hashable, render: Callable[[], ImageClip]
+    ) -> Glyph:
+        # Bounding-box form for compositors that blend the bitmap
+        # themselves instead of going through a full-size clip.
+        with self._lock:
+            glyph = self._glyphs.get(key)
+            if glyph is not None:
+                self._glyphs.move_to_end(key)
+                self.hits += 1
+                return glyph
+
+        clip = render()
+        glyph = self._crop(clip)
+        clip.close()
+        with self._lock:
+            self.misses += 1
+            self._store(key, glyph)
+        return glyph
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._glyphs),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._glyphs.clear()
+            self._bytes = 0
+
+
+glyph_cache = GlyphCache(settings.GLYPH_CACHE_MAX_BYTES)
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO
+
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_PREFIX = "media_"
+
+
+class MediaHandle:
+    # A media asset on local disk. Code that needs the content gets the path
+    # or a stream, so an asset is written to disk once and never read into
+    # memory whole. Owned handles delete their file on close.
+    def __init__(self, path: str, owned: bool = False):
+        self.path = path
+        self.owned = owned
+        self._digest: str | None = None
+
+    @classmethod
+    def temporary(
+        cls,
+        suffix: str = "",
+        prefix: str = DEFAULT_PREFIX,
+        directory: str | None = None,
+    ) -> "MediaHandle":
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix=prefix, dir=directory)
+        os.close(fd)
+        return cls(path, owned=True)
+
+    @classmethod
+    def from_stream(
+        cls,
+        stream: BinaryIO,
+        suffix: str = "",
+        prefix: str = DEFAULT_PREFIX,
+        max_size: int | None = None,
+    ) -> "MediaHandle":
+        # Copies in bounded chunks and hashes on the way, so the content is
+        # never held in memory whole and never read back just for the digest.
+        media = cls.temporary(suffix, prefix)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(media.path, "wb") as f:
+                while chunk := stream.read(CHUNK_SIZE):
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise ValueError(f"File exceeds {max_size} bytes.")
+                    digest.update(chunk)
+                    f.write(chunk)
+        except Exception:
+            media.close()
+            raise
+        media._digest = digest.hexdigest()
+        return media
+
+    @classmethod
+    def from_bytes(
+        cls,
+        data: bytes | memoryview,
+        suffix: str = "",
+        prefix: str = DEFAULT_PREFIX,
+    ) -> "MediaHandle":
+        media = cls.temporary(suffix, prefix)
+        with open(media.path, "wb") as f:
+            f.write(data)
+        return media
+
+    @property
+    def suffix(self) -> str:
+        return os.path.splitext(self.path)[1]
+
+    @property
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def open(self) -> BinaryIO:
+        return open(self.path, "rb")
+
+    def digest(self) -> str:
+        if self._digest is None:
+            with self.open() as f:
+                self._digest = hashlib.file_digest(f, "sha256").hexdigest()
+        return self._digest
+
+    def assume_digest(self, digest: str) -> "MediaHandle":
+        # For content whose digest is already known, e.g. from its storage
+        # key, so a large file is not read back just to hash it.
+        self._digest = digest
+        return self
+
+    def release(self) -> "MediaHandle":
+        # Hands the file over to a new owner (e.g. a background task) that
+        # outlives this handle.
+        released = MediaHandle(self.path, owned=self.owned)
+        released._digest = self._digest
+        self.owned = False
+        return released
+
+    def close(self):
+        if self.owned and os.path.exists(self.path):
+            os.remove(self.path)
+        self.owned = False
+
+    def __fspath__(self) -> str:
+        return self.path
+
+    def __enter__(self) -> "MediaHandle":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -1,18 +1,73 @@
+import logging
 import os
+import shutil
 import tempfile
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
 
 from moviepy import AudioFileClip, CompositeVideoClip, TextClip, VideoFileClip
 from moviepy.audio.AudioClip import CompositeAudioClip
 from moviepy.audio.fx import AudioLoop
 from moviepy.video.tools.subtitles import SubtitlesClip
+from PIL import ImageFont
+from proglog import ProgressBarLogger
 
+from app.core import audio_mixer
+from app.core.compositor import SubtitleCompositor
 from app.core.config import settings
+from app.core.ffmpeg import probe_duration
+from app.core.ffmpeg_renderer import (
+    FASTSTART_PARAMS,
+    STROKE_WIDTH,
+    TAIL_PADDING,
+    FFmpegRenderer,
+    get_srt_duration,
+)
+from app.core.glyph_cache import glyph_cache
+from app.core.media import MediaHandle
+from app.core.segmented_render import render_segmented
 from app.models.reel_generator.color import Color
 from app.models.reel_generator.horizontal_align import HorizontalAlign
+from app.models.reel_generator.render_engine import RenderEngine
 from app.models.reel_generator.vertical_align import VerticalAlign
 
 DEFAULT_REELS_SUFFIX = ".mp4"
 
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RenderVariant:
+    audio: MediaHandle | None = None
+    srt: MediaHandle | None = None
+    music: MediaHandle | None = None
+    music_volume: float = 0.2
+    ass: MediaHandle | None = None
+
+
+def _path(media: MediaHandle | None) -> str | None:
+    return media.path if media is not None else None
+
+
+def _premixes(music_path: str | None) -> bool:
+    # Ducking only exists in the premix, asking for it forces one.
+    return bool(music_path) and (
+        settings.AUDIO_PREMIX_ENABLED or bool(settings.MUSIC_DUCKING_DB)
+    )
+
+
+class _ProgressLogger(ProgressBarLogger):
+    def __init__(self, on_progress: Callable[[float], None]):
+        super().__init__()
+        self.on_progress = on_progress
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        # Audio is written first ("chunk"), the frames bar is the long one.
+        if bar == "frame_index" and attr == "index":
+            total = self.bars[bar]["total"]
+            if total:
+                self.on_progress(min(value / total, 1.0))
+
 
 class ReelGenerator:
     def __init__(
@@ -29,6 +84,7 @@ class ReelGenerator:
         fps: int = 24,
         video_width: int = 1080,
         video_height: int = 1920,
+        engine: RenderEngine | None = None,
     ):
         self.fps = fps
         self.video_width = video_width
@@ -41,21 +97,64 @@ class ReelGenerator:
         self.vertical_align = vertical_align
         self.text_align = text_align
         self.font_path = self._resolve_font_path(font_filename, fonts_subdir)
+        self.font_name = ImageFont.truetype(self.font_path).getname()[0]
+        self.engine = engine or RenderEngine(settings.REEL_RENDER_ENGINE)
 
-    def _make_textclip(self, txt: str):
+    def render_params(self) -> dict:
+        return {
+            "font": os.path.basename(self.font_path),
+            "font_size": self.font_size,
+            "font_color": self.font_color.value,
+            "stroke_color": self.stroke_color.value,
+            "text_align": self.text_align.value,
+            "text_margin": self.text_margin,
+            "horizontal_align": self.horizontal_align.value,
+            "vertical_align": self.vertical_align.value,
+            "fps": self.fps,
+            "video_width": self.video_width,
+            "video_height": self.video_height,
+            "engine": self.engine.value,
+            "codec": settings.FFMPEG_CODEC,
+        }
+
+    def _render_textclip(self, txt: str):
         return TextClip(
             text=txt,
             font=self.font_path,
             font_size=self.font_size,
             color=self.font_color.value,
             method="caption",
-            stroke_width=4,
+            stroke_width=STROKE_WIDTH,
             size=(self.video_width, None),
             margin=(None, self.text_margin),
             stroke_color=self.stroke_color.value,
             text_align=self.text_align.value,
         )
 
+    def _glyph_key(self, txt: str) -> tuple:
+        # Word-level SRTs repeat the same few words over and over.
+        return (
+            txt,
+            self.font_path,
+            self.font_size,
+            self.font_color.value,
+            self.stroke_color.value,
+            STROKE_WIDTH,
+            self.video_width,
+            self.text_margin,
+            self.text_align.value,
+        )
+
+    def _make_textclip(self, txt: str):
+        return glyph_cache.get_or_render(
+            self._glyph_key(txt), lambda: self._render_textclip(txt)
+        )
+
+    def _make_glyph(self, txt: str):
+        return glyph_cache.get_glyph(
+            self._glyph_key(txt), lambda: self._render_textclip(txt)
+        )
+
     def _resolve_font_path(self, font_filename: str, fonts_subdir: str) -> str:
         base_dir = os.path.dirname(__file__)
         candidate = os.path.abspath(
@@ -67,47 +166,35 @@ class ReelGenerator:
             )
         return candidate
 
-    def _save_inputs(
-        self,
-        tmpdir: str,
-        movie_bytes: bytes,
-        audio_bytes: bytes | None,
-        srt_bytes: bytes | None,
-        music_bytes: bytes | None = None,
-    ):
-        movie_path = os.path.join(tmpdir, "input.mp4")
-        with open(movie_path, "wb") as f:
-            f.write(movie_bytes)
-
-        audio_path = None
-        if audio_bytes:
-            audio_path = os.path.join(tmpdir, "input.mp3")
-            with open(audio_path, "wb") as f:
-                f.write(audio_bytes)
-
-        srt_path = None
-        if srt_bytes:
-            srt_path = os.path.join(tmpdir, "input.srt")
-            with open(srt_path, "wb") as f:
-                f.write(srt_bytes)
-
-        music_path = None
-        if music_bytes:
-            music_path = os.path.join(tmpdir, "music.mp3")
-            with open(music_path, "wb") as f:
-                f.write(music_bytes)
-
-        return movie_path, audio_path, srt_path, music_path
-
-    def _load_video_clip(self, movie_path: str):
+    def _variant_paths(self, variant: RenderVariant) -> tuple:
+        return (
+            _path(variant.audio),
+            _path(variant.srt),
+            _path(variant.music),
+            variant.music_volume,
+            _path(variant.ass),
+        )
+
+    def _load_video_clip(self, movie_path: str, prescaled: bool = False):
         clip = VideoFileClip(
             movie_path
         ).without_audio()  # usuń oryginalny dźwięk
+        if prescaled:
+            return clip
         clip = clip.resized(height=self.video_height)
         clip = clip.cropped(x_center=clip.w / 2, width=self.video_width)
         return clip
 
-    def _load_subtitle_clips(self, srt_path: str | None, video_duration: float):
+    def _load_subtitle_clips(
+        self,
+        srt_path: str | None,
+        video_duration: float,
+        ass_path: str | None = None,
+    ):
+        if srt_path and ass_path:
+            # libass draws the captions while encoding, the SRT only sets
+            # the reel length.
+            return [], get_srt_duration(srt_path)
         if srt_path:
             subs = SubtitlesClip(
                 srt_path, make_textclip=self._make_textclip
@@ -120,6 +207,17 @@ class ReelGenerator:
     def _compose_final_clip(self, video_clip, subtitle_clips, final_duration):
         try:
             base_subclip = video_clip.subclipped(0, final_duration)
+            if not subtitle_clips:
+                # Nothing is drawn over the movie (or libass draws it while
+                # encoding), compositing would only copy every frame.
+                return base_subclip, base_subclip
+            if settings.SUBTITLE_COMPOSITOR_ENABLED:
+                compositor = SubtitleCompositor(
+                    subtitle_clips[0].subtitles,
+                    self._make_glyph,
+                    (self.horizontal_align.value, self.vertical_align.value),
+                )
+                return compositor.clip(base_subclip), base_subclip
             final_clip = CompositeVideoClip([base_subclip] + subtitle_clips)
             return final_clip, base_subclip
         except Exception as e:
@@ -145,23 +243,63 @@ class ReelGenerator:
                 )
 
             else:
-                background_music = background_music.subclip(0, clip.duration)
+                background_music = background_music.subclipped(0, clip.duration)
 
             final_audio = CompositeAudioClip([original_audio, background_music])
             return clip.with_audio(final_audio)
         except Exception as e:
             raise ValueError(f"Error adding background music: {e}")
 
-    def _write_output(self, final_clip):
+    def _premix_audio(
+        self,
+        duration: float,
+        audio_path: str | None,
+        music_path: str,
+        music_volume: float,
+    ) -> MediaHandle:
+        # One vectorized pass over the whole soundtrack instead of
+        # CompositeAudioClip/AudioLoop evaluating chunks during the encode.
+        premix = MediaHandle.temporary(".wav", prefix="premix_")
+        audio_mixer.write_mix(
+            premix.path,
+            duration,
+            audio_path,
+            music_path,
+            music_volume,
+            settings.MUSIC_DUCKING_DB,
+        )
+        return premix
+
+    def _new_output_path(self) -> str:
         with tempfile.NamedTemporaryFile(
             prefix="out_reel_", suffix=DEFAULT_REELS_SUFFIX, delete=False
         ) as tmp_out:
-            output_path = tmp_out.name
+            return tmp_out.name
+
+    def _burn_in_params(
+        self, ass_path: str | None, offset: float = 0
+    ) -> list[str] | None:
+        if not ass_path:
+            return None
+        return ["-vf", FFmpegRenderer(self).ass_filter(ass_path, offset)]
+
+    def _write_output(
+        self,
+        final_clip,
+        on_progress: Callable[[float], None] | None = None,
+        ass_path: str | None = None,
+    ):
+        output_path = self._new_output_path()
         final_clip.write_videofile(
             output_path,
             fps=self.fps,
             codec=settings.FFMPEG_CODEC,
             threads=settings.FFMPEG_THREADS,
+            ffmpeg_params=[
+                *(self._burn_in_params(ass_path) or []),
+                *FASTSTART_PARAMS,
+            ],
+            logger=_ProgressLogger(on_progress) if on_progress else "bar",
         )
         return output_path
 
@@ -170,38 +308,240 @@ class ReelGenerator:
             if clip:
                 clip.close()
 
-    def generate(
+    def _compose_video(
         self,
-        movie_bytes: bytes,
-        audio_bytes: bytes | None = None,
-        srt_bytes: bytes | None = None,
-        music_bytes: bytes | None = None,
-        music_volume: float = 0.2,
+        movie_path: str,
+        srt_path: str | None,
+        prescaled: bool = False,
+        ass_path: str | None = None,
+    ):
+        video_clip = self._load_video_clip(movie_path, prescaled)
+        subtitle_clips, final_duration = self._load_subtitle_clips(
+            srt_path, video_clip.duration, ass_path
+        )
+        if final_duration > video_clip.duration:
+            raise ValueError("Subtitles duration exceeds video duration.")
+        final_clip, base_subclip = self._compose_final_clip(
+            video_clip, subtitle_clips, final_duration + 1
+        )
+        return final_clip, [base_subclip, video_clip] + subtitle_clips
+
+    def _render_moviepy(
+        self,
+        movie_path: str,
+        audio_path: str | None,
+        srt_path: str | None,
+        music_path: str | None,
+        music_volume: float,
+        ass_path: str | None = None,
+        on_progress: Callable[[float], None] | None = None,
+        prescaled: bool = False,
     ) -> str:
-        with tempfile.TemporaryDirectory(prefix="reel_") as tmpdir:
-            movie_path, audio_path, srt_path, music_path = self._save_inputs(
-                tmpdir, movie_bytes, audio_bytes, srt_bytes, music_bytes
+        final_clip, clips = self._compose_video(
+            movie_path, srt_path, prescaled, ass_path
+        )
+        premix = None
+        if _premixes(music_path):
+            premix = self._premix_audio(
+                final_clip.duration, audio_path, music_path, music_volume
             )
-            video_clip = self._load_video_clip(movie_path)
-            subtitle_clips, final_duration = self._load_subtitle_clips(
-                srt_path, video_clip.duration
+            audio_path, music_path = premix.path, None
+        final_clip, audio_clip = self._attach_audio(final_clip, audio_path)
+        if music_path:
+            final_clip = self._add_background_music(
+                final_clip, music_path, music_volume
             )
-            if final_duration > video_clip.duration:
-                raise ValueError("Subtitles duration exceeds video duration.")
-            final_clip, base_subclip = self._compose_final_clip(
-                video_clip, subtitle_clips, final_duration + 1
+        if settings.RENDER_SEGMENTS > 1:
+            output_path = render_segmented(
+                self,
+                final_clip,
+                movie_path,
+                srt_path,
+                prescaled,
+                on_progress,
+                ass_path,
             )
-            final_clip, audio_clip = self._attach_audio(final_clip, audio_path)
-            if music_path:
-                final_clip = self._add_background_music(
-                    final_clip, music_path, music_volume
+        else:
+            output_path = self._write_output(final_clip, on_progress, ass_path)
+        self._cleanup([final_clip, audio_clip] + clips)
+        if premix is not None:
+            premix.close()
+        logger.info("Glyph cache: %s", glyph_cache.stats())
+        return output_path
+
+    def _render_ffmpeg(
+        self,
+        movie_path: str,
+        audio_path: str | None,
+        srt_path: str | None,
+        music_path: str | None,
+        music_volume: float,
+        ass_path: str | None = None,
+        on_progress: Callable[[float], None] | None = None,
+        prescaled: bool = False,
+    ) -> str:
+        premix = None
+        output_path = self._new_output_path()
+        try:
+            if music_path and settings.MUSIC_DUCKING_DB:
+                # amix has no ducking, the premix does it. Cut to length by
+                # the render's -t.
+                premix = self._premix_audio(
+                    probe_duration(movie_path) + TAIL_PADDING,
+                    audio_path,
+                    music_path,
+                    music_volume,
                 )
-            output_path = self._write_output(final_clip)
-            clips_to_close = [
-                final_clip,
-                base_subclip,
-                video_clip,
-                audio_clip,
-            ] + subtitle_clips
-            self._cleanup(clips_to_close)
-            return output_path
+                audio_path, music_path = premix.path, None
+            return FFmpegRenderer(self).render(
+                output_path,
+                movie_path,
+                audio_path,
+                srt_path,
+                music_path,
+                music_volume,
+                on_progress=on_progress,
+                prescaled=prescaled,
+                ass_path=ass_path,
+            )
+        except Exception:
+            os.remove(output_path)
+            raise
+        finally:
+            if premix is not None:
+                premix.close()
+
+    def remux(
+        self,
+        video: MediaHandle,
+        audio: MediaHandle | None = None,
+        music: MediaHandle | None = None,
+        music_volume: float = 0.2,
+    ) -> str:
+        # Keeps the encoded picture of an earlier render and only builds a
+        # new soundtrack for it, mixed the same way as a full render.
+        audio_path, music_path = _path(audio), _path(music)
+        premix = None
+        output_path = self._new_output_path()
+        try:
+            if _premixes(music_path):
+                premix = self._premix_audio(
+                    probe_duration(video.path),
+                    audio_path,
+                    music_path,
+                    music_volume,
+                )
+                audio_path, music_path = premix.path, None
+            return FFmpegRenderer(self).remux(
+                output_path, video.path, audio_path, music_path, music_volume
+            )
+        except Exception:
+            os.remove(output_path)
+            raise
+        finally:
+            if premix is not None:
+                premix.close()
+
+    def create_mezzanine(self, movie: MediaHandle) -> str:
+        output_path = self._new_output_path()
+        try:
+            return FFmpegRenderer(self).render_mezzanine(
+                output_path, movie.path
+            )
+        except Exception:
+            os.remove(output_path)
+            raise
+
+    def package_hls(self, video_path: str) -> str:
+        # Returns a temporary directory holding the master playlist, one
+        # playlist per rendition and their fMP4 segments.
+        output_dir = tempfile.mkdtemp(prefix="hls_")
+        try:
+            FFmpegRenderer(self).package_hls(output_dir, video_path)
+        except Exception:
+            shutil.rmtree(output_dir, ignore_errors=True)
+            raise
+        return output_dir
+
+    def generate(
+        self,
+        movie: MediaHandle,
+        audio: MediaHandle | None = None,
+        srt: MediaHandle | None = None,
+        music: MediaHandle | None = None,
+        music_volume: float = 0.2,
+        on_progress: Callable[[float], None] | None = None,
+        prescaled: bool = False,
+        ass: MediaHandle | None = None,
+    ) -> str:
+        # prescaled movies are mezzanines already cropped to the output size
+        # at the output fps, so the per-frame resize and crop are skipped.
+        render = (
+            self._render_ffmpeg
+            if self.engine == RenderEngine.FFmpeg
+            else self._render_moviepy
+        )
+        return render(
+            movie.path,
+            *self._variant_paths(
+                RenderVariant(audio, srt, music, music_volume, ass)
+            ),
+            on_progress=on_progress,
+            prescaled=prescaled,
+        )
+
+    def generate_batch(
+        self,
+        movie: MediaHandle,
+        variants: list[RenderVariant],
+        prescaled: bool = False,
+    ) -> Iterator[tuple[int, str | Exception]]:
+        # Yields (variant index, output path or the error it failed with) as
+        # each variant finishes. The base video is decoded and cropped once.
+        variant_paths = [self._variant_paths(v) for v in variants]
+        renderer = FFmpegRenderer(self)
+        if self.engine == RenderEngine.FFmpeg:
+            premixes = []
+            if settings.MUSIC_DUCKING_DB:
+                # Ducking as in _render_ffmpeg, through a premix per variant.
+                duration = probe_duration(movie.path) + TAIL_PADDING
+                for idx, paths in enumerate(variant_paths):
+                    audio_path, srt_path, music_path, volume, ass_path = paths
+                    if music_path:
+                        premix = self._premix_audio(
+                            duration, audio_path, music_path, volume
+                        )
+                        premixes.append(premix)
+                        variant_paths[idx] = (
+                            premix.path,
+                            srt_path,
+                            None,
+                            volume,
+                            ass_path,
+                        )
+            try:
+                yield from renderer.render_batch(
+                    movie.path,
+                    variant_paths,
+                    self._new_output_path,
+                    prescaled=prescaled,
+                )
+            finally:
+                for premix in premixes:
+                    premix.close()
+            return
+
+        with tempfile.TemporaryDirectory(prefix="reel_batch_") as tmpdir:
+            movie_path = movie.path
+            if not prescaled:
+                base_path = os.path.join(tmpdir, "base.mp4")
+                movie_path = renderer.render_mezzanine(base_path, movie_path)
+            for idx, paths in enumerate(variant_paths):
+                try:
+                    output_path = self._render_moviepy(
+                        movie_path, *paths, prescaled=True
+                    )
+                except Exception as e:
+                    yield idx, e
+                else:
+                    yield idx, output_path
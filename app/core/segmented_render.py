@@ -0,0 +1,170 @@
+import functools
+import multiprocessing
+import os
+import tempfile
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import TYPE_CHECKING
+
+import numpy as np
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+from app.core.config import settings
+from app.core.ffmpeg import run_ffmpeg
+from app.core.ffmpeg_renderer import (
+    DEFAULT_AUDIO_CODEC,
+    DEFAULT_AUDIO_FPS,
+    FASTSTART_PARAMS,
+)
+
+if TYPE_CHECKING:
+    from app.core.reel_generator import ReelGenerator
+
+
+@functools.cache
+def _get_executor() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=settings.RENDER_SEGMENT_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def segment_bounds(
+    total_frames: int, segments: int, keyframe_interval: int
+) -> list[tuple[int, int]]:
+    # Split points land on multiples of the keyframe interval, which are the
+    # source keyframes when rendering from a mezzanine, so every segment
+    # starts with a cheap seek. Each encoded segment opens with its own IDR
+    # frame, which is what lets the concat demuxer join them by stream copy.
+    keyframe_interval = max(1, keyframe_interval)
+    groups = -(-total_frames // keyframe_interval)
+    segments = max(1, min(segments, groups))
+    bounds = []
+    for idx in range(segments):
+        start = groups * idx // segments * keyframe_interval
+        end = min(
+            groups * (idx + 1) // segments * keyframe_interval, total_frames
+        )
+        bounds.append((start, end))
+    return bounds
+
+
+def _render_segment(
+    generator: "ReelGenerator",
+    movie_path: str,
+    srt_path: str | None,
+    prescaled: bool,
+    start_frame: int,
+    end_frame: int,
+    output_path: str,
+    ass_path: str | None = None,
+) -> str:
+    final_clip, clips = generator._compose_video(
+        movie_path, srt_path, prescaled, ass_path
+    )
+    try:
+        # Same frame times as Clip.iter_frames uses for the serial write, so
+        # the joined segments hold exactly the frames a single pass would.
+        with FFMPEG_VideoWriter(
+            output_path,
+            final_clip.size,
+            generator.fps,
+            codec=settings.FFMPEG_CODEC,
+            with_mask=final_clip.mask is not None,
+            threads=settings.FFMPEG_THREADS,
+            ffmpeg_params=generator._burn_in_params(
+                ass_path, start_frame / generator.fps
+            ),
+        ) as writer:
+            for frame_index in range(start_frame, end_frame):
+                t = frame_index / generator.fps
+                frame = final_clip.get_frame(t).astype("uint8")
+                if final_clip.mask is not None:
+                    mask = (255 * final_clip.mask.get_frame(t)).astype("uint8")
+                    frame = np.dstack([frame, mask])
+                writer.write_frame(frame)
+    finally:
+        generator._cleanup([final_clip] + clips)
+    return output_path
+
+
+def render_segmented(
+    generator: "ReelGenerator",
+    final_clip,
+    movie_path: str,
+    srt_path: str | None,
+    prescaled: bool = False,
+    on_progress: Callable[[float], None] | None = None,
+    ass_path: str | None = None,
+) -> str:
+    fps = generator.fps
+    total_frames = int(final_clip.duration * fps)
+    keyframe_interval = round(fps * settings.MEZZANINE_KEYFRAME_SECONDS)
+    bounds = segment_bounds(
+        total_frames, settings.RENDER_SEGMENTS, keyframe_interval
+    )
+
+    output_path = generator._new_output_path()
+    with tempfile.TemporaryDirectory(prefix="segments_") as tmpdir:
+        segment_paths = [
+            os.path.join(tmpdir, f"segment_{idx:04d}.mp4")
+            for idx in range(len(bounds))
+        ]
+        futures = [
+            _get_executor().submit(
+                _render_segment,
+                generator,
+                movie_path,
+                srt_path,
+                prescaled,
+                start,
+                end,
+                segment_path,
+                ass_path,
+            )
+            for (start, end), segment_path in zip(bounds, segment_paths)
+        ]
+
+        # The soundtrack is mixed once for the whole timeline while the
+        # segments render; slicing it would add encoder padding at every
+        # join.
+        audio_path = None
+        try:
+            if final_clip.audio is not None:
+                audio_path = os.path.join(tmpdir, "audio.mp3")
+                final_clip.audio.write_audiofile(
+                    audio_path,
+                    DEFAULT_AUDIO_FPS,
+                    codec=DEFAULT_AUDIO_CODEC,
+                    logger=None,
+                )
+            for done, future in enumerate(as_completed(futures), start=1):
+                future.result()
+                if on_progress:
+                    on_progress(done / len(futures))
+        except Exception:
+            for future in futures:
+                future.cancel()
+            os.remove(output_path)
+            raise
+
+        list_path = os.path.join(tmpdir, "segments.txt")
+        with open(list_path, "w") as f:
+            f.writelines(f"file '{path}'\n" for path in segment_paths)
+
+        args = ["-f", "concat", "-safe", "0", "-i", list_path]
+        if audio_path:
+            args += ["-i", audio_path, "-map", "0:v", "-map", "1:a"]
+        args += ["-c", "copy", "-frames:v", str(total_frames)]
+        args += [*FASTSTART_PARAMS, output_path]
+        try:
+            run_ffmpeg(args)
+        except Exception:
+            os.remove(output_path)
+            raise
+    return output_path
+
+
+def shutdown():
+    if _get_executor.cache_info().currsize:
+        _get_executor().shutdown(wait=False, cancel_futures=True)
@@ -1,53 +1,383 @@
+import os
+import tempfile
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import BinaryIO, Protocol
+
 from supabase import Client, create_client
 
 from app.core.config import settings
+from app.core.media import CHUNK_SIZE, MediaHandle
+from app.core.storage.cache import CachedStorageBackend
+from app.core.storage.client import AsyncStorageClient, iter_sync, run_sync
+from app.models.storage.storage_backend import StorageBackendKind
+
+
+@dataclass
+class StorageObject:
+    key: str
+    size: int
+    updated_at: datetime
+    etag: str | None = None
+
+
+# Content-addressed objects live under this prefix. Their keys are derived
+# from the SHA-256 of the content, so an object there never changes.
+BLOB_PREFIX = "blobs/"
+
+
+class StorageBackend(Protocol):
+    def upload_file(
+        self, file: bytes | MediaHandle, dest_path: str, overwrite: bool = True
+    ) -> str: ...
+
+    def upload_files(
+        self, files: list[tuple[bytes | MediaHandle, str]]
+    ) -> list[str]: ...
+
+    def copy_file(
+        self, src_path: str, dest_path: str, overwrite: bool = True
+    ) -> str: ...
+
+    def public_url(self, dest_path: str) -> str: ...
+
+    def download_file(self, file_path: str) -> bytes: ...
+
+    def download_to(
+        self, file_path: str, suffix: str | None = None
+    ) -> MediaHandle: ...
+
+    def download_many(self, file_paths: list[str]) -> list[MediaHandle]: ...
+
+    def stream(
+        self, file_path: str, start: int = 0, end: int | None = None
+    ) -> Iterator[bytes]: ...
+
+    def exists(self, file_path: str) -> bool: ...
+
+    def etag(self, file_path: str) -> str | None: ...
+
+    def stat(self, file_path: str) -> StorageObject | None: ...
+
+    def list_files(self, prefix: str = "") -> list[StorageObject]: ...
+
+    def delete_file(self, file_path: str): ...
+
+    def delete_files(self, file_paths: list[str]): ...
+
+
+def _sendfile(src_path: str, dest: BinaryIO):
+    # The bytes are copied by the kernel and never pass through Python.
+    with open(src_path, "rb") as src:
+        size = os.fstat(src.fileno()).st_size
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(
+                dest.fileno(), src.fileno(), offset, size - offset
+            )
+            if not sent:
+                break
+            offset += sent
+
+
+def _download_error(file_path: str, e: Exception) -> Exception:
+    return Exception(f"Error downloading file from path '{file_path}': {e}")
 
 
 class SupabaseStorageBackend:
+    # Transfers go through the pooled async client, these sync methods wait
+    # on it for the existing callers.
     def __init__(self, bucket: str, supabase_url: str, supabase_key: str):
         self.supabase_url: str = supabase_url
         self.bucket: str = bucket
         self.client: Client = create_client(supabase_url, supabase_key)
+        self.async_client = AsyncStorageClient(
+            bucket,
+            supabase_url,
+            supabase_key,
+            max_concurrency=settings.STORAGE_CONCURRENCY,
+            timeout=settings.STORAGE_TIMEOUT,
+        )
 
     def upload_file(
-        self, file: bytes, dest_path: str, overwrite: bool = True
+        self, file: bytes | MediaHandle, dest_path: str, overwrite: bool = True
     ) -> str:
-        if overwrite:
-            try:
-                self.client.storage.from_(self.bucket).remove(dest_path)
-            except Exception:
-                pass
-
-        self.client.storage.from_(self.bucket).upload(
-            path=dest_path,
-            file=file,
-            file_options={"content_type": "auto"},
-        )
+        run_sync(self.async_client.upload(file, dest_path, upsert=overwrite))
+        return self.public_url(dest_path)
 
-        public_url = (
+    def upload_files(
+        self, files: list[tuple[bytes | MediaHandle, str]]
+    ) -> list[str]:
+        run_sync(self.async_client.upload_many(files))
+        return [self.public_url(dest_path) for _, dest_path in files]
+
+    def copy_file(
+        self, src_path: str, dest_path: str, overwrite: bool = True
+    ) -> str:
+        run_sync(self.async_client.copy(src_path, dest_path, upsert=overwrite))
+        return self.public_url(dest_path)
+
+    def public_url(self, dest_path: str) -> str:
+        return (
             f"{self.supabase_url}/storage/v1/object/public/"
             f"{self.bucket}//{dest_path}"
         )
-        return public_url
 
     def download_file(self, file_path: str) -> bytes:
+        with self.download_to(file_path) as media, media.open() as f:
+            return f.read()
+
+    def download_to(
+        self, file_path: str, suffix: str | None = None
+    ) -> MediaHandle:
+        return run_sync(self.async_client.download_to(file_path, suffix))
+
+    def download_many(self, file_paths: list[str]) -> list[MediaHandle]:
+        return run_sync(self.async_client.download_many(file_paths))
+
+    def stream(
+        self, file_path: str, start: int = 0, end: int | None = None
+    ) -> Iterator[bytes]:
+        # end is inclusive, like the HTTP Range header.
         try:
-            return self.client.storage.from_(self.bucket).download(file_path)
+            yield from iter_sync(
+                self.async_client.stream(file_path, start, end)
+            )
         except Exception as e:
-            raise Exception(
-                f"Error downloading file from path '{file_path}': {e}"
+            raise _download_error(file_path, e)
+
+    def exists(self, file_path: str) -> bool:
+        return self.etag(file_path) is not None
+
+    def etag(self, file_path: str) -> str | None:
+        return run_sync(self.async_client.etag(file_path))
+
+    def stat(self, file_path: str) -> StorageObject | None:
+        headers = run_sync(self.async_client.head(file_path))
+        if headers is None:
+            return None
+        last_modified = headers.get("last-modified")
+        return StorageObject(
+            key=file_path,
+            size=int(headers.get("content-length", 0)),
+            updated_at=(
+                parsedate_to_datetime(last_modified)
+                .astimezone(UTC)
+                .replace(tzinfo=None)
+                if last_modified
+                else datetime.utcnow()
+            ),
+            etag=headers.get("etag"),
+        )
+
+    def list_files(self, prefix: str = "") -> list[StorageObject]:
+        return [
+            StorageObject(
+                key=entry["key"],
+                size=(entry.get("metadata") or {}).get("size", 0),
+                updated_at=datetime.fromisoformat(
+                    entry["updated_at"].replace("Z", "+00:00")
+                )
+                .astimezone(UTC)
+                .replace(tzinfo=None),
             )
+            for entry in run_sync(self.async_client.list_objects(prefix))
+        ]
 
     def delete_file(self, file_path: str):
-        self.client.storage.from_(self.bucket).remove(file_path)
+        self.delete_files([file_path])
+
+    def delete_files(self, file_paths: list[str]):
+        if file_paths:
+            run_sync(self.async_client.delete(file_paths))
+
 
+class LocalStorageBackend:
+    # Objects are plain files below root. Writes go to a temporary file in
+    # the target directory and are renamed into place, so readers never
+    # see a partial object.
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(self.root, exist_ok=True)
 
-storage = SupabaseStorageBackend(
-    bucket=settings.BUCKET,
-    supabase_url=settings.SUPABASE_URL,
-    supabase_key=settings.SUPABASE_KEY,
-)
+    def local_path(self, file_path: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, file_path))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise ValueError(f"Invalid storage path '{file_path}'.")
+        return path
 
+    def _write_atomic(
+        self, dest_path: str, write: Callable[[BinaryIO], object]
+    ):
+        path = self.local_path(dest_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=".upload_", dir=os.path.dirname(path)
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def upload_file(
+        self, file: bytes | MediaHandle, dest_path: str, overwrite: bool = True
+    ) -> str:
+        if not overwrite and self.exists(dest_path):
+            raise FileExistsError(f"'{dest_path}' already exists.")
+        if isinstance(file, MediaHandle):
+            self._write_atomic(dest_path, lambda f: _sendfile(file.path, f))
+        else:
+            self._write_atomic(dest_path, lambda f: f.write(file))
+        return self.public_url(dest_path)
 
-def get_supabase_storage():
-    return storage
+    def upload_files(
+        self, files: list[tuple[bytes | MediaHandle, str]]
+    ) -> list[str]:
+        return [self.upload_file(file, dest_path) for file, dest_path in files]
+
+    def copy_file(
+        self, src_path: str, dest_path: str, overwrite: bool = True
+    ) -> str:
+        if not overwrite and self.exists(dest_path):
+            raise FileExistsError(f"'{dest_path}' already exists.")
+        src = self.local_path(src_path)
+        self._write_atomic(dest_path, lambda f: _sendfile(src, f))
+        return self.public_url(dest_path)
+
+    def public_url(self, dest_path: str) -> str:
+        # Same "//" separator as Supabase URLs, callers take the object key
+        # from after it.
+        return f"{self.base_url}//{dest_path}"
+
+    def download_file(self, file_path: str) -> bytes:
+        try:
+            with open(self.local_path(file_path), "rb") as f:
+                return f.read()
+        except Exception as e:
+            raise _download_error(file_path, e)
+
+    def download_to(
+        self, file_path: str, suffix: str | None = None
+    ) -> MediaHandle:
+        if suffix is None:
+            suffix = os.path.splitext(file_path)[1]
+        media = MediaHandle.temporary(suffix)
+        try:
+            with open(media.path, "wb") as f:
+                _sendfile(self.local_path(file_path), f)
+        except Exception as e:
+            media.close()
+            raise _download_error(file_path, e)
+        return media
+
+    def download_many(self, file_paths: list[str]) -> list[MediaHandle]:
+        media = []
+        try:
+            for file_path in file_paths:
+                media.append(self.download_to(file_path))
+        except Exception:
+            for handle in media:
+                handle.close()
+            raise
+        return media
+
+    def stream(
+        self, file_path: str, start: int = 0, end: int | None = None
+    ) -> Iterator[bytes]:
+        try:
+            f = open(self.local_path(file_path), "rb")
+        except Exception as e:
+            raise _download_error(file_path, e)
+        with f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                size = CHUNK_SIZE if remaining is None else remaining
+                chunk = f.read(min(size, CHUNK_SIZE))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def exists(self, file_path: str) -> bool:
+        return os.path.isfile(self.local_path(file_path))
+
+    def etag(self, file_path: str) -> str | None:
+        obj = self.stat(file_path)
+        return None if obj is None else obj.etag
+
+    def stat(self, file_path: str) -> StorageObject | None:
+        try:
+            stat = os.stat(self.local_path(file_path))
+        except OSError:
+            return None
+        return StorageObject(
+            key=file_path,
+            size=stat.st_size,
+            updated_at=datetime.utcfromtimestamp(stat.st_mtime),
+            # Objects are only ever replaced by a rename, which changes
+            # mtime.
+            etag=f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+        )
+
+    def list_files(self, prefix: str = "") -> list[StorageObject]:
+        objects = []
+        for directory, _, names in os.walk(self.local_path(prefix)):
+            for name in names:
+                # Writes still in progress.
+                if name.startswith(".upload_"):
+                    continue
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+                objects.append(
+                    StorageObject(
+                        key=os.path.relpath(path, self.root).replace(
+                            os.sep, "/"
+                        ),
+                        size=stat.st_size,
+                        updated_at=datetime.utcfromtimestamp(stat.st_mtime),
+                    )
+                )
+        return objects
+
+    def delete_file(self, file_path: str):
+        path = self.local_path(file_path)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def delete_files(self, file_paths: list[str]):
+        for file_path in file_paths:
+            self.delete_file(file_path)
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+    # Built on first use rather than at import, so importing the app does
+    # not need storage credentials.
+    if StorageBackendKind(settings.STORAGE_BACKEND) == StorageBackendKind.Local:
+        return LocalStorageBackend(
+            settings.LOCAL_STORAGE_ROOT, settings.LOCAL_STORAGE_URL
+        )
+    backend = SupabaseStorageBackend(
+        bucket=settings.BUCKET,
+        supabase_url=settings.SUPABASE_URL,
+        supabase_key=settings.SUPABASE_KEY,
+    )
+    # Local objects are already on disk, only remote ones are cached.
+    if not settings.STORAGE_CACHE_ENABLED:
+        return backend
+    return CachedStorageBackend(
+        backend,
+        settings.STORAGE_CACHE_DIR,
+        settings.STORAGE_CACHE_MAX_BYTES,
+        immutable_prefixes=(BLOB_PREFIX,),
+    )
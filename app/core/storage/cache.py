@@ -0,0 +1,332 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from app.core.config import settings
+from app.core.media import MediaHandle
+
+if TYPE_CHECKING:
+    from app.core.storage.backends import StorageBackend, StorageObject
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    path: str
+    etag: str
+    size: int
+
+
+class CachedStorageBackend:
+    # Read-through disk cache in front of another backend. Objects are kept
+    # under root by the hash of their key with a JSON sidecar holding the
+    # ETag they were fetched at; a hit is only served while the backend still
+    # reports that ETag, except under immutable_prefixes, whose objects never
+    # change. The index and byte count are per process, the files and the
+    # per-key fill locks are shared by every process using root.
+    def __init__(
+        self,
+        backend: "StorageBackend",
+        root: str,
+        max_bytes: int,
+        immutable_prefixes: tuple[str, ...] = (),
+    ):
+        self.backend = backend
+        self.immutable_prefixes = immutable_prefixes
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self._objects = os.path.join(self.root, "objects")
+        self._locks = os.path.join(self.root, "locks")
+        self._tmp = os.path.join(self.root, "tmp")
+        for directory in (self._objects, self._locks, self._tmp):
+            os.makedirs(directory, exist_ok=True)
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def _name(self, key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _data_path(self, key: str) -> str:
+        return os.path.join(self._objects, self._name(key))
+
+    def _read_entry(self, key: str) -> CacheEntry | None:
+        path = self._data_path(key)
+        try:
+            with open(f"{path}.json") as f:
+                meta = json.load(f)
+            size = os.path.getsize(path)
+        except (OSError, ValueError):
+            return None
+        if meta.get("key") != key or meta.get("size") != size:
+            return None
+        return CacheEntry(path=path, etag=meta["etag"], size=size)
+
+    def _load(self):
+        # Least recently used first, hits touch the data file.
+        found = []
+        for name in os.listdir(self._objects):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self._objects, name)) as f:
+                    key = json.load(f)["key"]
+            except (OSError, ValueError, KeyError):
+                continue
+            entry = self._read_entry(key)
+            if entry is not None:
+                found.append((os.path.getmtime(entry.path), key, entry))
+        for _, key, entry in sorted(found, key=lambda item: item[0]):
+            self._entries[key] = entry
+            self._bytes += entry.size
+        with self._lock:
+            self._evict()
+
+    @contextmanager
+    def _fill_lock(self, key: str) -> Iterator[None]:
+        # flock conflicts between separate open() calls, so this also keeps
+        # two threads of one process from fetching the same key.
+        path = os.path.join(self._locks, f"{self._name(key)}.lock")
+        with open(path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+        path = self._data_path(key)
+        for stale in (f"{path}.json", path):
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            # The key's fill lock stays: another process may hold it or be
+            # about to open it, and a new file at that path would not
+            # conflict with its lock.
+            self._remove(key)
+            self.evictions += 1
+
+    def _checkout(
+        self, key: str, etag: str | None, suffix: str
+    ) -> MediaHandle | None:
+        # Hands out a hard link to the cached file, which stays readable for
+        # the caller even if the entry is evicted meanwhile. A None etag
+        # accepts any cached version.
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or etag not in (None, entry.etag):
+                # Possibly filled by another process.
+                entry = self._read_entry(key)
+                if entry is None or etag not in (None, entry.etag):
+                    return None
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self._bytes -= previous.size
+                self._entries[key] = entry
+                self._bytes += entry.size
+            media = MediaHandle.temporary(suffix, directory=self._tmp)
+            os.remove(media.path)
+            try:
+                os.link(entry.path, media.path)
+            except FileNotFoundError:
+                self._entries.pop(key, None)
+                self._bytes -= entry.size
+                return None
+            except OSError:
+                shutil.copyfile(entry.path, media.path)
+            os.utime(entry.path)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return media
+
+    def _store(self, key: str, etag: str, media: MediaHandle):
+        size = media.size
+        if size > self.max_bytes:
+            return
+        path = self._data_path(key)
+        part = f"{path}.{uuid.uuid4().hex}.part"
+        try:
+            os.link(media.path, part)
+        except OSError:
+            shutil.copyfile(media.path, part)
+        with self._lock:
+            self._remove(key)
+            os.replace(part, path)
+            with open(f"{part}.json", "w") as f:
+                json.dump({"key": key, "etag": etag, "size": size}, f)
+            os.replace(f"{part}.json", f"{path}.json")
+            self._entries[key] = CacheEntry(path=path, etag=etag, size=size)
+            self._bytes += size
+            self._evict()
+
+    def _invalidate(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def _fetch(self, file_path: str, suffix: str) -> MediaHandle:
+        if file_path.startswith(self.immutable_prefixes):
+            # No round trip to revalidate what cannot change.
+            media = self._checkout(file_path, None, suffix)
+            if media is not None:
+                return media
+        # The ETag is read before the body, so an object replaced during the
+        # download is stored under the older tag and refetched next time.
+        etag = self.backend.etag(file_path)
+        if etag is None:
+            return self.backend.download_to(file_path, suffix)
+        media = self._checkout(file_path, etag, suffix)
+        if media is not None:
+            return media
+        with self._fill_lock(file_path):
+            media = self._checkout(file_path, etag, suffix)
+            if media is not None:
+                return media
+            with self._lock:
+                self.misses += 1
+            media = MediaHandle.temporary(suffix, directory=self._tmp)
+            try:
+                with open(media.path, "wb") as f:
+                    for chunk in self.backend.stream(file_path):
+                        f.write(chunk)
+                self._store(file_path, etag, media)
+            except Exception:
+                media.close()
+                raise
+            return media
+
+    def upload_file(
+        self, file: bytes | MediaHandle, dest_path: str, overwrite: bool = True
+    ) -> str:
+        self._invalidate(dest_path)
+        url = self.backend.upload_file(file, dest_path, overwrite)
+        self._write_through(file, dest_path)
+        return url
+
+    def upload_files(
+        self, files: list[tuple[bytes | MediaHandle, str]]
+    ) -> list[str]:
+        for _, dest_path in files:
+            self._invalidate(dest_path)
+        urls = self.backend.upload_files(files)
+        for file, dest_path in files:
+            self._write_through(file, dest_path)
+        return urls
+
+    def _write_through(self, file: bytes | MediaHandle, dest_path: str):
+        # The uploader is usually the next reader. The upload itself already
+        # succeeded, failing to cache it only costs a download later.
+        try:
+            etag = self.backend.etag(dest_path)
+        except Exception:
+            logger.warning("Could not cache upload '%s'", dest_path)
+            return
+        if etag is None:
+            return
+        if isinstance(file, MediaHandle):
+            self._store(dest_path, etag, file)
+            return
+        with MediaHandle.temporary(directory=self._tmp) as media:
+            with open(media.path, "wb") as f:
+                f.write(file)
+            self._store(dest_path, etag, media)
+
+    def copy_file(
+        self, src_path: str, dest_path: str, overwrite: bool = True
+    ) -> str:
+        self._invalidate(dest_path)
+        return self.backend.copy_file(src_path, dest_path, overwrite)
+
+    def public_url(self, dest_path: str) -> str:
+        return self.backend.public_url(dest_path)
+
+    def download_file(self, file_path: str) -> bytes:
+        with self.download_to(file_path) as media, media.open() as f:
+            return f.read()
+
+    def download_to(
+        self, file_path: str, suffix: str | None = None
+    ) -> MediaHandle:
+        if suffix is None:
+            suffix = os.path.splitext(file_path)[1]
+        return self._fetch(file_path, suffix)
+
+    def download_many(self, file_paths: list[str]) -> list[MediaHandle]:
+        # Hits are served from disk, misses go to the backend side by side.
+        if not file_paths:
+            return []
+        workers = min(len(file_paths), settings.STORAGE_CONCURRENCY)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self.download_to, p) for p in file_paths]
+        errors = [f.exception() for f in futures if f.exception()]
+        if errors:
+            for future in futures:
+                if future.exception() is None:
+                    future.result().close()
+            raise errors[0]
+        return [future.result() for future in futures]
+
+    def stream(
+        self, file_path: str, start: int = 0, end: int | None = None
+    ) -> Iterator[bytes]:
+        return self.backend.stream(file_path, start, end)
+
+    def exists(self, file_path: str) -> bool:
+        return self.backend.exists(file_path)
+
+    def etag(self, file_path: str) -> str | None:
+        return self.backend.etag(file_path)
+
+    def stat(self, file_path: str) -> "StorageObject | None":
+        return self.backend.stat(file_path)
+
+    def list_files(self, prefix: str = "") -> list["StorageObject"]:
+        return self.backend.list_files(prefix)
+
+    def delete_file(self, file_path: str):
+        self._invalidate(file_path)
+        self.backend.delete_file(file_path)
+
+    def delete_files(self, file_paths: list[str]):
+        for file_path in file_paths:
+            self._invalidate(file_path)
+        self.backend.delete_files(file_paths)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
@@ -0,0 +1,281 @@
+import asyncio
+import mimetypes
+import os
+import threading
+from collections.abc import AsyncGenerator, AsyncIterator, Coroutine, Iterator
+from typing import TypeVar
+
+import httpx
+
+from app.core.media import CHUNK_SIZE, MediaHandle
+
+T = TypeVar("T")
+
+LIST_PAGE_SIZE = 1000
+# Signed URLs are fetched right before use, they only need to outlive the
+# request that reads them.
+SIGNED_URL_SECONDS = 60
+# Storage answers a missing object with 400 in older releases, 404 in
+# newer ones.
+NOT_FOUND_STATUSES = (400, 404)
+
+# Missing from some mimetypes tables, HLS players check them.
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("video/iso.segment", ".m4s")
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="storage-io", daemon=True
+            ).start()
+        return _loop
+
+
+def run_sync(coro: Coroutine[object, object, T]) -> T:
+    # All transfers of a process run on one background loop, so the sync
+    # callers on worker threads share its connection pool.
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+
+def iter_sync(chunks: AsyncGenerator[T, None]) -> Iterator[T]:
+    # Pulls an async generator from sync code, one item per round trip to
+    # the background loop. Closing the iterator closes the generator there.
+    done = object()
+
+    async def next_chunk():
+        return await anext(chunks, done)
+
+    try:
+        while (chunk := run_sync(next_chunk())) is not done:
+            yield chunk
+    finally:
+        run_sync(chunks.aclose())
+
+
+async def _file_chunks(path: str) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while chunk := await asyncio.to_thread(f.read, CHUNK_SIZE):
+            yield chunk
+
+
+def _content_type(path: str) -> str:
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+class AsyncStorageClient:
+    # Talks to the Supabase Storage REST API over one keep-alive connection
+    # pool. At most max_concurrency transfers are in flight at a time.
+    def __init__(
+        self,
+        bucket: str,
+        supabase_url: str,
+        supabase_key: str,
+        max_concurrency: int,
+        timeout: float,
+    ):
+        self.bucket = bucket
+        self.base_url = f"{supabase_url}/storage/v1/"
+        self.headers = {
+            "apikey": supabase_key,
+            "Authorization": f"Bearer {supabase_key}",
+        }
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._client: httpx.AsyncClient | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created on first use so it is bound to the loop it runs on.
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                # Requests queue on the semaphore or the pool, a long
+                # transfer ahead of them is not a timeout.
+                timeout=httpx.Timeout(self.timeout, pool=None),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def _object_url(self, path: str) -> str:
+        return f"object/{self.bucket}/{path}"
+
+    async def upload(
+        self, file: bytes | MediaHandle, dest_path: str, upsert: bool = True
+    ):
+        # x-upsert replaces an existing object in the same request, instead
+        # of a remove before every upload.
+        headers = {
+            "Content-Type": _content_type(dest_path),
+            "Cache-Control": "max-age=3600",
+            "x-upsert": "true" if upsert else "false",
+        }
+        if isinstance(file, MediaHandle):
+            headers["Content-Length"] = str(file.size)
+            content = _file_chunks(file.path)
+        else:
+            content = file
+        client = self.client
+        async with self._semaphore:
+            response = await client.post(
+                self._object_url(dest_path), content=content, headers=headers
+            )
+        if response.is_error:
+            raise Exception(
+                f"Error uploading file to path '{dest_path}': "
+                f"{response.status_code} {response.text}"
+            )
+
+    async def upload_many(
+        self, files: list[tuple[bytes | MediaHandle, str]], upsert: bool = True
+    ):
+        await asyncio.gather(
+            *(self.upload(file, dest, upsert) for file, dest in files)
+        )
+
+    async def copy(self, src_path: str, dest_path: str, upsert: bool = True):
+        # The copy endpoint has no upsert, the destination is removed first.
+        if upsert:
+            await self.delete([dest_path])
+        client = self.client
+        async with self._semaphore:
+            response = await client.post(
+                "object/copy",
+                json={
+                    "bucketId": self.bucket,
+                    "sourceKey": src_path,
+                    "destinationKey": dest_path,
+                },
+            )
+        response.raise_for_status()
+
+    async def download_to(
+        self, file_path: str, suffix: str | None = None
+    ) -> MediaHandle:
+        if suffix is None:
+            suffix = os.path.splitext(file_path)[1]
+        media = MediaHandle.temporary(suffix)
+        client = self.client
+        try:
+            async with self._semaphore:
+                async with client.stream(
+                    "GET", self._object_url(file_path)
+                ) as response:
+                    response.raise_for_status()
+                    with open(media.path, "wb") as f:
+                        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                            await asyncio.to_thread(f.write, chunk)
+        except Exception as e:
+            media.close()
+            raise Exception(
+                f"Error downloading file from path '{file_path}': {e}"
+            )
+        except BaseException:
+            media.close()
+            raise
+        return media
+
+    async def signed_url(
+        self, file_path: str, expires_in: int = SIGNED_URL_SECONDS
+    ) -> str:
+        # Relative to the storage API root, token included.
+        response = await self.client.post(
+            f"object/sign/{self.bucket}/{file_path}",
+            json={"expiresIn": expires_in},
+        )
+        response.raise_for_status()
+        return response.json()["signedURL"].lstrip("/")
+
+    async def stream(
+        self, file_path: str, start: int = 0, end: int | None = None
+    ) -> AsyncGenerator[bytes, None]:
+        # end is inclusive, like the HTTP Range header. Not bound by the
+        # semaphore, the pace is set by whoever reads the chunks.
+        headers = {}
+        if start or end is not None:
+            headers["Range"] = f"bytes={start}-{'' if end is None else end}"
+        url = await self.signed_url(file_path)
+        async with self.client.stream("GET", url, headers=headers) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                yield chunk
+
+    async def download_many(self, file_paths: list[str]) -> list[MediaHandle]:
+        results = await asyncio.gather(
+            *(self.download_to(path) for path in file_paths),
+            return_exceptions=True,
+        )
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            for result in results:
+                if isinstance(result, MediaHandle):
+                    result.close()
+            raise errors[0]
+        return results
+
+    async def head(self, file_path: str) -> httpx.Headers | None:
+        # None only for a missing object. Any other failure raises, it says
+        # nothing about whether the object exists.
+        response = await self.client.head(self._object_url(file_path))
+        if response.status_code in NOT_FOUND_STATUSES:
+            return None
+        response.raise_for_status()
+        return response.headers
+
+    async def etag(self, file_path: str) -> str | None:
+        headers = await self.head(file_path)
+        return None if headers is None else headers.get("etag")
+
+    async def list_objects(self, prefix: str = "") -> list[dict]:
+        # The list endpoint returns one folder level at a time; entries
+        # without an id are folders and are listed recursively.
+        objects = []
+        offset = 0
+        while True:
+            response = await self.client.post(
+                f"object/list/{self.bucket}",
+                json={
+                    "prefix": prefix,
+                    "limit": LIST_PAGE_SIZE,
+                    "offset": offset,
+                    "sortBy": {"column": "name", "order": "asc"},
+                },
+            )
+            response.raise_for_status()
+            entries = response.json()
+            for entry in entries:
+                key = f"{prefix}{entry['name']}"
+                if entry.get("id") is None:
+                    objects += await self.list_objects(f"{key}/")
+                else:
+                    objects.append({**entry, "key": key})
+            if len(entries) < LIST_PAGE_SIZE:
+                return objects
+            offset += LIST_PAGE_SIZE
+
+    async def delete(self, file_paths: list[str]):
+        client = self.client
+        async with self._semaphore:
+            response = await client.request(
+                "DELETE",
+                f"object/{self.bucket}",
+                json={"prefixes": file_paths},
+            )
+        response.raise_for_status()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -1,16 +1,15 @@
 import functools
-import tempfile
 
 import numpy as np
 import torch
 import whisper_timestamped as whisper
 
+from app.core.media import MediaHandle
 from app.models.transcription.transcription import Transcription
 from app.models.transcription.transcription_model import TranscriptionModel
 
 DEFAULT_MODEL = TranscriptionModel.Base
 DEFAULT_LANGUAGE = "en"
-DEFAULT_FORMAT = ".wav"
 
 
 @functools.cache
@@ -23,22 +22,16 @@ class Transcriber:
     @classmethod
     def transcribe(
         cls,
-        audio_bytes: bytes,
+        audio: MediaHandle,
         model: TranscriptionModel = DEFAULT_MODEL,
         language: str = DEFAULT_LANGUAGE,
-        format: str = DEFAULT_FORMAT,
     ) -> Transcription:
         whisper_model = _load_whisper_model(model.value)
 
-        with tempfile.NamedTemporaryFile(delete=True, suffix=format) as tmp:
-            tmp.write(audio_bytes)
-            tmp.flush()
-            tmp_path = tmp.name
-
-            audio = whisper.load_audio(tmp_path)
-            transcription = whisper.transcribe(whisper_model, audio, language)
-            cleaned = _convert_np_types(transcription)
-            return Transcription(**cleaned)
+        samples = whisper.load_audio(audio.path)
+        transcription = whisper.transcribe(whisper_model, samples, language)
+        cleaned = _convert_np_types(transcription)
+        return Transcription(**cleaned)
 
 
 def _convert_np_types(obj):
@@ -0,0 +1,58 @@
+from sqlalchemy import Engine, inspect
+
+from app.db.models.movie import Movie
+from app.db.models.music import Music
+from app.db.models.reel import Reel
+from app.db.models.srt import Srt
+
+# create_all only creates missing tables, columns added to an existing
+# table are listed here and added on startup. All of them are nullable,
+# so adding one does not rewrite the table.
+ADDED_COLUMNS = (
+    # Mezzanine render input.
+    Movie.mezzanine_path,
+    Movie.mezzanine_status,
+    # Render parameters and the video key remux looks reels up by.
+    Reel.render_params,
+    Reel.video_key,
+    # Styled subtitles.
+    Srt.ass_path,
+    # Phrase-level captions.
+    Srt.captions,
+    # ffprobe results.
+    Movie.codec,
+    Movie.width,
+    Movie.height,
+    Movie.fps,
+    Movie.rotation,
+    Movie.bit_rate,
+    # Upload digests the blob references are looked up by.
+    Movie.sha256,
+    Music.sha256,
+    # HLS packages.
+    Reel.playlist_path,
+    # Retried queue jobs.
+    Reel.job_key,
+)
+
+
+def add_missing_columns(engine: Engine):
+    preparer = engine.dialect.identifier_preparer
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for attribute in ADDED_COLUMNS:
+            column = attribute.property.columns[0]
+            table = column.table
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            if column.name in existing:
+                continue
+            connection.exec_driver_sql(
+                f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN "
+                f"{preparer.format_column(column)} "
+                f"{column.type.compile(dialect=engine.dialect)}"
+            )
+            for index in table.indexes:
+                if column.name in index.columns:
+                    index.create(connection, checkfirst=True)
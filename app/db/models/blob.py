@@ -0,0 +1,12 @@
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class Blob(SQLModel, table=True):
+    sha256: str = Field(primary_key=True)
+    key: str  # storage key, derived from the digest
+    file_path: str
+    size: int
+    refcount: int = 0  # rows pointing at the blob
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, Column
+from sqlmodel import Field, SQLModel
+
+from app.models.jobs.job_status import JobStatus
+
+
+class Job(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    kind: str = Field(index=True)
+    payload: dict = Field(default_factory=dict, sa_column=Column(JSON))
+    status: str = Field(default=JobStatus.Queued.value, index=True)
+    author: int | None = Field(default=None, foreign_key="user.uidd")
+    attempts: int = 0
+    max_attempts: int = 5
+    progress: float = 0.0
+    result: dict | None = Field(default=None, sa_column=Column(JSON))
+    error: str | None = None
+    run_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    locked_by: str | None = None
+    lease_expires_at: datetime | None = None
+    heartbeat_at: datetime | None = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: datetime | None = None
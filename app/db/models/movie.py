@@ -14,8 +14,17 @@ class Movie(SQLModel, table=True):
     author: int = Field(foreign_key="user.uidd")  # Foreign key to User model
     type: str | None = None  # type of file (e.g. "mp4", "avi")
     duration: int | None = None  # duration in seconds
+    codec: str | None = None  # video codec (e.g. "h264")
+    width: int | None = None  # coded frame size, before rotation
+    height: int | None = None
+    fps: float | None = None
+    rotation: int | None = None  # clockwise degrees
+    bit_rate: int | None = None  # overall bit rate in bits per second
     native_lang: str | None = None  # language of the movie
     file_path: str | None = None  # Path to the movie file
+    sha256: str | None = Field(default=None, index=True)  # upload digest
     thumbnail_path: str | None = None  # Path to the poster image
+    mezzanine_path: str | None = None  # Path to the pre-cropped render input
+    mezzanine_status: str | None = None  # see MezzanineStatus
     created_at: date = Field(default_factory=date.today)
     reels: list["Reel"] = Relationship(back_populates="movie")
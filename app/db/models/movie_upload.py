@@ -0,0 +1,22 @@
+import uuid
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class MovieUpload(SQLModel, table=True):
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex, primary_key=True)
+    author: int = Field(foreign_key="user.uidd", index=True)
+    filename: str
+    size: int  # total length announced by the client
+    title: str
+    description: str | None = None
+    native_lang: str | None = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(index=True)
+
+
+class MovieUploadChunk(SQLModel, table=True):
+    upload_id: str = Field(foreign_key="movieupload.id", primary_key=True)
+    offset: int = Field(primary_key=True)
+    size: int
@@ -10,4 +10,5 @@ class Music(SQLModel, table=True):
     type: str | None = None
     duration: int | None = None
     file_path: str | None = None
+    sha256: str | None = Field(default=None, index=True)  # upload digest
     created_at: date = Field(default_factory=date.today)
@@ -1,6 +1,7 @@
 from datetime import date
 from typing import TYPE_CHECKING, Optional
 
+from sqlalchemy import JSON, Column
 from sqlmodel import Field, Relationship, SQLModel
 
 if TYPE_CHECKING:
@@ -14,7 +15,15 @@ class Reel(SQLModel, table=True):
     lang: str
     author: int = Field(foreign_key="user.uidd")
     file_path: str | None = None
+    # HLS master playlist, its renditions and segments are stored next to it.
+    playlist_path: str | None = None
     audio_id: int | None = Field(default=None, foreign_key="audio.id")
+    # Parameters and input digests the reel was rendered with; video_key
+    # covers the subset that determines the picture.
+    render_params: dict | None = Field(default=None, sa_column=Column(JSON))
+    video_key: str | None = Field(default=None, index=True)
+    # Queue job that rendered the reel, a retried job finds its reel by it.
+    job_key: str | None = Field(default=None, unique=True, index=True)
     created_at: date = Field(default_factory=date.today)
 
     movie: Optional["Movie"] = Relationship(back_populates="reels")
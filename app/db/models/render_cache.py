@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class RenderCacheEntry(SQLModel, table=True):
+    key: str = Field(primary_key=True)
+    storage_path: str
+    file_path: str
+    size: int
+    hits: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    last_used_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class RenderCacheCounter(SQLModel, table=True):
+    name: str = Field(primary_key=True)
+    value: int = 0
@@ -1,6 +1,7 @@
 from datetime import date
 from typing import TYPE_CHECKING, Optional
 
+from sqlalchemy import JSON, Column
 from sqlmodel import Field, Relationship, SQLModel
 
 if TYPE_CHECKING:
@@ -11,6 +12,9 @@ class Srt(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     audio_id: int = Field(foreign_key="audio.id")
     file_path: str
+    ass_path: str | None = None
+    # Caption lines with per-word timings, see utils.captions.caption_timings.
+    captions: list | None = Field(default=None, sa_column=Column(JSON))
     created_at: date = Field(default_factory=date.today)
 
     audio: Optional["Audio"] = Relationship(back_populates="srt")
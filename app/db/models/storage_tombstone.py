@@ -0,0 +1,10 @@
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class StorageTombstone(SQLModel, table=True):
+    key: str = Field(primary_key=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    attempts: int = 0
+    error: str | None = None
@@ -3,7 +3,10 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlmodel import SQLModel
 
 from app.api.v1.api_v1 import api_router
+from app.core import segmented_render
+from app.db.migrations import add_missing_columns
 from app.db.session import engine
+from app.services import render_jobs
 
 app = FastAPI(title="Brainrot API")
 app.add_middleware(
@@ -18,6 +21,13 @@ app.add_middleware(
 @app.on_event("startup")
 def on_startup():
     SQLModel.metadata.create_all(engine)
+    add_missing_columns(engine)
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    render_jobs.shutdown()
+    segmented_render.shutdown()
 
 
 app.include_router(api_router, prefix="/api/v1")
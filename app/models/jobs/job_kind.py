@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+class JobKind(str, Enum):
+    RenderReel = "render_reel"
+    RenderReelBatch = "render_reel_batch"
+    GenerateAudio = "generate_audio"
+    TranscribeAudio = "transcribe_audio"
+    TranscodeMezzanine = "transcode_mezzanine"
+    CollectStorage = "collect_storage"
+    ReconcileStorage = "reconcile_storage"
@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class JobStatus(str, Enum):
+    Queued = "queued"
+    Running = "running"
+    Finished = "finished"
+    Failed = "failed"
+    Dead = "dead"
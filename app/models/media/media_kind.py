@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class MediaKind(str, Enum):
+    Movie = "movie"
+    Thumbnail = "thumbnail"
+    Reel = "reel"
+    Audio = "audio"
+    Music = "music"
@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class MezzanineStatus(str, Enum):
+    Pending = "pending"
+    Ready = "ready"
+    Failed = "failed"
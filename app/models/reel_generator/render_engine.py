@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class RenderEngine(str, Enum):
+    MoviePy = "moviepy"
+    FFmpeg = "ffmpeg"
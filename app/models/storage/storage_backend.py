@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class StorageBackendKind(str, Enum):
+    Supabase = "supabase"
+    Local = "local"
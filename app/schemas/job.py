@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from app.models.jobs.job_status import JobStatus
+
+
+class JobRead(BaseModel):
+    id: int
+    kind: str
+    status: JobStatus
+    progress: float = 0.0
+    attempts: int = 0
+    result: dict | None = None
+    error: str | None = None
+    created_at: datetime
+    finished_at: datetime | None = None
@@ -17,8 +17,15 @@ class MovieReadBasic(MovieBase):
     author: int
     type: str | None = None
     duration: int | None = None
+    codec: str | None = None
+    width: int | None = None
+    height: int | None = None
+    fps: float | None = None
+    rotation: int | None = None
+    bit_rate: int | None = None
     file_path: str | None = None
     thumbnail_path: str | None = None
+    mezzanine_status: str | None = None
 
     class Config:
         orm_mode = True
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+from app.schemas.movie import MovieCreate
+
+
+class MovieUploadCreate(MovieCreate):
+    filename: str
+    size: int = Field(gt=0)
+
+
+class MovieUploadRead(BaseModel):
+    id: str
+    filename: str
+    size: int
+    offset: int  # length of the contiguous prefix received so far
+    ranges: list[tuple[int, int]] = []  # received [start, end) ranges
+    expires_at: datetime
+
+
+class MovieUploadExpiry(BaseModel):
+    expired: int
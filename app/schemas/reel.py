@@ -1,12 +1,15 @@
-from datetime import date
+from datetime import date, datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
+from app.models.jobs.job_status import JobStatus
+from app.models.reel_generator.render_engine import RenderEngine
 from app.schemas.audio import AudioRead
 
 
 class ReelBase(BaseModel):
     file_path: str | None = None
+    playlist_path: str | None = None
 
 
 class ReelRead(ReelBase):
@@ -23,12 +26,45 @@ class ReelCreate(BaseModel):
     music_id: int | None
     music_volume: float = 0.2
     include_srt: bool = False
+    engine: RenderEngine | None = None
+
+
+class ReelVariant(BaseModel):
+    audio_id: int | None
+    music_id: int | None = None
+    music_volume: float = 0.2
+    include_srt: bool = False
+
+
+class ReelBatchCreate(BaseModel):
+    movie_id: int
+    variants: list[ReelVariant] = Field(min_length=1)
+    engine: RenderEngine | None = None
+
+
+class ReelBatchResult(BaseModel):
+    index: int
+    audio_id: int | None
+    reel: ReelRead | None = None
+    error: str | None = None
+
+
+class ReelJobRead(BaseModel):
+    id: str
+    status: JobStatus
+    progress: float = 0.0
+    created_at: datetime
+    reel: ReelRead | None = None
+    error: str | None = None
+    # Set for batch jobs, one entry per finished variant.
+    results: list[ReelBatchResult] | None = None
 
 
 class ReelWithAudio(BaseModel):
     id: int
     lang: str
     file_path: str | None
+    playlist_path: str | None = None
     movie_id: int
     author: int
     audio: AudioRead | None
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+
+class RenderCacheStats(BaseModel):
+    entries: int
+    total_bytes: int
+    hits: int
+    misses: int
+    hit_rate: float
+
+
+class RenderCacheEviction(BaseModel):
+    evicted: int
+    freed_bytes: int
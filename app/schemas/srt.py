@@ -10,6 +10,8 @@ class SrtBase(BaseModel):
     audio_id: int
     created_at: date
     file_path: str
+    ass_path: str | None = None
+    captions: list[dict] | None = None
 
     @classmethod
     def from_orm(cls, srt: Srt) -> "SrtBase":
@@ -17,5 +19,7 @@ class SrtBase(BaseModel):
             id=srt.id,
             created_at=srt.created_at,
             file_path=srt.file_path,
+            ass_path=srt.ass_path,
+            captions=srt.captions,
             audio_id=srt.audio_id,
         )
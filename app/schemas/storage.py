@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+
+
+class StorageCollection(BaseModel):
+    removed: int
+    kept: int
+    failed: int
+
+
+class StorageReconciliation(BaseModel):
+    scanned: int
+    orphaned: int
@@ -1,14 +1,19 @@
 import datetime
-import io
 from collections.abc import Sequence
 from datetime import date
 
 import numpy as np
 import soundfile as sf
+from fastapi import BackgroundTasks
 from kokoro import KPipeline
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
 
-from app.core.storage.backends import SupabaseStorageBackend
+from app.core.config import settings
+from app.core.ffmpeg_renderer import FFmpegRenderer
+from app.core.media import MediaHandle
+from app.core.reel_generator import ReelGenerator
+from app.core.storage.backends import StorageBackend
 from app.core.transcription import Transcriber
 from app.db.models.audio import Audio
 from app.db.models.srt import Srt
@@ -16,8 +21,9 @@ from app.models.transcription.transcription import Transcription
 from app.models.transcription.transcription_model import TranscriptionModel
 from app.schemas.audio import AudioCreate, AudioRead
 from app.schemas.srt import SrtBase
+from app.services import storage_gc as services_storage_gc
 from app.services.utils import get_file_duration
-from app.utils import srt
+from app.utils import ass, captions, srt
 
 DEFAULT_SAMPLE_RATE = 22050
 DEFAULT_FILE_FORMAT = "WAV"
@@ -41,30 +47,24 @@ def get_audio(db: Session, audio_id: int) -> AudioRead | None:
 def get_audios(
     db: Session, skip: int = 0, limit: int = 100
 ) -> Sequence[AudioRead]:
-    results = db.exec(select(Audio).offset(skip).limit(limit)).all()
-    audio_reads = []
-    for audio in results:
-        stmt = select(Srt).where(Srt.audio_id == audio.id)
-        srt_obj = db.exec(stmt).first()
-        audio.srt = srt_obj
-        audio_reads.append(AudioRead.from_orm(audio))
-    return audio_reads
+    results = db.exec(
+        select(Audio).options(selectinload(Audio.srt)).offset(skip).limit(limit)
+    ).all()
+    return [AudioRead.from_orm(audio) for audio in results]
 
 
 def get_audios_by_user(
     db: Session, user_id: int, skip: int = 0, limit: int = 100
 ) -> Sequence[AudioRead]:
     stmt = (
-        select(Audio).where(Audio.author == user_id).offset(skip).limit(limit)
+        select(Audio)
+        .where(Audio.author == user_id)
+        .options(selectinload(Audio.srt))
+        .offset(skip)
+        .limit(limit)
     )
     results = db.exec(stmt).all()
-    audio_reads = []
-    for audio in results:
-        stmt = select(Srt).where(Srt.audio_id == audio.id)
-        srt_obj = db.exec(stmt).first()
-        audio.srt = srt_obj
-        audio_reads.append(AudioRead.from_orm(audio))
-    return audio_reads
+    return [AudioRead.from_orm(audio) for audio in results]
 
 
 def get_audio_by_user(
@@ -82,7 +82,7 @@ def get_audio_by_user(
 
 def create_audio(
     db: Session,
-    storage: SupabaseStorageBackend,
+    storage: StorageBackend,
     audio_create: AudioCreate,
     user_id: int,
 ) -> AudioRead:
@@ -97,31 +97,29 @@ def create_audio(
 
     validate_audio(audio)
 
-    buffer = io.BytesIO()
-    sf.write(
-        buffer,
-        audio,
-        DEFAULT_SAMPLE_RATE,
-        format=DEFAULT_FILE_FORMAT,
-        subtype="PCM_16",
-    )
-    buffer.seek(0)
-    bytes = buffer.read()
-
-    db_audio = Audio(
-        author=user_id,
-        title=title,
-        duration=get_file_duration(bytes, ".wav"),
-        text=audio_create.text,
-        voice=audio_create.voice.id,
-        language=audio_create.language.value,
-        speed=audio_create.speed or 1.0,
-    )
-    db.add(db_audio)
-    db.commit()
-    db.refresh(db_audio)
+    with MediaHandle.temporary(".wav") as media:
+        sf.write(
+            media.path,
+            audio,
+            DEFAULT_SAMPLE_RATE,
+            format=DEFAULT_FILE_FORMAT,
+            subtype="PCM_16",
+        )
+
+        db_audio = Audio(
+            author=user_id,
+            title=title,
+            duration=get_file_duration(media),
+            text=audio_create.text,
+            voice=audio_create.voice.id,
+            language=audio_create.language.value,
+            speed=audio_create.speed or 1.0,
+        )
+        db.add(db_audio)
+        db.commit()
+        db.refresh(db_audio)
 
-    file_dest = storage.upload_file(bytes, f"audio_{db_audio.id}.wav")
+        file_dest = storage.upload_file(media, f"audio_{db_audio.id}.wav")
     db_audio.file_path = file_dest
     db.commit()
     db.refresh(db_audio)
@@ -130,7 +128,9 @@ def create_audio(
 
 
 def delete_audio(
-    db: Session, storage: SupabaseStorageBackend, audio_id: int
+    db: Session,
+    audio_id: int,
+    background_tasks: BackgroundTasks | None = None,
 ) -> bool:
     db_audio = db.get(Audio, audio_id)
     if not db_audio:
@@ -138,43 +138,55 @@ def delete_audio(
     stmt = select(Srt).where(Srt.audio_id == audio_id)
     db_srt = db.exec(stmt).first()
     if db_srt:
+        services_storage_gc.tombstone(db, [db_srt.file_path, db_srt.ass_path])
         db.delete(db_srt)
-    if db_audio.file_path:
-        storage.delete_file(f"{db_audio.file_path}")
+    services_storage_gc.tombstone(db, [db_audio.file_path])
     db.delete(db_audio)
     db.commit()
+    services_storage_gc.schedule_collection(db, background_tasks)
     return True
 
 
 def delete_audio_by_user(
-    db: Session, user_id: int, storage: SupabaseStorageBackend, audio_id: int
+    db: Session,
+    user_id: int,
+    audio_id: int,
+    background_tasks: BackgroundTasks | None = None,
 ) -> bool:
     db_audio = get_audio_by_user(db, user_id, audio_id)
     if not db_audio:
         return False
-    delete_audio(db, storage, db_audio.id)
+    return delete_audio(db, db_audio.id, background_tasks)
 
 
 def transcribe_audio_file(
     db: Session,
-    storage: SupabaseStorageBackend,
+    storage: StorageBackend,
     audio_id: int,
-    audio_bytes: bytes,
+    audio: MediaHandle,
     model: TranscriptionModel,
 ) -> SrtBase:
-    transcription = Transcriber.transcribe(audio_bytes, model)
-    file_dest = _upload_transcription(audio_id, transcription, storage)
+    transcription = Transcriber.transcribe(audio, model)
+    lines = _caption_lines(transcription)
+    file_dest, ass_dest = storage.upload_files(
+        _transcription_files(audio_id, transcription, lines)
+    )
+    timings = captions.caption_timings(lines)
 
     stmt = select(Srt).where(Srt.audio_id == audio_id)
     db_srt = db.exec(stmt).first()
 
     if db_srt:
         db_srt.file_path = file_dest
+        db_srt.ass_path = ass_dest
+        db_srt.captions = timings
         db_srt.created_at = date.today()
     else:
         db_srt = Srt(
             audio_id=audio_id,
             file_path=file_dest,
+            ass_path=ass_dest,
+            captions=timings,
         )
         db.add(db_srt)
 
@@ -183,16 +195,31 @@ def transcribe_audio_file(
     return SrtBase.from_orm(db_srt)
 
 
-def _upload_transcription(
-    audio_id: int, transcription: Transcription, storage: SupabaseStorageBackend
-) -> str:
-    buffer = io.BytesIO()
-    srt_content = srt.generate_srt(transcription)
-    buffer.write(srt_content.encode("utf-8"))
-    buffer.seek(0)
-    filename = f"transcription_{audio_id}.srt"
-    file_dest = storage.upload_file(buffer.read(), filename, True)
-    return file_dest
+def _caption_lines(transcription: Transcription) -> list[captions.Caption]:
+    if not settings.CAPTION_GROUPING_ENABLED:
+        return captions.word_captions(transcription)
+    return captions.group_transcription(
+        transcription,
+        settings.CAPTION_MAX_CHARS,
+        settings.CAPTION_MAX_DURATION,
+        settings.CAPTION_MAX_PAUSE,
+    )
+
+
+def _transcription_files(
+    audio_id: int,
+    transcription: Transcription,
+    lines: list[captions.Caption] | None = None,
+) -> list[tuple[bytes, str]]:
+    srt_content = srt.generate_srt(transcription, lines)
+    # Styled like the default reel, so renders can hand it straight to
+    # libass instead of laying out every caption themselves.
+    style = FFmpegRenderer(ReelGenerator()).subtitle_style()
+    ass_content = ass.generate_ass(transcription, style, lines)
+    return [
+        (srt_content.encode("utf-8"), f"transcription_{audio_id}.srt"),
+        (ass_content.encode("utf-8"), f"transcription_{audio_id}.ass"),
+    ]
 
 
 def _generate_audio(audio_create: AudioCreate) -> np.ndarray:
@@ -0,0 +1,87 @@
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.core.media import MediaHandle
+from app.core.storage.backends import BLOB_PREFIX, StorageBackend
+from app.db.models.blob import Blob
+from app.services import storage_gc as services_storage_gc
+
+
+def blob_key(digest: str, extension: str) -> str:
+    return f"{BLOB_PREFIX}{digest}{extension.lower()}"
+
+
+def key_digest(key: str) -> str | None:
+    if not key.startswith(BLOB_PREFIX):
+        return None
+    return key.removeprefix(BLOB_PREFIX).split(".")[0]
+
+
+def _reference(db: Session, digest: str) -> Blob | None:
+    blob = db.exec(
+        select(Blob).where(Blob.sha256 == digest).with_for_update()
+    ).first()
+    if blob is not None:
+        blob.refcount += 1
+        db.commit()
+        db.refresh(blob)
+    return blob
+
+
+def _register(
+    db: Session, digest: str, key: str, file_path: str, size: int
+) -> Blob:
+    db.add(
+        Blob(sha256=digest, key=key, file_path=file_path, size=size, refcount=1)
+    )
+    try:
+        db.commit()
+    except IntegrityError:
+        # The same content was uploaded concurrently and registered first.
+        db.rollback()
+        return _reference(db, digest)
+    return db.get(Blob, digest)
+
+
+def acquire(
+    db: Session,
+    storage: StorageBackend,
+    media: MediaHandle,
+    extension: str,
+    extra_files: list[tuple[MediaHandle, str]] | None = None,
+) -> tuple[Blob, list[str]]:
+    # Takes a reference on the blob holding the content of media. Known
+    # content is only counted, new content is uploaded, side by side with
+    # extra_files, whose URLs are returned.
+    extra_files = extra_files or []
+    digest = media.digest()
+    blob = _reference(db, digest)
+    if blob is not None:
+        return blob, (storage.upload_files(extra_files) if extra_files else [])
+
+    key = blob_key(digest, extension)
+    # A blob released a moment ago may still be queued for removal.
+    services_storage_gc.untombstone(db, [key])
+    db.commit()
+    file_path, *extra_paths = storage.upload_files([(media, key), *extra_files])
+    return _register(db, digest, key, file_path, media.size), extra_paths
+
+
+def release(db: Session, file_path: str | None) -> None:
+    # Part of the caller's transaction. Objects stored before blobs existed
+    # have a key of their own and are tombstoned right away.
+    if not file_path:
+        return
+    digest = key_digest(services_storage_gc.storage_key(file_path))
+    blob = None
+    if digest is not None:
+        blob = db.exec(
+            select(Blob).where(Blob.sha256 == digest).with_for_update()
+        ).first()
+    if blob is None:
+        services_storage_gc.tombstone(db, [file_path])
+        return
+    blob.refcount -= 1
+    if blob.refcount <= 0:
+        services_storage_gc.tombstone(db, [blob.key])
+        db.delete(blob)
@@ -0,0 +1,229 @@
+import random
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.db.models.job import Job
+from app.models.jobs.job_status import JobStatus
+from app.schemas.job import JobRead
+
+QUEUE_BACKEND = "queue"
+
+
+def require_queue_backend():
+    # Without the queue backend no worker polls the table, a queued job
+    # would never run.
+    if settings.JOB_BACKEND != QUEUE_BACKEND:
+        raise HTTPException(
+            status_code=503, detail="The job queue is not enabled"
+        )
+
+
+def enqueue_job(
+    db: Session,
+    kind: str,
+    payload: dict,
+    user_id: int | None = None,
+    max_attempts: int | None = None,
+) -> Job:
+    job = Job(
+        kind=kind,
+        payload=payload,
+        author=user_id,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _backoff_delay(attempts: int) -> float:
+    delay = settings.JOB_BACKOFF_BASE * 2 ** (attempts - 1)
+    delay = min(delay, settings.JOB_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _release(job: Job, error: str, now: datetime):
+    # A failed attempt: queued again after a backoff, or dead-lettered once
+    # the job is out of attempts.
+    job.error = error
+    job.locked_by = None
+    job.lease_expires_at = None
+    if job.attempts >= job.max_attempts:
+        job.status = JobStatus.Dead.value
+        job.finished_at = now
+    else:
+        job.status = JobStatus.Queued.value
+        job.run_at = now + timedelta(seconds=_backoff_delay(job.attempts))
+
+
+def _expire_leases(db: Session, now: datetime):
+    # Running jobs whose worker stopped heartbeating count as a failed
+    # attempt, so a job that keeps killing its worker ends up dead.
+    expired = db.exec(
+        select(Job)
+        .where(
+            Job.status == JobStatus.Running.value,
+            Job.lease_expires_at < now,
+        )
+        .with_for_update(skip_locked=True)
+    ).all()
+    for job in expired:
+        _release(job, "Lease expired", now)
+    if expired:
+        db.commit()
+
+
+def claim_job(
+    db: Session, worker_id: str, kinds: Sequence[str] | None = None
+) -> Job | None:
+    now = datetime.utcnow()
+    _expire_leases(db, now)
+    # Queued jobs whose backoff elapsed.
+    stmt = (
+        select(Job)
+        .where(Job.status == JobStatus.Queued.value, Job.run_at <= now)
+        .order_by(Job.run_at, Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    if kinds:
+        stmt = stmt.where(Job.kind.in_(kinds))
+    job = db.exec(stmt).first()
+    if job is None:
+        db.rollback()
+        return None
+
+    job.status = JobStatus.Running.value
+    job.attempts += 1
+    job.progress = 0.0
+    job.locked_by = worker_id
+    job.heartbeat_at = now
+    job.lease_expires_at = now + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _get_owned_job(db: Session, job_id: int, worker_id: str) -> Job | None:
+    stmt = (
+        select(Job)
+        .where(
+            Job.id == job_id,
+            Job.locked_by == worker_id,
+            Job.status == JobStatus.Running.value,
+        )
+        .with_for_update()
+    )
+    return db.exec(stmt).first()
+
+
+def heartbeat_job(
+    db: Session, job_id: int, worker_id: str, progress: float | None = None
+) -> bool:
+    job = _get_owned_job(db, job_id, worker_id)
+    if job is None:
+        db.rollback()
+        return False
+    now = datetime.utcnow()
+    job.heartbeat_at = now
+    job.lease_expires_at = now + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    if progress is not None:
+        job.progress = progress
+    db.commit()
+    return True
+
+
+def complete_job(
+    db: Session, job_id: int, worker_id: str, result: dict | None = None
+) -> bool:
+    job = _get_owned_job(db, job_id, worker_id)
+    if job is None:
+        db.rollback()
+        return False
+    job.status = JobStatus.Finished.value
+    job.progress = 100.0
+    job.result = result
+    job.error = None
+    job.locked_by = None
+    job.lease_expires_at = None
+    job.finished_at = datetime.utcnow()
+    db.commit()
+    return True
+
+
+def fail_job(db: Session, job_id: int, worker_id: str, error: str) -> bool:
+    job = _get_owned_job(db, job_id, worker_id)
+    if job is None:
+        db.rollback()
+        return False
+    _release(job, error, datetime.utcnow())
+    db.commit()
+    return True
+
+
+def retry_dead_job(db: Session, job_id: int) -> Job | None:
+    job = db.get(Job, job_id)
+    if job is None or job.status != JobStatus.Dead.value:
+        return None
+    job.status = JobStatus.Queued.value
+    job.attempts = 0
+    job.run_at = datetime.utcnow()
+    job.finished_at = None
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_job(db: Session, job_id: int) -> Job | None:
+    return db.get(Job, job_id)
+
+
+def get_job_by_user(db: Session, user_id: int, job_id: int) -> Job | None:
+    return db.exec(
+        select(Job).where(Job.id == job_id, Job.author == user_id)
+    ).first()
+
+
+def get_jobs_by_user(
+    db: Session,
+    user_id: int,
+    kinds: Sequence[str] | None = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> Sequence[Job]:
+    stmt = select(Job).where(Job.author == user_id)
+    if kinds:
+        stmt = stmt.where(Job.kind.in_(kinds))
+    stmt = stmt.order_by(Job.created_at.desc()).offset(skip).limit(limit)
+    return db.exec(stmt).all()
+
+
+def get_dead_jobs(
+    db: Session, skip: int = 0, limit: int = 100
+) -> Sequence[Job]:
+    return db.exec(
+        select(Job)
+        .where(Job.status == JobStatus.Dead.value)
+        .order_by(Job.finished_at.desc())
+        .offset(skip)
+        .limit(limit)
+    ).all()
+
+
+def to_job_read(job: Job) -> JobRead:
+    return JobRead(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        progress=job.progress,
+        attempts=job.attempts,
+        result=job.result,
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+    )
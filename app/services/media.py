@@ -0,0 +1,167 @@
+import mimetypes
+import re
+from collections.abc import Mapping
+from datetime import UTC
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import HTTPException
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlmodel import Session, select
+
+from app.core.storage.backends import (
+    BLOB_PREFIX,
+    LocalStorageBackend,
+    StorageBackend,
+    StorageObject,
+)
+from app.db.models.audio import Audio
+from app.db.models.movie import Movie
+from app.db.models.music import Music
+from app.db.models.reel import Reel
+from app.db.models.user import User
+from app.models.media.media_kind import MediaKind
+from app.services import storage_gc as services_storage_gc
+
+MEDIA_COLUMNS = {
+    MediaKind.Movie: (Movie, Movie.file_path),
+    MediaKind.Thumbnail: (Movie, Movie.thumbnail_path),
+    MediaKind.Reel: (Reel, Reel.file_path),
+    MediaKind.Audio: (Audio, Audio.file_path),
+    MediaKind.Music: (Music, Music.file_path),
+}
+
+# Content-addressed objects never change, other keys are rewritten in place
+# (a reel rendered again) and are revalidated on every use.
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+MUTABLE_CACHE_CONTROL = "private, no-cache"
+
+_RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+def get_media_key(
+    db: Session, user: User, kind: MediaKind, media_id: int
+) -> str:
+    model, column = MEDIA_COLUMNS[kind]
+    statement = select(column).where(model.id == media_id)
+    if getattr(user, "role", None) != "ADMIN":
+        statement = statement.where(model.author == user.uidd)
+    path = db.exec(statement).first()
+    if not path:
+        raise HTTPException(status_code=404, detail="Media not found")
+    return services_storage_gc.storage_key(path)
+
+
+def _etags(header: str) -> list[str]:
+    # Weak comparison, as If-None-Match asks for.
+    return [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+def _http_date(value: str):
+    try:
+        return parsedate_to_datetime(value).astimezone(UTC).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_not_modified(headers: Mapping[str, str], obj: StorageObject) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        # Takes precedence over If-Modified-Since when both are sent.
+        tags = _etags(if_none_match)
+        return "*" in tags or (
+            obj.etag is not None and obj.etag.removeprefix("W/") in tags
+        )
+    since = _http_date(headers.get("if-modified-since", ""))
+    # HTTP dates have no fractional seconds.
+    return since is not None and obj.updated_at.replace(microsecond=0) <= since
+
+
+def parse_range(
+    headers: Mapping[str, str], obj: StorageObject
+) -> tuple[int, int] | None:
+    # Returns the inclusive byte range to serve, or None for the whole
+    # object. Malformed and multi-part ranges are ignored, which HTTP allows.
+    header = headers.get("range")
+    if header is None:
+        return None
+    if_range = headers.get("if-range")
+    if if_range is not None and if_range.strip() != obj.etag:
+        since = _http_date(if_range)
+        if since is None or obj.updated_at.replace(microsecond=0) > since:
+            return None
+    match = _RANGE_PATTERN.fullmatch(header.strip())
+    if match is None or match.group(1) == match.group(2) == "":
+        return None
+    start, end = match.groups()
+    if start == "":
+        # A suffix range, the last n bytes.
+        start, end = max(obj.size - int(end), 0), obj.size - 1
+    else:
+        start = int(start)
+        end = min(int(end), obj.size - 1) if end else obj.size - 1
+    if start >= obj.size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{obj.size}"},
+        )
+    return start, end
+
+
+def media_response(
+    storage: StorageBackend,
+    key: str,
+    headers: Mapping[str, str],
+    method: str = "GET",
+) -> Response:
+    obj = storage.stat(key)
+    if obj is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+    response_headers = {
+        "Accept-Ranges": "bytes",
+        "Cache-Control": (
+            IMMUTABLE_CACHE_CONTROL
+            if key.startswith(BLOB_PREFIX)
+            else MUTABLE_CACHE_CONTROL
+        ),
+        "Last-Modified": format_datetime(
+            obj.updated_at.replace(tzinfo=UTC), usegmt=True
+        ),
+    }
+    if obj.etag is not None:
+        response_headers["ETag"] = obj.etag
+    if is_not_modified(headers, obj):
+        return Response(status_code=304, headers=response_headers)
+
+    media_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+    if isinstance(storage, LocalStorageBackend):
+        # FileResponse serves ranges itself. Under uvicorn, which has no
+        # pathsend extension, the body is read and sent in chunks, there is
+        # no sendfile on this path.
+        return FileResponse(
+            storage.local_path(key),
+            headers=response_headers,
+            media_type=media_type,
+            method=method,
+        )
+
+    byte_range = parse_range(headers, obj)
+    status_code = 200
+    start, end = 0, obj.size - 1
+    if byte_range is not None:
+        status_code = 206
+        start, end = byte_range
+        response_headers["Content-Range"] = f"bytes {start}-{end}/{obj.size}"
+    response_headers["Content-Length"] = str(end - start + 1)
+    if method == "HEAD":
+        return Response(
+            status_code=status_code,
+            headers=response_headers,
+            media_type=media_type,
+        )
+    return StreamingResponse(
+        storage.stream(key, start, end if byte_range else None),
+        status_code=status_code,
+        headers=response_headers,
+        media_type=media_type,
+    )
@@ -1,38 +1,47 @@
+import logging
 import os
-import tempfile
 
-import imageio.v3 as iio
-from fastapi import HTTPException, UploadFile
-from moviepy import VideoFileClip
+from fastapi import BackgroundTasks, HTTPException, UploadFile
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, asc, desc, select
 
 from app.core.config import settings
-from app.core.storage.backends import SupabaseStorageBackend
+from app.core.ffmpeg import MediaInfo, extract_frame, probe_media
+from app.core.media import MediaHandle
+from app.core.reel_generator import ReelGenerator
+from app.core.storage.backends import (
+    StorageBackend,
+    get_storage,
+)
+from app.db.models.audio import Audio
 from app.db.models.movie import Movie
-from app.schemas.audio import AudioRead
+from app.db.models.reel import Reel
+from app.db.session import engine
+from app.models.jobs.job_kind import JobKind
+from app.models.movie.mezzanine_status import MezzanineStatus
 from app.schemas.movie import MovieCreate, MovieRead, MovieReadBasic
-from app.schemas.reel import ReelWithAudio
-from app.services.utils import get_file_duration
+from app.services.utils import check_duration, spool_upload
+import app.services.blob as services_blob
+import app.services.jobs as services_jobs
 import app.services.reel as services_reel
+import app.services.storage_gc as services_storage_gc
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_TIME = 0.5
+
+
+# Reels, their audio and its subtitles in one query each for any number of
+# movies, instead of lazy loads per movie and per reel.
+MOVIE_READ_OPTIONS = (
+    selectinload(Movie.reels).selectinload(Reel.audio).selectinload(Audio.srt),
+)
 
 
 def _build_movie_read(db_movie):
-    reels = db_movie.reels if hasattr(db_movie, "reels") else []
-    reel_reads = []
-    for r in reels:
-        audio = None
-        if hasattr(r, "audio") and r.audio:
-            audio = AudioRead.from_orm(r.audio)
-        reel_reads.append(
-            ReelWithAudio(
-                id=r.id,
-                lang=r.lang,
-                file_path=r.file_path,
-                movie_id=r.movie_id,
-                author=r.author,
-                audio=audio,
-            )
-        )
+    reel_reads = [
+        services_reel.reel_with_audio(reel) for reel in db_movie.reels
+    ]
     return MovieRead(
         id=db_movie.id,
         title=db_movie.title,
@@ -42,21 +51,30 @@ def _build_movie_read(db_movie):
         author=db_movie.author,
         type=db_movie.type,
         duration=db_movie.duration,
+        codec=db_movie.codec,
+        width=db_movie.width,
+        height=db_movie.height,
+        fps=db_movie.fps,
+        rotation=db_movie.rotation,
+        bit_rate=db_movie.bit_rate,
         file_path=db_movie.file_path,
         thumbnail_path=db_movie.thumbnail_path,
+        mezzanine_status=db_movie.mezzanine_status,
         reels=reel_reads,
     )
 
 
 def get_movie(db: Session, movie_id: int) -> MovieRead | None:
-    db_movie = db.get(Movie, movie_id)
+    db_movie = db.get(Movie, movie_id, options=MOVIE_READ_OPTIONS)
     if db_movie is None:
         raise HTTPException(status_code=404, detail="Movie not found")
     return _build_movie_read(db_movie)
 
 
 def get_movies(db: Session, skip: int = 0, limit: int = 100) -> list[MovieRead]:
-    db_movies = db.exec(select(Movie).offset(skip).limit(limit)).all()
+    db_movies = db.exec(
+        select(Movie).options(*MOVIE_READ_OPTIONS).offset(skip).limit(limit)
+    ).all()
     return [_build_movie_read(db_movie) for db_movie in db_movies]
 
 
@@ -79,6 +97,7 @@ def get_movies_by_user(
     db_movies = db.exec(
         select(Movie)
         .where(Movie.author == user_id)
+        .options(*MOVIE_READ_OPTIONS)
         .order_by(sort_order(sort_field))
     ).all()
     return [_build_movie_read(db_movie) for db_movie in db_movies]
@@ -88,53 +107,164 @@ def get_movie_by_user(
     db: Session, user_id: int, movie_id: int
 ) -> MovieRead | None:
     db_movie = db.exec(
-        select(Movie).where(Movie.author == user_id, Movie.id == movie_id)
+        select(Movie)
+        .where(Movie.author == user_id, Movie.id == movie_id)
+        .options(*MOVIE_READ_OPTIONS)
     ).first()
     if db_movie is None:
         raise HTTPException(status_code=404, detail="Movie not found")
     return _build_movie_read(db_movie)
 
 
-def get_video_thumbnail(file_bytes: bytes) -> bytes | None:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp:
-        tmp.write(file_bytes)
-        tmp_path = tmp.name
+def probe_movie(media: MediaHandle) -> MediaInfo:
+    try:
+        info = probe_media(media.path)
+    except (RuntimeError, ValueError):
+        info = None
+    if info is None or info.codec is None:
+        raise HTTPException(
+            status_code=400, detail="Cannot open video file for processing."
+        )
+    return info
+
 
-    thumbnail_bytes = None
+def get_video_thumbnail(
+    media: MediaHandle, duration: float
+) -> MediaHandle | None:
+    frame_time = THUMBNAIL_TIME if duration > THUMBNAIL_TIME else 0
+    thumbnail = MediaHandle.temporary(".png", prefix="thumbnail_")
     try:
-        with VideoFileClip(tmp_path) as clip:
-            frame_time = 0
-            if clip.duration > 0.5:
-                frame_time = min(0.5, clip.duration - 0.01)
-            frame = clip.get_frame(frame_time)
-            thumbnail_bytes = iio.imwrite(
-                "<bytes>", frame, plugin="pillow", format="png"
-            )
+        extract_frame(media.path, thumbnail.path, frame_time)
+    except RuntimeError:
+        # The movie itself already probed fine, it just goes without a
+        # poster image.
+        logger.exception("Thumbnail extraction failed for %s", media.path)
+    if not thumbnail.size:
+        thumbnail.close()
+        return None
+    return thumbnail
+
+
+def create_mezzanine(
+    db: Session,
+    storage: StorageBackend,
+    movie_id: int,
+    media: MediaHandle | None = None,
+) -> Movie:
+    db_movie = db.get(Movie, movie_id)
+    if db_movie is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    if media is None:
+        media = storage.download_to(
+            services_storage_gc.storage_key(db_movie.file_path)
+        )
+
+    try:
+        with media:
+            mezzanine_path = ReelGenerator().create_mezzanine(media)
     except Exception:
-        os.unlink(tmp_path)
-        raise ValueError("Cannot open video file for processing.")
-    os.unlink(tmp_path)
-    return thumbnail_bytes
+        db_movie.mezzanine_status = MezzanineStatus.Failed.value
+        db.commit()
+        raise
+
+    with MediaHandle(mezzanine_path, owned=True) as mezzanine:
+        file_dest = storage.upload_file(
+            mezzanine, f"{db_movie.id}_mezzanine.mp4"
+        )
+
+    db_movie.mezzanine_path = file_dest
+    db_movie.mezzanine_status = MezzanineStatus.Ready.value
+    db.commit()
+    db.refresh(db_movie)
+    return db_movie
+
+
+def _create_mezzanine_task(movie_id: int, media: MediaHandle):
+    with Session(engine) as db:
+        try:
+            create_mezzanine(db, get_storage(), movie_id, media)
+        except Exception:
+            logger.exception(
+                "Mezzanine transcode failed for movie %s", movie_id
+            )
+
+
+def schedule_mezzanine(
+    db: Session,
+    background_tasks: BackgroundTasks,
+    db_movie: Movie,
+    media: MediaHandle,
+) -> None:
+    if not settings.MEZZANINE_ENABLED:
+        return
+    db_movie.mezzanine_status = MezzanineStatus.Pending.value
+    db.commit()
+    db.refresh(db_movie)
+
+    if settings.JOB_BACKEND == services_jobs.QUEUE_BACKEND:
+        services_jobs.enqueue_job(
+            db,
+            JobKind.TranscodeMezzanine.value,
+            {"movie_id": db_movie.id},
+            db_movie.author,
+        )
+    else:
+        # The task outlives the request, so it takes over the upload.
+        background_tasks.add_task(
+            _create_mezzanine_task, db_movie.id, media.release()
+        )
 
 
 def create_movie(
     db: Session,
     user_uidd: int,
-    storage: SupabaseStorageBackend,
+    storage: StorageBackend,
     movie_file: UploadFile,
     movie_info: MovieCreate,
+    background_tasks: BackgroundTasks | None = None,
 ) -> Movie:
-    extension = os.path.splitext(movie_file.filename)[1]
+    extension = movie_extension(movie_file.filename)
+    with spool_upload(
+        movie_file, extension, settings.MOVIE_UPLOAD_MAX_BYTES
+    ) as media:
+        return ingest_movie(
+            db,
+            user_uidd,
+            storage,
+            media,
+            movie_info,
+            background_tasks,
+        )
 
+
+def movie_extension(filename: str) -> str:
+    extension = os.path.splitext(filename)[1]
     if extension.lower() not in settings.ALLOWED_VIDEO_EXTENSIONS:
         raise HTTPException(
             status_code=400,
             detail="Invalid file type. Only video files are allowed.",
         )
-    file_bytes = movie_file.file.read()
+    return extension
 
-    duration = get_file_duration(file_bytes)
-    thumbnail_bytes = get_video_thumbnail(file_bytes)
+
+def ingest_movie(
+    db: Session,
+    user_uidd: int,
+    storage: StorageBackend,
+    media: MediaHandle,
+    movie_info: MovieCreate,
+    background_tasks: BackgroundTasks | None = None,
+) -> Movie:
+    extension = media.suffix
+    info = probe_movie(media)
+    check_duration(info.duration, settings.MOVIE_MAX_DURATION)
+    # A movie with the same content has been through the thumbnail and
+    # mezzanine steps already, its outputs are shared.
+    twin = db.exec(
+        select(Movie)
+        .where(Movie.sha256 == media.digest(), Movie.file_path.is_not(None))
+        .order_by(Movie.id)
+    ).first()
 
     db_movie = Movie(
         title=movie_info.title,
@@ -142,49 +272,84 @@ def create_movie(
         author=user_uidd,
         native_lang=movie_info.native_lang,
         type=extension.lstrip("."),
-        duration=duration,
+        duration=int(info.duration),
+        codec=info.codec,
+        width=info.width,
+        height=info.height,
+        fps=info.fps,
+        rotation=info.rotation,
+        bit_rate=info.bit_rate,
+        sha256=media.digest(),
     )
     db.add(db_movie)
     db.commit()
     db.refresh(db_movie)
 
-    storage_filename = f"{db_movie.id}{extension}"
-    file_dest = storage.upload_file(file_bytes, storage_filename)
-    db_movie.file_path = file_dest
-
-    if thumbnail_bytes:
-        thumbnail_filename = f"{db_movie.id}.png"
-        thumbnail_dest = storage.upload_file(
-            thumbnail_bytes, thumbnail_filename
+    thumbnail = None
+    extra_files = []
+    if twin is not None and twin.thumbnail_path:
+        db_movie.thumbnail_path = twin.thumbnail_path
+    else:
+        thumbnail = get_video_thumbnail(media, info.duration)
+        if thumbnail is not None:
+            extra_files.append((thumbnail, f"{db_movie.id}.png"))
+    try:
+        blob, thumbnail_dest = services_blob.acquire(
+            db, storage, media, extension, extra_files
         )
-        db_movie.thumbnail_path = thumbnail_dest
-
+    finally:
+        if thumbnail is not None:
+            thumbnail.close()
+    db_movie.file_path = blob.file_path
+    if thumbnail_dest:
+        db_movie.thumbnail_path = thumbnail_dest[0]
+
+    shared_mezzanine = (
+        twin is not None
+        and twin.mezzanine_status == MezzanineStatus.Ready.value
+    )
+    if shared_mezzanine:
+        db_movie.mezzanine_path = twin.mezzanine_path
+        db_movie.mezzanine_status = twin.mezzanine_status
     db.commit()
     db.refresh(db_movie)
 
+    if background_tasks is not None and not shared_mezzanine:
+        schedule_mezzanine(db, background_tasks, db_movie, media)
+
     return db_movie
 
 
 def delete_movie(
-    db: Session, storage: SupabaseStorageBackend, movie_id: int
+    db: Session,
+    movie_id: int,
+    background_tasks: BackgroundTasks | None = None,
 ) -> None:
     db_movie = db.get(Movie, movie_id)
     if not db_movie:
         raise HTTPException(status_code=404, detail="Movie not found")
 
-    for reel in db_movie.reels:
-        services_reel.delete_reel(db, storage, reel.id)
-
-    if db_movie.file_path:
-        storage.delete_file(f"{db_movie.id}.{db_movie.type}")
+    # One transaction for the movie and its reels; the objects are removed
+    # in a batch by the collector afterwards.
+    services_reel.remove_reels(db, list(db_movie.reels))
+    services_blob.release(db, db_movie.file_path)
+    # Shared with movies of the same content, the collector keeps them
+    # while any of those rows points at them.
+    services_storage_gc.tombstone(
+        db, [db_movie.thumbnail_path, db_movie.mezzanine_path]
+    )
     db.delete(db_movie)
     db.commit()
+    services_storage_gc.schedule_collection(db, background_tasks)
 
 
 def delete_movie_by_user(
-    db: Session, user_id: int, storage: SupabaseStorageBackend, movie_id: int
+    db: Session,
+    user_id: int,
+    movie_id: int,
+    background_tasks: BackgroundTasks | None = None,
 ) -> None:
     db_movie = get_movie_by_user(db, user_id, movie_id)
     if not db_movie:
         raise HTTPException(status_code=404, detail="Movie not found")
-    delete_movie(db, storage, db_movie.id)
+    delete_movie(db, db_movie.id, background_tasks)
@@ -0,0 +1,232 @@
+import os
+import shutil
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta
+
+from fastapi import BackgroundTasks, HTTPException
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.media import MediaHandle
+from app.core.storage.backends import StorageBackend
+from app.db.models.movie import Movie
+from app.db.models.movie_upload import MovieUpload, MovieUploadChunk
+from app.schemas.movie import MovieCreate
+from app.schemas.movie_upload import (
+    MovieUploadCreate,
+    MovieUploadExpiry,
+    MovieUploadRead,
+)
+from app.services import movie as services_movie
+
+
+def _upload_dir(upload_id: str) -> str:
+    return os.path.join(settings.MOVIE_UPLOAD_DIR, upload_id)
+
+
+def _chunk_path(upload_id: str, offset: int) -> str:
+    # Zero padded so the chunk files sort in offset order.
+    return os.path.join(_upload_dir(upload_id), f"{offset:020d}.part")
+
+
+def _expires_at() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=settings.MOVIE_UPLOAD_TTL)
+
+
+def _get_chunks(db: Session, upload_id: str) -> list[MovieUploadChunk]:
+    return db.exec(
+        select(MovieUploadChunk)
+        .where(MovieUploadChunk.upload_id == upload_id)
+        .order_by(MovieUploadChunk.offset)
+    ).all()
+
+
+def _received_ranges(chunks: list[MovieUploadChunk]) -> list[tuple[int, int]]:
+    ranges = []
+    for chunk in chunks:
+        end = chunk.offset + chunk.size
+        if ranges and chunk.offset <= ranges[-1][1]:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+        else:
+            ranges.append((chunk.offset, end))
+    return ranges
+
+
+def _upload_read(db: Session, upload: MovieUpload) -> MovieUploadRead:
+    ranges = _received_ranges(_get_chunks(db, upload.id))
+    offset = ranges[0][1] if ranges and ranges[0][0] == 0 else 0
+    return MovieUploadRead(
+        id=upload.id,
+        filename=upload.filename,
+        size=upload.size,
+        offset=offset,
+        ranges=ranges,
+        expires_at=upload.expires_at,
+    )
+
+
+def _get_upload(
+    db: Session, user_id: int, upload_id: str, for_update: bool = False
+) -> MovieUpload:
+    statement = select(MovieUpload).where(
+        MovieUpload.id == upload_id, MovieUpload.author == user_id
+    )
+    if for_update:
+        statement = statement.with_for_update()
+    upload = db.exec(statement).first()
+    if upload is None or upload.expires_at < datetime.utcnow():
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+
+def _remove_upload(db: Session, upload: MovieUpload):
+    for chunk in _get_chunks(db, upload.id):
+        db.delete(chunk)
+    db.delete(upload)
+    db.commit()
+    shutil.rmtree(_upload_dir(upload.id), ignore_errors=True)
+
+
+def expire_uploads(db: Session) -> MovieUploadExpiry:
+    expired = db.exec(
+        select(MovieUpload).where(MovieUpload.expires_at < datetime.utcnow())
+    ).all()
+    for upload in expired:
+        _remove_upload(db, upload)
+    return MovieUploadExpiry(expired=len(expired))
+
+
+def create_upload(
+    db: Session, user_id: int, upload_info: MovieUploadCreate
+) -> MovieUploadRead:
+    services_movie.movie_extension(upload_info.filename)
+    if upload_info.size > settings.MOVIE_UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds {settings.MOVIE_UPLOAD_MAX_BYTES} bytes.",
+        )
+    expire_uploads(db)
+
+    upload = MovieUpload(
+        author=user_id,
+        filename=upload_info.filename,
+        size=upload_info.size,
+        title=upload_info.title,
+        description=upload_info.description,
+        native_lang=upload_info.native_lang,
+        expires_at=_expires_at(),
+    )
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+    os.makedirs(_upload_dir(upload.id), exist_ok=True)
+    return _upload_read(db, upload)
+
+
+def get_upload(db: Session, user_id: int, upload_id: str) -> MovieUploadRead:
+    return _upload_read(db, _get_upload(db, user_id, upload_id))
+
+
+async def spool_chunk(
+    upload_id: str, body: AsyncIterator[bytes]
+) -> MediaHandle:
+    # Written next to the other chunks so storing it is a rename.
+    upload_dir = _upload_dir(upload_id)
+    if not os.path.isdir(upload_dir):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    media = MediaHandle.temporary(".tmp", prefix="chunk_", directory=upload_dir)
+    size = 0
+    try:
+        with open(media.path, "wb") as f:
+            async for data in body:
+                size += len(data)
+                if size > settings.MOVIE_UPLOAD_CHUNK_MAX_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail="Chunk exceeds "
+                        f"{settings.MOVIE_UPLOAD_CHUNK_MAX_BYTES} bytes.",
+                    )
+                f.write(data)
+    except BaseException:
+        media.close()
+        raise
+    return media
+
+
+def store_chunk(
+    db: Session, user_id: int, upload_id: str, offset: int, chunk: MediaHandle
+) -> MovieUploadRead:
+    with chunk:
+        # The row lock serialises chunks sent in parallel, so the overlap
+        # check sees every chunk stored before this one.
+        upload = _get_upload(db, user_id, upload_id, for_update=True)
+        size = chunk.size
+        if not size or offset + size > upload.size:
+            raise HTTPException(
+                status_code=400, detail="Chunk is outside of the upload."
+            )
+        for other in _get_chunks(db, upload_id):
+            if other.offset == offset and other.size == size:
+                continue  # a retried chunk replaces the earlier copy
+            if (
+                other.offset < offset + size
+                and offset < other.offset + other.size
+            ):
+                raise HTTPException(
+                    status_code=409,
+                    detail="Chunk overlaps a chunk already received.",
+                )
+        os.replace(chunk.path, _chunk_path(upload_id, offset))
+        db.merge(
+            MovieUploadChunk(upload_id=upload_id, offset=offset, size=size)
+        )
+        upload.expires_at = _expires_at()
+        db.commit()
+        db.refresh(upload)
+    return _upload_read(db, upload)
+
+
+def _assemble(
+    upload: MovieUpload, chunks: list[MovieUploadChunk]
+) -> MediaHandle:
+    extension = os.path.splitext(upload.filename)[1]
+    media = MediaHandle.temporary(extension)
+    try:
+        with open(media.path, "wb") as f:
+            for chunk in chunks:
+                with open(_chunk_path(upload.id, chunk.offset), "rb") as part:
+                    shutil.copyfileobj(part, f)
+    except Exception:
+        media.close()
+        raise
+    return media
+
+
+def finalize_upload(
+    db: Session,
+    user_id: int,
+    storage: StorageBackend,
+    upload_id: str,
+    background_tasks: BackgroundTasks | None = None,
+) -> Movie:
+    upload = _get_upload(db, user_id, upload_id)
+    if _upload_read(db, upload).offset != upload.size:
+        raise HTTPException(status_code=409, detail="Upload is incomplete.")
+
+    movie_info = MovieCreate(
+        title=upload.title,
+        description=upload.description,
+        native_lang=upload.native_lang,
+    )
+    # A failed ingestion keeps the chunks, so finalizing can be retried
+    # until the upload expires.
+    with _assemble(upload, _get_chunks(db, upload.id)) as media:
+        movie = services_movie.ingest_movie(
+            db, user_id, storage, media, movie_info, background_tasks
+        )
+    _remove_upload(db, upload)
+    return movie
+
+
+def delete_upload(db: Session, user_id: int, upload_id: str):
+    _remove_upload(db, _get_upload(db, user_id, upload_id))
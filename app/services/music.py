@@ -1,14 +1,22 @@
 import os
 from collections.abc import Sequence
 
-from fastapi import HTTPException, UploadFile
+from fastapi import BackgroundTasks, HTTPException, UploadFile
 from sqlmodel import Session, asc, desc, select
 
 from app.core.config import settings
-from app.core.storage.backends import SupabaseStorageBackend
+from app.core.storage.backends import StorageBackend
 from app.db.models.music import Music
 from app.schemas.music import MusicCreate, MusicRead
-from app.services.utils import get_file_duration
+from app.services import (
+    blob as services_blob,
+    storage_gc as services_storage_gc,
+)
+from app.services.utils import (
+    check_duration,
+    get_file_duration,
+    spool_upload,
+)
 
 
 def _music_to_read(db_music: Music) -> MusicRead:
@@ -71,7 +79,7 @@ def get_all_music_by_user(
 def create_music(
     db: Session,
     user_uidd: int,
-    storage: SupabaseStorageBackend,
+    storage: StorageBackend,
     music_file: UploadFile,
     music_info: MusicCreate,
 ) -> MusicRead:
@@ -83,54 +91,59 @@ def create_music(
             detail="Invalid file type. Only the following extensions are allowed: "
             + ", ".join(settings.ALLOWED_MUSIC_EXTENSIONS),
         )
-    file_bytes = music_file.file.read()
-
-    duration = get_file_duration(file_bytes, ".wav")
-
-    db_music = Music(
-        title=music_info.title,
-        author=user_uidd,
-        type=extension.lstrip("."),
-        duration=duration,
-    )
-    db.add(db_music)
-    db.commit()
-    db.refresh(db_music)
-
-    storage_filename = f"music_{db_music.id}{extension}"
-    file_dest = storage.upload_file(file_bytes, storage_filename)
-    db_music.file_path = file_dest
-
-    db.commit()
-    db.refresh(db_music)
+    with spool_upload(
+        music_file, ".wav", settings.MUSIC_UPLOAD_MAX_BYTES
+    ) as media:
+        duration = get_file_duration(media)
+        check_duration(duration, settings.MUSIC_MAX_DURATION)
+
+        # Tracks uploaded before are only counted, not stored again.
+        blob, _ = services_blob.acquire(db, storage, media, extension)
+        db_music = Music(
+            title=music_info.title,
+            author=user_uidd,
+            type=extension.lstrip("."),
+            duration=duration,
+            file_path=blob.file_path,
+            sha256=blob.sha256,
+        )
+        db.add(db_music)
+        db.commit()
+        db.refresh(db_music)
 
     return _music_to_read(db_music)
 
 
 def delete_music(
-    db: Session, storage: SupabaseStorageBackend, music_id: int
+    db: Session,
+    music_id: int,
+    background_tasks: BackgroundTasks | None = None,
 ) -> None:
     db_music = db.get(Music, music_id)
     if not db_music:
         raise HTTPException(status_code=404, detail="Music not found")
-    _delete_music_file(db, storage, db_music)
+    _delete_music_file(db, db_music, background_tasks)
 
 
 def delete_music_by_user(
-    db: Session, user_id: int, storage: SupabaseStorageBackend, music_id: int
+    db: Session,
+    user_id: int,
+    music_id: int,
+    background_tasks: BackgroundTasks | None = None,
 ) -> None:
     db_music = get_music(db, music_id)
     if not db_music or db_music.author != user_id:
         raise HTTPException(status_code=404, detail="Music not found")
 
-    _delete_music_file(db, storage, db_music)
+    _delete_music_file(db, db_music, background_tasks)
 
 
 def _delete_music_file(
-    db: Session, storage: SupabaseStorageBackend, db_music: Music
+    db: Session,
+    db_music: Music,
+    background_tasks: BackgroundTasks | None = None,
 ) -> None:
-    if db_music.file_path:
-        storage.delete_file(f"music_{db_music.id}.{db_music.type}")
-
+    services_blob.release(db, db_music.file_path)
     db.delete(db_music)
     db.commit()
+    services_storage_gc.schedule_collection(db, background_tasks)
@@ -1,165 +1,670 @@
+import logging
 import os
+import shutil
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack
 
+from fastapi import BackgroundTasks
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
 
-from app.core.reel_generator import ReelGenerator
-from app.core.storage.backends import SupabaseStorageBackend
+from app.core.config import settings
+from app.core.ffmpeg_renderer import HLS_PLAYLIST
+from app.core.media import MediaHandle
+from app.core.reel_generator import ReelGenerator, RenderVariant
+from app.core.storage.backends import StorageBackend
 from app.db.models.audio import Audio
+from app.db.models.movie import Movie
+from app.db.models.music import Music
 from app.db.models.reel import Reel
+from app.db.models.render_cache import RenderCacheEntry
+from app.db.models.srt import Srt
+from app.models.movie.mezzanine_status import MezzanineStatus
+from app.models.reel_generator.render_engine import RenderEngine
 from app.schemas.audio import AudioRead
-from app.schemas.reel import ReelCreate, ReelWithAudio
+from app.schemas.reel import (
+    ReelBatchCreate,
+    ReelBatchResult,
+    ReelCreate,
+    ReelRead,
+    ReelWithAudio,
+)
+from app.services import (
+    blob as services_blob,
+    render_cache as services_render_cache,
+    storage_gc as services_storage_gc,
+)
 
+logger = logging.getLogger(__name__)
 
-def get_reel(db: Session, reel_id: int) -> ReelWithAudio | None:
-    reel = db.get(Reel, reel_id)
-    if not reel:
-        return None
-    audio = db.get(Audio, reel.audio_id) if reel.audio_id else None
-    audio_read = AudioRead.from_orm(audio) if audio else None
+HLS_PREFIX = "hls/"
+
+# Share of render_reel progress given to downloading and to rendering, the
+# remainder covers packaging and the upload.
+DOWNLOAD_PROGRESS = 0.1
+RENDER_PROGRESS = 0.85
+# Render parameters that only change the soundtrack. Reels that agree on
+# everything else share the same video stream.
+AUDIO_RENDER_PARAMS = (
+    "audio",
+    "music",
+    "music_volume",
+    "music_ducking_db",
+    "audio_premix",
+)
+
+
+# Loads what ReelWithAudio reads from a reel up front, a fixed number of
+# queries however many reels are listed.
+REEL_READ_OPTIONS = (selectinload(Reel.audio).selectinload(Audio.srt),)
+
+
+def reel_with_audio(reel: Reel) -> ReelWithAudio:
     return ReelWithAudio(
         id=reel.id,
         lang=reel.lang,
         file_path=reel.file_path,
+        playlist_path=reel.playlist_path,
         movie_id=reel.movie_id,
         author=reel.author,
-        audio=audio_read,
+        audio=AudioRead.from_orm(reel.audio) if reel.audio else None,
     )
 
 
+def get_reel(db: Session, reel_id: int) -> ReelWithAudio | None:
+    reel = db.get(Reel, reel_id, options=REEL_READ_OPTIONS)
+    if not reel:
+        return None
+    return reel_with_audio(reel)
+
+
 def get_reels(
     db: Session, skip: int = 0, limit: int = 100
 ) -> list[ReelWithAudio]:
-    reels = db.exec(select(Reel).offset(skip).limit(limit)).all()
-    result = []
-    for reel in reels:
-        audio = db.get(Audio, reel.audio_id) if reel.audio_id else None
-        audio_read = AudioRead.from_orm(audio) if audio else None
-        result.append(
-            ReelWithAudio(
-                id=reel.id,
-                lang=reel.lang,
-                file_path=reel.file_path,
-                movie_id=reel.movie_id,
-                author=reel.author,
-                audio=audio_read,
-            )
-        )
-    return result
+    reels = db.exec(
+        select(Reel).options(*REEL_READ_OPTIONS).offset(skip).limit(limit)
+    ).all()
+    return [reel_with_audio(reel) for reel in reels]
 
 
 def get_reel_by_user(
     db: Session, user_id: int, reel_id: int
 ) -> ReelWithAudio | None:
     reel = db.exec(
-        select(Reel).where(Reel.author == user_id, Reel.id == reel_id)
+        select(Reel)
+        .where(Reel.author == user_id, Reel.id == reel_id)
+        .options(*REEL_READ_OPTIONS)
     ).first()
     if not reel:
         return None
-    audio = db.get(Audio, reel.audio_id) if reel.audio_id else None
-    audio_read = AudioRead.from_orm(audio) if audio else None
-    return ReelWithAudio(
-        id=reel.id,
-        lang=reel.lang,
-        file_path=reel.file_path,
-        movie_id=reel.movie_id,
-        author=reel.author,
-        audio=audio_read,
-    )
+    return reel_with_audio(reel)
 
 
 def get_reels_by_user(
     db: Session, user_id: int, skip: int = 0, limit: int = 100
 ) -> list[ReelWithAudio]:
     reels = db.exec(
-        select(Reel).where(Reel.author == user_id).offset(skip).limit(limit)
+        select(Reel)
+        .where(Reel.author == user_id)
+        .options(*REEL_READ_OPTIONS)
+        .offset(skip)
+        .limit(limit)
     ).all()
-    result = []
-    for reel in reels:
-        audio = db.get(Audio, reel.audio_id) if reel.audio_id else None
-        audio_read = AudioRead.from_orm(audio) if audio else None
-        result.append(
-            ReelWithAudio(
-                id=reel.id,
-                lang=reel.lang,
-                file_path=reel.file_path,
-                movie_id=reel.movie_id,
-                author=reel.author,
-                audio=audio_read,
+    return [reel_with_audio(reel) for reel in reels]
+
+
+def get_movie_source(db: Session, movie_id: int, movie_type: str):
+    db_movie = db.get(Movie, movie_id)
+    if (
+        db_movie
+        and db_movie.mezzanine_path
+        and db_movie.mezzanine_status == MezzanineStatus.Ready.value
+    ):
+        return db_movie.mezzanine_path.split("//")[-1], True
+    if db_movie and db_movie.file_path:
+        return db_movie.file_path.split("//")[-1], False
+    return f"{movie_id}.{movie_type}", False
+
+
+def _music_key(db: Session, music_id: int) -> str:
+    db_music = db.get(Music, music_id)
+    if db_music is None or not db_music.file_path:
+        return f"music_{music_id}.wav"
+    return db_music.file_path.split("//")[-1]
+
+
+def _input_keys(db: Session, reel_info: ReelCreate) -> list[str | None]:
+    # Storage keys of the audio, srt, music and ass inputs of one reel, None
+    # for the ones it does not use.
+    ass_key = None
+    if settings.ASS_SUBTITLES_ENABLED and reel_info.include_srt:
+        db_srt = db.exec(
+            select(Srt).where(Srt.audio_id == reel_info.audio_id)
+        ).first()
+        # Transcriptions made before the ASS export only have the SRT.
+        if db_srt is not None and db_srt.ass_path:
+            ass_key = db_srt.ass_path.split("//")[-1]
+    return [
+        f"audio_{reel_info.audio_id}.wav" if reel_info.audio_id else None,
+        (
+            f"transcription_{reel_info.audio_id}.srt"
+            if reel_info.include_srt
+            else None
+        ),
+        _music_key(db, reel_info.music_id) if reel_info.music_id else None,
+        ass_key,
+    ]
+
+
+def _download_all(
+    storage: StorageBackend, keys: list[str | None], stack: ExitStack
+) -> list[MediaHandle | None]:
+    # One concurrent fetch for all inputs. Every file is registered on the
+    # stack, so none is left behind on disk if a later step fails.
+    present = [key for key in keys if key]
+    downloaded = iter(storage.download_many(present))
+    media = [
+        stack.enter_context(next(downloaded)) if key else None for key in keys
+    ]
+    for key, handle in zip(keys, media):
+        # Blob keys name their digest, the render cache needs no rehash.
+        digest = key and services_blob.key_digest(key)
+        if digest:
+            handle.assume_digest(digest)
+    return media
+
+
+def download_reel_inputs(
+    db: Session,
+    storage: StorageBackend,
+    reel_info: ReelCreate,
+    movie_key: str,
+    stack: ExitStack,
+) -> tuple[
+    MediaHandle,
+    MediaHandle | None,
+    MediaHandle | None,
+    MediaHandle | None,
+    MediaHandle | None,
+]:
+    keys = [movie_key, *_input_keys(db, reel_info)]
+    return tuple(_download_all(storage, keys, stack))
+
+
+def _render_params(
+    generator: ReelGenerator,
+    movie: MediaHandle,
+    audio: MediaHandle | None,
+    srt: MediaHandle | None,
+    music: MediaHandle | None,
+    music_volume: float | None,
+    ass: MediaHandle | None = None,
+) -> dict:
+    params = {
+        **generator.render_params(),
+        "movie": services_render_cache.input_digest(movie),
+        "srt": services_render_cache.input_digest(srt),
+        "audio": services_render_cache.input_digest(audio),
+        "music": services_render_cache.input_digest(music),
+        "music_volume": music_volume if music else None,
+        # How voice and music are mixed, only relevant with music.
+        "music_ducking_db": settings.MUSIC_DUCKING_DB if music else None,
+        "audio_premix": settings.AUDIO_PREMIX_ENABLED if music else None,
+    }
+    if ass is not None:
+        params["ass"] = services_render_cache.input_digest(ass)
+    return params
+
+
+def _video_key(render_params: dict) -> str:
+    return services_render_cache.render_cache_key(
+        {
+            name: value
+            for name, value in render_params.items()
+            if name not in AUDIO_RENDER_PARAMS
+        }
+    )
+
+
+def _reel_cache_key(render_params: dict) -> str | None:
+    if not settings.RENDER_CACHE_ENABLED:
+        return None
+    return services_render_cache.render_cache_key(render_params)
+
+
+def _find_video_source(db: Session, video_key: str) -> Reel | None:
+    # Any earlier reel rendered from the same movie, subtitles and video
+    # parameters has the exact picture we need.
+    return db.exec(
+        select(Reel)
+        .where(Reel.video_key == video_key, Reel.file_path.is_not(None))
+        .order_by(Reel.id.desc())
+    ).first()
+
+
+def _package_reel(
+    db: Session,
+    storage: StorageBackend,
+    db_reel: Reel,
+    reel_path: str | None,
+    cache_key: str | None,
+    cached: RenderCacheEntry | None,
+) -> str | None:
+    # Reels rendered with the same parameters share one package. A reel
+    # stays playable as a plain MP4 if packaging fails.
+    prefix = f"{HLS_PREFIX}{cache_key or f'reel_{db_reel.id}'}/"
+    playlist_key = f"{prefix}{HLS_PLAYLIST}"
+    if cache_key:
+        shared = db.exec(
+            select(Reel.playlist_path).where(
+                Reel.playlist_path.endswith(playlist_key)
             )
+        ).first()
+        if shared:
+            return shared
+    try:
+        with ExitStack() as stack:
+            if reel_path is None:
+                reel_path = stack.enter_context(
+                    storage.download_to(cached.storage_path)
+                ).path
+            output_dir = _build_generator().package_hls(reel_path)
+            stack.callback(shutil.rmtree, output_dir, ignore_errors=True)
+            files = []
+            for directory, _, names in os.walk(output_dir):
+                for name in names:
+                    path = os.path.join(directory, name)
+                    relative = os.path.relpath(path, output_dir)
+                    files.append(
+                        (
+                            MediaHandle(path),
+                            prefix + relative.replace(os.sep, "/"),
+                        )
+                    )
+            # A package of deleted reels may still be queued for removal.
+            services_storage_gc.untombstone(db, [prefix])
+            db.commit()
+            storage.upload_files(files)
+    except Exception:
+        logger.exception("Packaging reel %s as HLS failed", db_reel.id)
+        return None
+    return storage.public_url(playlist_key)
+
+
+def _job_reel(db: Session, job_key: str | None) -> Reel | None:
+    if job_key is None:
+        return None
+    return db.exec(select(Reel).where(Reel.job_key == job_key)).first()
+
+
+def _save_reel(
+    db: Session,
+    storage: StorageBackend,
+    reel_info: ReelCreate,
+    lang: str,
+    user_id: int,
+    reel_path: str | None,
+    render_params: dict,
+    cached: RenderCacheEntry | None,
+    job_key: str | None = None,
+) -> Reel:
+    cache_key = _reel_cache_key(render_params)
+    # A retry of a job that died before the upload finished takes over the
+    # row it left behind, its file goes to the same storage key.
+    db_reel = _job_reel(db, job_key)
+    if db_reel is None:
+        db_reel = Reel(
+            lang=lang,
+            author=user_id,
+            movie_id=reel_info.movie_id,
+            audio_id=reel_info.audio_id,
+            render_params=render_params,
+            video_key=_video_key(render_params),
+            job_key=job_key,
         )
-    return result
+        db.add(db_reel)
+        db.commit()
+        db.refresh(db_reel)
+
+    storage_filename = f"reel_{db_reel.id}.mp4"
+    stored = False
+    if cache_key and cached is None:
+        cached = services_render_cache.store(db, storage, cache_key, reel_path)
+        stored = cached is not None
+    if cached is not None:
+        # Each reel gets its own copy so deleting a reel and evicting the
+        # cache never pull an object from under each other.
+        file_dest = storage.copy_file(cached.storage_path, storage_filename)
+    else:
+        file_dest = storage.upload_file(
+            MediaHandle(reel_path), storage_filename
+        )
+
+    db_reel.file_path = file_dest
+    if settings.HLS_ENABLED:
+        db_reel.playlist_path = _package_reel(
+            db, storage, db_reel, reel_path, cache_key, cached
+        )
+    db.commit()
+    db.refresh(db_reel)
+    if reel_path:
+        os.remove(reel_path)
+    if stored:
+        # Only now that the reel has its copy, the new entry may push out
+        # older ones.
+        services_render_cache.evict(db)
+
+    return db_reel
 
 
 def create_reel(
     db: Session,
-    storage: SupabaseStorageBackend,
+    storage: StorageBackend,
     reel_info: ReelCreate,
-    movie: bytes,
-    audio: bytes | None,
-    music: bytes | None,
+    movie: MediaHandle,
+    audio: MediaHandle | None,
+    music: MediaHandle | None,
     music_volume: float | None,
-    srt: bytes | None,
+    srt: MediaHandle | None,
     lang: str,
     user_id: int,
+    on_progress: Callable[[float], None] | None = None,
+    prescaled: bool = False,
+    ass: MediaHandle | None = None,
+    job_key: str | None = None,
 ) -> Reel:
-    reel_path = _generate_reel(movie, audio, srt, music, music_volume)
+    generator = _build_generator(engine=reel_info.engine)
+    render_params = _render_params(
+        generator, movie, audio, srt, music, music_volume, ass
+    )
+    cache_key = _reel_cache_key(render_params)
+    cached = services_render_cache.lookup(db, cache_key) if cache_key else None
 
-    db_reel = Reel(
-        lang=lang,
-        author=user_id,
-        movie_id=reel_info.movie_id,
-        audio_id=reel_info.audio_id,
+    reel_path = None
+    source = None
+    if cached is None:
+        source = _find_video_source(db, _video_key(render_params))
+    if source is not None:
+        with storage.download_to(source.file_path.split("//")[-1]) as video:
+            reel_path = generator.remux(video, audio, music, music_volume)
+    elif cached is None:
+        reel_path = _generate_reel(
+            generator,
+            movie,
+            audio,
+            srt,
+            music,
+            music_volume,
+            on_progress=on_progress,
+            prescaled=prescaled,
+            ass=ass,
+        )
+
+    return _save_reel(
+        db,
+        storage,
+        reel_info,
+        lang,
+        user_id,
+        reel_path,
+        render_params,
+        cached,
+        job_key=job_key,
     )
-    db.add(db_reel)
-    db.commit()
-    db.refresh(db_reel)
 
-    storage_filename = f"reel_{db_reel.id}.mp4"
-    with open(reel_path, "rb") as reel_file:
-        reel_file.seek(0)
 
-        file_bytes = reel_file.read()
-        file_dest = storage.upload_file(file_bytes, storage_filename)
+def render_reel(
+    db: Session,
+    storage: StorageBackend,
+    reel_info: ReelCreate,
+    movie_type: str,
+    lang: str,
+    user_id: int,
+    on_progress: Callable[[float], None] | None = None,
+    job_key: str | None = None,
+) -> Reel:
+    def report(fraction: float):
+        if on_progress:
+            on_progress(fraction)
 
-    db_reel.file_path = file_dest
-    db.commit()
-    db.refresh(db_reel)
-    reel_file.close()
-    os.remove(reel_path)
+    # Queued jobs are retried after a crash or a lost lease, a reel an
+    # earlier attempt finished is returned instead of rendered again.
+    done = _job_reel(db, job_key)
+    if done is not None and done.file_path:
+        report(1.0)
+        return done
 
-    return db_reel
+    report(0.0)
+    movie_key, prescaled = get_movie_source(db, reel_info.movie_id, movie_type)
+    with ExitStack() as stack:
+        movie, audio, srt, music, ass = download_reel_inputs(
+            db, storage, reel_info, movie_key, stack
+        )
+        report(DOWNLOAD_PROGRESS)
+
+        reel = create_reel(
+            db,
+            storage,
+            reel_info,
+            movie,
+            audio,
+            music,
+            reel_info.music_volume,
+            srt,
+            lang,
+            user_id,
+            on_progress=lambda fraction: report(
+                DOWNLOAD_PROGRESS + fraction * RENDER_PROGRESS
+            ),
+            prescaled=prescaled,
+            ass=ass,
+            job_key=job_key,
+        )
+    report(1.0)
+    return reel
+
+
+def render_reel_batch(
+    db: Session,
+    storage: StorageBackend,
+    batch: ReelBatchCreate,
+    movie_type: str,
+    langs: list[str],
+    user_id: int,
+    job_key: str | None = None,
+) -> Iterator[ReelBatchResult]:
+    # Each variant of a queued batch is keyed on its own, a retried batch
+    # only renders the variants an earlier attempt did not save.
+    job_keys = [
+        f"{job_key}:{idx}" if job_key else None
+        for idx in range(len(batch.variants))
+    ]
+    generator = _build_generator(engine=batch.engine)
+    movie_key, prescaled = get_movie_source(db, batch.movie_id, movie_type)
+    reel_infos = [
+        ReelCreate(
+            movie_id=batch.movie_id, engine=batch.engine, **variant.model_dump()
+        )
+        for variant in batch.variants
+    ]
+    todo = []
+    for idx, reel_info in enumerate(reel_infos):
+        done = _job_reel(db, job_keys[idx])
+        if done is not None and done.file_path:
+            yield ReelBatchResult(
+                index=idx,
+                audio_id=reel_info.audio_id,
+                reel=ReelRead.model_validate(done),
+            )
+        else:
+            todo.append(idx)
+    if not todo:
+        return
+
+    keys = [movie_key]
+    for idx in todo:
+        keys += _input_keys(db, reel_infos[idx])
+    with ExitStack() as stack:
+        movie, *inputs = _download_all(storage, keys, stack)
+        pending = []
+        for position, idx in enumerate(todo):
+            reel_info = reel_infos[idx]
+            # Four inputs per reel, in _input_keys order.
+            audio, srt, music, ass = inputs[4 * position : 4 * position + 4]
+            render_params = _render_params(
+                generator, movie, audio, srt, music, reel_info.music_volume, ass
+            )
+            cache_key = _reel_cache_key(render_params)
+            cached = (
+                services_render_cache.lookup(db, cache_key)
+                if cache_key
+                else None
+            )
+            if cached is None:
+                pending.append(
+                    (
+                        idx,
+                        reel_info,
+                        render_params,
+                        RenderVariant(
+                            audio, srt, music, reel_info.music_volume, ass
+                        ),
+                    )
+                )
+                continue
+            yield _save_batch_result(
+                db,
+                storage,
+                idx,
+                reel_info,
+                langs[idx],
+                user_id,
+                None,
+                render_params,
+                cached,
+                job_keys[idx],
+            )
+
+        if not pending:
+            return
+        outputs = generator.generate_batch(
+            movie, [variant for *_, variant in pending], prescaled=prescaled
+        )
+        for position, output in outputs:
+            idx, reel_info, render_params, _ = pending[position]
+            if isinstance(output, Exception):
+                yield ReelBatchResult(
+                    index=idx, audio_id=reel_info.audio_id, error=str(output)
+                )
+                continue
+            yield _save_batch_result(
+                db,
+                storage,
+                idx,
+                reel_info,
+                langs[idx],
+                user_id,
+                output,
+                render_params,
+                None,
+                job_keys[idx],
+            )
+
+
+def _save_batch_result(
+    db: Session,
+    storage: StorageBackend,
+    idx: int,
+    reel_info: ReelCreate,
+    lang: str,
+    user_id: int,
+    reel_path: str | None,
+    render_params: dict,
+    cached: RenderCacheEntry | None,
+    job_key: str | None,
+) -> ReelBatchResult:
+    # A failed upload only fails its own variant, the rest of the batch
+    # keeps streaming.
+    try:
+        reel = _save_reel(
+            db,
+            storage,
+            reel_info,
+            lang,
+            user_id,
+            reel_path,
+            render_params,
+            cached,
+            job_key=job_key,
+        )
+    except Exception as e:
+        db.rollback()
+        if reel_path and os.path.exists(reel_path):
+            os.remove(reel_path)
+        return ReelBatchResult(
+            index=idx, audio_id=reel_info.audio_id, error=str(e)
+        )
+    return ReelBatchResult(
+        index=idx,
+        audio_id=reel_info.audio_id,
+        reel=ReelRead.model_validate(reel),
+    )
+
+
+def remove_reels(db: Session, reels: list[Reel]) -> None:
+    services_storage_gc.tombstone(db, [reel.file_path for reel in reels])
+    services_storage_gc.tombstone(
+        db,
+        [
+            services_storage_gc.storage_prefix(reel.playlist_path)
+            for reel in reels
+            if reel.playlist_path
+        ],
+    )
+    for reel in reels:
+        db.delete(reel)
 
 
 def delete_reel(
-    db: Session, storage: SupabaseStorageBackend, reel_id: int
+    db: Session, reel_id: int, background_tasks: BackgroundTasks | None = None
 ) -> bool:
     db_reel = db.get(Reel, reel_id)
     if not db_reel:
         return False
-    if db_reel.file_path:
-        storage.delete_file(f"reel_{db_reel.id}.mp4")
-    db.delete(db_reel)
+    remove_reels(db, [db_reel])
     db.commit()
+    services_storage_gc.schedule_collection(db, background_tasks)
     return True
 
 
-def _generate_reel(
-    movie: bytes,
-    audio: bytes | None = None,
-    srt: bytes | None = None,
-    music: bytes | None = None,
-    music_volume: float = 0.2,
-    font: str = "Lato-Regular.ttf",
-) -> str:
-    generator = ReelGenerator(
+def _build_generator(
+    font: str = "Lato-Regular.ttf", engine: RenderEngine | None = None
+) -> ReelGenerator:
+    return ReelGenerator(
         font_filename=font,
+        engine=engine,
     )
 
+
+def _generate_reel(
+    generator: ReelGenerator,
+    movie: MediaHandle,
+    audio: MediaHandle | None = None,
+    srt: MediaHandle | None = None,
+    music: MediaHandle | None = None,
+    music_volume: float = 0.2,
+    on_progress: Callable[[float], None] | None = None,
+    prescaled: bool = False,
+    ass: MediaHandle | None = None,
+) -> str:
     output_path = generator.generate(
-        movie_bytes=movie,
-        audio_bytes=audio,
-        srt_bytes=srt,
-        music_bytes=music,
+        movie=movie,
+        audio=audio,
+        srt=srt,
+        music=music,
         music_volume=music_volume,
+        on_progress=on_progress,
+        prescaled=prescaled,
+        ass=ass,
     )
     return output_path
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+
+from fastapi import BackgroundTasks
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, func, select
+
+from app.core.config import settings
+from app.core.media import MediaHandle
+from app.core.storage.backends import StorageBackend
+from app.db.models.render_cache import RenderCacheCounter, RenderCacheEntry
+from app.schemas.render_cache import RenderCacheEviction, RenderCacheStats
+from app.services import storage_gc as services_storage_gc
+
+HITS_COUNTER = "hits"
+MISSES_COUNTER = "misses"
+
+
+def input_digest(data: MediaHandle | bytes | None) -> str | None:
+    if data is None:
+        return None
+    if isinstance(data, MediaHandle):
+        return data.digest()
+    return hashlib.sha256(data).hexdigest()
+
+
+def render_cache_key(render_params: dict) -> str:
+    # render_params already carries the input digests.
+    encoded = json.dumps(render_params, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _lock_counter(db: Session, name: str) -> RenderCacheCounter | None:
+    return db.exec(
+        select(RenderCacheCounter)
+        .where(RenderCacheCounter.name == name)
+        .with_for_update()
+    ).first()
+
+
+def _increment_counter(db: Session, name: str):
+    counter = _lock_counter(db, name)
+    if counter is None:
+        try:
+            # In a savepoint, losing the race to create the row must not
+            # roll back the caller's changes.
+            with db.begin_nested():
+                db.add(RenderCacheCounter(name=name, value=1))
+            return
+        except IntegrityError:
+            counter = _lock_counter(db, name)
+    counter.value += 1
+
+
+def lookup(db: Session, key: str) -> RenderCacheEntry | None:
+    entry = db.get(RenderCacheEntry, key)
+    if entry is None:
+        _increment_counter(db, MISSES_COUNTER)
+        db.commit()
+        return None
+
+    entry.hits += 1
+    entry.last_used_at = datetime.utcnow()
+    _increment_counter(db, HITS_COUNTER)
+    db.commit()
+    db.refresh(entry)
+    return entry
+
+
+def store(
+    db: Session, storage: StorageBackend, key: str, reel_path: str
+) -> RenderCacheEntry | None:
+    # A reel larger than the whole cache would only push everything else
+    # out and then itself, it is not cached. Eviction is left to the caller
+    # once it is done with the entry.
+    size = os.path.getsize(reel_path)
+    if size > settings.RENDER_CACHE_MAX_BYTES:
+        return None
+    storage_path = f"render_cache/{key}.mp4"
+    file_dest = storage.upload_file(MediaHandle(reel_path), storage_path)
+
+    entry = RenderCacheEntry(
+        key=key, storage_path=storage_path, file_path=file_dest, size=size
+    )
+    entry = db.merge(entry)
+    db.commit()
+    db.refresh(entry)
+    return entry
+
+
+def _remove_entry(db: Session, entry: RenderCacheEntry):
+    services_storage_gc.tombstone(db, [entry.storage_path])
+    db.delete(entry)
+
+
+def evict(
+    db: Session, background_tasks: BackgroundTasks | None = None
+) -> RenderCacheEviction:
+    evicted = freed_bytes = 0
+    expiry = datetime.utcnow() - timedelta(
+        days=settings.RENDER_CACHE_MAX_AGE_DAYS
+    )
+    expired = db.exec(
+        select(RenderCacheEntry).where(RenderCacheEntry.last_used_at < expiry)
+    ).all()
+    for entry in expired:
+        evicted, freed_bytes = evicted + 1, freed_bytes + entry.size
+        _remove_entry(db, entry)
+    db.commit()
+
+    total_bytes = db.exec(select(func.sum(RenderCacheEntry.size))).one() or 0
+    if total_bytes > settings.RENDER_CACHE_MAX_BYTES:
+        least_recently_used = db.exec(
+            select(RenderCacheEntry).order_by(RenderCacheEntry.last_used_at)
+        ).all()
+        for entry in least_recently_used:
+            if total_bytes <= settings.RENDER_CACHE_MAX_BYTES:
+                break
+            total_bytes -= entry.size
+            evicted, freed_bytes = evicted + 1, freed_bytes + entry.size
+            _remove_entry(db, entry)
+        db.commit()
+
+    if evicted:
+        services_storage_gc.schedule_collection(db, background_tasks)
+    return RenderCacheEviction(evicted=evicted, freed_bytes=freed_bytes)
+
+
+def get_stats(db: Session) -> RenderCacheStats:
+    entries, total_bytes = db.exec(
+        select(func.count(), func.sum(RenderCacheEntry.size)).select_from(
+            RenderCacheEntry
+        )
+    ).one()
+    counters = {
+        counter.name: counter.value
+        for counter in db.exec(select(RenderCacheCounter)).all()
+    }
+    hits = counters.get(HITS_COUNTER, 0)
+    misses = counters.get(MISSES_COUNTER, 0)
+    lookups = hits + misses
+    return RenderCacheStats(
+        entries=entries,
+        total_bytes=total_bytes or 0,
+        hits=hits,
+        misses=misses,
+        hit_rate=round(hits / lookups, 4) if lookups else 0.0,
+    )
@@ -0,0 +1,324 @@
+import functools
+import multiprocessing
+import threading
+import uuid
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlmodel import Session
+
+import app.services.jobs as services_jobs
+import app.services.reel as services_reel
+from app.core.config import settings
+from app.core.storage.backends import get_storage
+from app.db.models.job import Job
+from app.db.models.reel import Reel
+from app.db.session import engine
+from app.models.jobs.job_kind import JobKind
+from app.models.jobs.job_status import JobStatus
+from app.schemas.reel import (
+    ReelBatchCreate,
+    ReelBatchResult,
+    ReelCreate,
+    ReelJobRead,
+    ReelRead,
+)
+from app.services.jobs import QUEUE_BACKEND
+
+RENDER_JOB_KINDS = (JobKind.RenderReel.value, JobKind.RenderReelBatch.value)
+
+
+@dataclass
+class RenderJob:
+    id: str
+    user_id: int
+    future: Future | None = None
+    status: JobStatus = JobStatus.Queued
+    reel_id: int | None = None
+    results: list[dict] | None = None
+    error: str | None = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: datetime | None = None
+
+
+_jobs: dict[str, RenderJob] = {}
+_jobs_lock = threading.Lock()
+
+
+@functools.cache
+def _get_context():
+    # Spawned workers start from a clean interpreter instead of forking the
+    # threaded API process (DB pool, HTTP clients, locks held by threads).
+    return multiprocessing.get_context("spawn")
+
+
+@functools.cache
+def _get_executor() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=settings.RENDER_WORKERS,
+        mp_context=_get_context(),
+    )
+
+
+@functools.cache
+def _get_progress():
+    return _get_context().Manager().dict()
+
+
+def _run_render_job(
+    job_id: str,
+    reel_info: ReelCreate,
+    movie_type: str,
+    lang: str,
+    user_id: int,
+    progress,
+) -> int:
+    def report(fraction: float):
+        progress[job_id] = fraction * 100
+
+    with Session(engine) as db:
+        reel = services_reel.render_reel(
+            db,
+            get_storage(),
+            reel_info,
+            movie_type,
+            lang,
+            user_id,
+            on_progress=report,
+        )
+        return reel.id
+
+
+def run_render_batch(
+    db: Session,
+    batch: ReelBatchCreate,
+    movie_type: str,
+    langs: list[str],
+    user_id: int,
+    on_progress: Callable[[float], None] | None = None,
+    job_key: str | None = None,
+) -> list[dict]:
+    # Progress moves on as each variant is saved. Results keep the reel id
+    # only, the reel is read back when the job is polled.
+    results = []
+    for result in services_reel.render_reel_batch(
+        db, get_storage(), batch, movie_type, langs, user_id, job_key=job_key
+    ):
+        results.append(
+            {
+                "index": result.index,
+                "audio_id": result.audio_id,
+                "reel_id": result.reel.id if result.reel else None,
+                "error": result.error,
+            }
+        )
+        if on_progress:
+            on_progress(len(results) / len(batch.variants))
+    return sorted(results, key=lambda result: result["index"])
+
+
+def _run_render_batch_job(
+    job_id: str,
+    batch: ReelBatchCreate,
+    movie_type: str,
+    langs: list[str],
+    user_id: int,
+    progress,
+) -> list[dict]:
+    def report(fraction: float):
+        progress[job_id] = fraction * 100
+
+    with Session(engine) as db:
+        return run_render_batch(
+            db, batch, movie_type, langs, user_id, on_progress=report
+        )
+
+
+def _on_job_done(job: RenderJob, future: Future):
+    with _jobs_lock:
+        job.finished_at = datetime.utcnow()
+        if future.cancelled():
+            job.status = JobStatus.Failed
+            job.error = "Render job was cancelled"
+        elif future.exception() is not None:
+            job.status = JobStatus.Failed
+            job.error = str(future.exception())
+        elif isinstance(future.result(), list):
+            job.status = JobStatus.Finished
+            job.results = future.result()
+        else:
+            job.status = JobStatus.Finished
+            job.reel_id = future.result()
+        job.future = None
+    _get_progress().pop(job.id, None)
+
+
+def _prune_finished_jobs():
+    expiry = datetime.utcnow() - timedelta(seconds=settings.RENDER_JOB_TTL)
+    for job_id, job in list(_jobs.items()):
+        if job.finished_at and job.finished_at < expiry:
+            del _jobs[job_id]
+
+
+def _get_reel_read(db: Session, reel_id: int | None) -> ReelRead | None:
+    if reel_id is None:
+        return None
+    db_reel = db.get(Reel, reel_id)
+    return ReelRead.model_validate(db_reel) if db_reel else None
+
+
+def _get_batch_results(
+    db: Session, results: list[dict] | None
+) -> list[ReelBatchResult] | None:
+    if results is None:
+        return None
+    return [
+        ReelBatchResult(
+            index=result["index"],
+            audio_id=result["audio_id"],
+            reel=_get_reel_read(db, result["reel_id"]),
+            error=result["error"],
+        )
+        for result in results
+    ]
+
+
+def _local_job_read(db: Session, job: RenderJob) -> ReelJobRead:
+    status = job.status
+    progress = 100.0 if status == JobStatus.Finished else 0.0
+    if status == JobStatus.Queued:
+        current = _get_progress().get(job.id)
+        if current is not None:
+            status, progress = JobStatus.Running, current
+
+    return ReelJobRead(
+        id=job.id,
+        status=status,
+        progress=round(progress, 1),
+        created_at=job.created_at,
+        reel=_get_reel_read(db, job.reel_id),
+        error=job.error,
+        results=_get_batch_results(db, job.results),
+    )
+
+
+def _queue_job_read(db: Session, job: Job) -> ReelJobRead:
+    reel_id = (job.result or {}).get("reel_id")
+    return ReelJobRead(
+        id=str(job.id),
+        status=job.status,
+        progress=round(job.progress, 1),
+        created_at=job.created_at,
+        reel=_get_reel_read(db, reel_id),
+        error=job.error,
+        results=_get_batch_results(db, (job.result or {}).get("results")),
+    )
+
+
+def _submit_local_job(user_id: int, fn: Callable, *args) -> RenderJob:
+    with _jobs_lock:
+        _prune_finished_jobs()
+        pending = sum(1 for job in _jobs.values() if job.finished_at is None)
+        if pending >= settings.RENDER_QUEUE_LIMIT:
+            raise HTTPException(
+                status_code=503,
+                detail="Render queue is full, try again later",
+            )
+        job = RenderJob(id=uuid.uuid4().hex, user_id=user_id)
+        _jobs[job.id] = job
+
+    job.future = _get_executor().submit(
+        fn, job.id, *args, user_id, _get_progress()
+    )
+    job.future.add_done_callback(functools.partial(_on_job_done, job))
+    return job
+
+
+def submit_render_job(
+    db: Session,
+    reel_info: ReelCreate,
+    movie_type: str,
+    lang: str,
+    user_id: int,
+) -> ReelJobRead:
+    if settings.JOB_BACKEND == QUEUE_BACKEND:
+        job = services_jobs.enqueue_job(
+            db,
+            JobKind.RenderReel.value,
+            {
+                "reel": reel_info.model_dump(mode="json"),
+                "movie_type": movie_type,
+                "lang": lang,
+            },
+            user_id,
+        )
+        return _queue_job_read(db, job)
+
+    job = _submit_local_job(
+        user_id, _run_render_job, reel_info, movie_type, lang
+    )
+    return _local_job_read(db, job)
+
+
+def submit_render_batch_job(
+    db: Session,
+    batch: ReelBatchCreate,
+    movie_type: str,
+    langs: list[str],
+    user_id: int,
+) -> ReelJobRead:
+    # The whole batch is one job, its variants share one download and one
+    # decode of the movie.
+    if settings.JOB_BACKEND == QUEUE_BACKEND:
+        job = services_jobs.enqueue_job(
+            db,
+            JobKind.RenderReelBatch.value,
+            {
+                "batch": batch.model_dump(mode="json"),
+                "movie_type": movie_type,
+                "langs": langs,
+            },
+            user_id,
+        )
+        return _queue_job_read(db, job)
+
+    job = _submit_local_job(
+        user_id, _run_render_batch_job, batch, movie_type, langs
+    )
+    return _local_job_read(db, job)
+
+
+def get_render_job(
+    db: Session, job_id: str, user_id: int
+) -> ReelJobRead | None:
+    if settings.JOB_BACKEND == QUEUE_BACKEND:
+        if not job_id.isdigit():
+            return None
+        job = services_jobs.get_job_by_user(db, user_id, int(job_id))
+        if job is None or job.kind not in RENDER_JOB_KINDS:
+            return None
+        return _queue_job_read(db, job)
+
+    job = _jobs.get(job_id)
+    if job is None or job.user_id != user_id:
+        return None
+    return _local_job_read(db, job)
+
+
+def get_render_jobs_by_user(db: Session, user_id: int) -> list[ReelJobRead]:
+    if settings.JOB_BACKEND == QUEUE_BACKEND:
+        jobs = services_jobs.get_jobs_by_user(db, user_id, RENDER_JOB_KINDS)
+        return [_queue_job_read(db, job) for job in jobs]
+
+    with _jobs_lock:
+        jobs = [job for job in _jobs.values() if job.user_id == user_id]
+    jobs.sort(key=lambda job: job.created_at, reverse=True)
+    return [_local_job_read(db, job) for job in jobs]
+
+
+def shutdown():
+    if _get_executor.cache_info().currsize:
+        _get_executor().shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,225 @@
+import logging
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+
+from fastapi import BackgroundTasks
+from sqlmodel import Session, or_, select
+
+import app.services.jobs as services_jobs
+from app.core.config import settings
+from app.core.storage.backends import StorageBackend, get_storage
+from app.db.models.audio import Audio
+from app.db.models.blob import Blob
+from app.db.models.job import Job
+from app.db.models.movie import Movie
+from app.db.models.music import Music
+from app.db.models.reel import Reel
+from app.db.models.render_cache import RenderCacheEntry
+from app.db.models.srt import Srt
+from app.db.models.storage_tombstone import StorageTombstone
+from app.db.session import engine
+from app.models.jobs.job_kind import JobKind
+from app.models.jobs.job_status import JobStatus
+from app.schemas.storage import StorageCollection, StorageReconciliation
+
+logger = logging.getLogger(__name__)
+
+# Columns holding storage paths, as public URLs or bare keys.
+STORAGE_COLUMNS = (
+    Movie.file_path,
+    Movie.thumbnail_path,
+    Movie.mezzanine_path,
+    Reel.file_path,
+    Audio.file_path,
+    Music.file_path,
+    Srt.file_path,
+    Srt.ass_path,
+    RenderCacheEntry.storage_path,
+    Blob.key,
+)
+# Columns pointing at one object of a directory that is kept and removed as
+# a whole, like an HLS playlist and its segments.
+STORAGE_PREFIX_COLUMNS = (Reel.playlist_path,)
+
+
+def storage_key(path: str) -> str:
+    return path.split("//")[-1]
+
+
+def storage_prefix(path: str) -> str:
+    return storage_key(path).rpartition("/")[0] + "/"
+
+
+def tombstone(db: Session, paths: Iterable[str | None]):
+    # Added to the caller's transaction, so the objects are only queued for
+    # removal once the rows pointing at them are gone. A key ending in "/"
+    # stands for every object under it.
+    for path in paths:
+        if path:
+            db.merge(StorageTombstone(key=storage_key(path)))
+
+
+def untombstone(db: Session, keys: Iterable[str]):
+    # For keys about to be written again. Waits for a collector that holds
+    # the row, so its removal lands before the new object, not after.
+    for key in keys:
+        entry = db.exec(
+            select(StorageTombstone)
+            .where(StorageTombstone.key == key)
+            .with_for_update()
+        ).first()
+        if entry is not None:
+            db.delete(entry)
+
+
+def live_keys(db: Session) -> set[str]:
+    keys = set()
+    for column in STORAGE_COLUMNS:
+        paths = db.exec(select(column).where(column.is_not(None))).all()
+        keys.update(storage_key(path) for path in paths)
+    return keys
+
+
+def live_prefixes(db: Session) -> set[str]:
+    prefixes = set()
+    for column in STORAGE_PREFIX_COLUMNS:
+        paths = db.exec(select(column).where(column.is_not(None))).all()
+        prefixes.update(storage_prefix(path) for path in paths)
+    return prefixes
+
+
+def _referenced(
+    db: Session, storage: StorageBackend, batch: list[StorageTombstone]
+) -> set[str]:
+    # Only looks up the batch's own keys, as bare keys or public URLs, and
+    # for prefix tombstones the paths starting with them.
+    keys = [entry.key for entry in batch if not entry.key.endswith("/")]
+    prefixes = [entry.key for entry in batch if entry.key.endswith("/")]
+    referenced = set()
+    if keys:
+        candidates = keys + [storage.public_url(key) for key in keys]
+        for column in STORAGE_COLUMNS:
+            paths = db.exec(select(column).where(column.in_(candidates))).all()
+            referenced.update(storage_key(path) for path in paths)
+    if prefixes:
+        for column in STORAGE_PREFIX_COLUMNS:
+            paths = db.exec(
+                select(column).where(
+                    or_(
+                        *[
+                            column.startswith(start, autoescape=True)
+                            for prefix in prefixes
+                            for start in (prefix, storage.public_url(prefix))
+                        ]
+                    )
+                )
+            ).all()
+            referenced.update(storage_prefix(path) for path in paths)
+    return referenced
+
+
+def _expand(
+    storage: StorageBackend,
+    batch: list[StorageTombstone],
+    referenced: set[str],
+) -> tuple[list[str], int]:
+    # Returns the keys to remove and how many tombstones are kept.
+    keys, kept = [], 0
+    for entry in batch:
+        if entry.key in referenced:
+            kept += 1
+        elif entry.key.endswith("/"):
+            keys += [obj.key for obj in storage.list_files(entry.key)]
+        else:
+            keys.append(entry.key)
+    return keys, kept
+
+
+def collect(
+    db: Session, storage: StorageBackend, batch_size: int | None = None
+) -> StorageCollection:
+    batch_size = batch_size or settings.STORAGE_GC_BATCH_SIZE
+    removed = kept = failed = 0
+    while True:
+        # Tombstones that failed too often are left for an operator, their
+        # error says why.
+        batch = db.exec(
+            select(StorageTombstone)
+            .where(StorageTombstone.attempts < settings.STORAGE_GC_MAX_ATTEMPTS)
+            .order_by(StorageTombstone.created_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not batch:
+            break
+        try:
+            # A key can be written again after it was tombstoned (a render
+            # cache entry stored anew, a reused id), those objects are kept.
+            keys, batch_kept = _expand(
+                storage, batch, _referenced(db, storage, batch)
+            )
+            storage.delete_files(keys)
+        except Exception as e:
+            logger.exception(
+                "Collecting %s storage tombstones failed", len(batch)
+            )
+            for entry in batch:
+                entry.attempts += 1
+                entry.error = f"{type(e).__name__}: {e}"
+            db.commit()
+            failed += len(batch)
+            break
+        for entry in batch:
+            db.delete(entry)
+        db.commit()
+        removed += len(keys)
+        kept += batch_kept
+    return StorageCollection(removed=removed, kept=kept, failed=failed)
+
+
+def _collect_task():
+    with Session(engine) as db:
+        try:
+            collect(db, get_storage())
+        except Exception:
+            logger.exception("Storage collection failed")
+
+
+def schedule_collection(
+    db: Session, background_tasks: BackgroundTasks | None = None
+) -> None:
+    if settings.JOB_BACKEND == services_jobs.QUEUE_BACKEND:
+        pending = db.exec(
+            select(Job.id).where(
+                Job.kind == JobKind.CollectStorage.value,
+                Job.status == JobStatus.Queued.value,
+            )
+        ).first()
+        if pending is None:
+            services_jobs.enqueue_job(db, JobKind.CollectStorage.value, {})
+    elif background_tasks is not None:
+        background_tasks.add_task(_collect_task)
+    else:
+        # Called outside a request, e.g. from a render process.
+        _collect_task()
+
+
+def reconcile(db: Session, storage: StorageBackend) -> StorageReconciliation:
+    # Objects without a row are tombstoned for the collector. Recent ones
+    # are left alone, an upload lands before its row records the path.
+    cutoff = datetime.utcnow() - timedelta(
+        seconds=settings.STORAGE_ORPHAN_GRACE
+    )
+    live = live_keys(db)
+    prefixes = tuple(live_prefixes(db))
+    objects = storage.list_files()
+    orphans = [
+        obj.key
+        for obj in objects
+        if obj.key not in live
+        and not obj.key.startswith(prefixes)
+        and obj.updated_at < cutoff
+    ]
+    tombstone(db, orphans)
+    db.commit()
+    return StorageReconciliation(scanned=len(objects), orphaned=len(orphans))
@@ -7,7 +7,7 @@ from passlib.context import CryptContext
 from PIL import Image, ImageDraw, ImageFont
 from sqlmodel import Session
 
-from app.core.storage.backends import SupabaseStorageBackend
+from app.core.storage.backends import StorageBackend
 from app.db.models.user import User
 from app.schemas.user import (
     Token,
@@ -24,7 +24,7 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def register_user(
-    user_data: UserRegister, db: Session, storage: SupabaseStorageBackend
+    user_data: UserRegister, db: Session, storage: StorageBackend
 ) -> Token:
     if get_user_by_email(user_data.email, db, is_error_detected=False):
         raise HTTPException(
@@ -178,7 +178,7 @@ def change_user_password(
 
 
 # def _create_and_upload_avatar(
-#     nick: str, storage: SupabaseStorageBackend
+#     nick: str, storage: StorageBackend
 # ) -> str:
 #     size = (256, 256)
 #     bg_color = (30, 144, 255)
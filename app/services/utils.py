@@ -1,13 +1,11 @@
 import contextlib
-import os
-import tempfile
 import wave
 
+from fastapi import HTTPException, UploadFile
 from moviepy import VideoFileClip
 
 from app.core.config import settings
-
-DEFAULT_SUFFIX = ".mp4"
+from app.core.media import MediaHandle
 
 
 def _duration_wav(path: str) -> int:
@@ -17,24 +15,41 @@ def _duration_wav(path: str) -> int:
         return int(frames / float(rate))
 
 
-def get_file_duration(file_bytes: bytes, suffix: str = DEFAULT_SUFFIX) -> int:
-    suffix = suffix.lower().strip()
-    if not suffix.startswith("."):
-        suffix = "." + suffix
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        tmp.write(file_bytes)
-        tmp_path = tmp.name
-
+def get_file_duration(media: MediaHandle) -> int:
+    suffix = media.suffix.lower()
     try:
         if suffix in settings.ALLOWED_AUDIO_EXTENSIONS:
-            duration = _duration_wav(tmp_path)
+            duration = _duration_wav(media.path)
         else:
-            with VideoFileClip(tmp_path) as clip:
+            with VideoFileClip(media.path) as clip:
                 duration = int(clip.duration)
     except Exception as exc:
         raise ValueError(f"Cannot open file for processing: {exc}") from exc
-    finally:
-        os.unlink(tmp_path)
 
     return duration
+
+
+def spool_upload(upload: UploadFile, suffix: str, max_size: int) -> MediaHandle:
+    too_large = HTTPException(
+        status_code=413, detail=f"File exceeds {max_size} bytes."
+    )
+    if upload.size is not None and upload.size > max_size:
+        raise too_large
+    # Upload routes (body_limit_route) already spooled the file to a named
+    # file, which is used where it is. It is removed with the request form.
+    path = getattr(upload.file, "name", None)
+    if isinstance(path, str) and path.lower().endswith(suffix.lower()):
+        upload.file.flush()
+        return MediaHandle(path)
+    try:
+        return MediaHandle.from_stream(upload.file, suffix, max_size=max_size)
+    except ValueError:
+        raise too_large
+
+
+def check_duration(duration: float, max_duration: int):
+    if duration > max_duration:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File is longer than {max_duration} seconds.",
+        )
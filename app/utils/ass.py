@@ -0,0 +1,117 @@
+from app.models.transcription.transcription import Transcription
+from app.utils.captions import Caption, word_captions
+
+SCRIPT_INFO_KEYS = ("PlayResX", "PlayResY", "ScaledBorderAndShadow")
+STYLE_FIELDS = [
+    "Name",
+    "Fontname",
+    "Fontsize",
+    "PrimaryColour",
+    "SecondaryColour",
+    "OutlineColour",
+    "BackColour",
+    "Bold",
+    "Italic",
+    "Underline",
+    "StrikeOut",
+    "ScaleX",
+    "ScaleY",
+    "Spacing",
+    "Angle",
+    "BorderStyle",
+    "Outline",
+    "Shadow",
+    "Alignment",
+    "MarginL",
+    "MarginR",
+    "MarginV",
+    "Encoding",
+]
+EVENT_FIELDS = [
+    "Layer",
+    "Start",
+    "End",
+    "Style",
+    "Name",
+    "MarginL",
+    "MarginR",
+    "MarginV",
+    "Effect",
+    "Text",
+]
+
+
+def format_timestamp(seconds: float) -> str:
+    centis = int(round(seconds * 100))
+    return (
+        f"{centis // 360000}:{centis // 6000 % 60:02}"
+        f":{centis // 100 % 60:02}.{centis % 100:02}"
+    )
+
+
+def escape_text(text: str) -> str:
+    return (
+        text.strip()
+        .replace("{", "\\{")
+        .replace("}", "\\}")
+        .replace("\n", "\\N")
+    )
+
+
+def _style_line(style: dict) -> str:
+    values = {
+        "Name": "Default",
+        "Fontname": style["FontName"],
+        "Fontsize": style["FontSize"],
+        "PrimaryColour": style["PrimaryColour"],
+        "SecondaryColour": style["PrimaryColour"],
+        "OutlineColour": style["OutlineColour"],
+        "BackColour": style["OutlineColour"],
+        "Bold": 0,
+        "Italic": 0,
+        "Underline": 0,
+        "StrikeOut": 0,
+        "ScaleX": 100,
+        "ScaleY": 100,
+        "Spacing": 0,
+        "Angle": 0,
+        "BorderStyle": style["BorderStyle"],
+        "Outline": style["Outline"],
+        "Shadow": style["Shadow"],
+        "Alignment": style["Alignment"],
+        "MarginL": style["MarginL"],
+        "MarginR": style["MarginR"],
+        "MarginV": style["MarginV"],
+        "Encoding": 1,
+    }
+    return "Style: " + ",".join(str(values[field]) for field in STYLE_FIELDS)
+
+
+def generate_ass(
+    transcription: Transcription,
+    style: dict,
+    captions: list[Caption] | None = None,
+) -> str:
+    # Same cues as generate_srt, with the reel style baked in.
+    if captions is None:
+        captions = word_captions(transcription)
+    lines = ["[Script Info]", "ScriptType: v4.00+", "WrapStyle: 0"]
+    lines += [f"{key}: {style[key]}" for key in SCRIPT_INFO_KEYS]
+    lines += [
+        "",
+        "[V4+ Styles]",
+        "Format: " + ", ".join(STYLE_FIELDS),
+        _style_line(style),
+        "",
+        "[Events]",
+        "Format: " + ", ".join(EVENT_FIELDS),
+    ]
+    for caption in captions:
+        start = format_timestamp(caption.start)
+        end = format_timestamp(caption.end)
+        lines.append(
+            f"Dialogue: 0,{start},{end},Default,,0,0,0,,"
+            f"{escape_text(caption.text)}"
+        )
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,131 @@
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from app.models.transcription.transcription import Transcription, Word
+
+SENTENCE_END = ".!?…"
+CLAUSE_END = ",;:"
+DEFAULT_MAX_CHARS = 32
+DEFAULT_MAX_DURATION = 3.0
+DEFAULT_MAX_PAUSE = 0.6
+
+
+@dataclass
+class Caption:
+    start: float
+    end: float
+    words: list[Word]
+
+    @property
+    def text(self) -> str:
+        return " ".join(word.text.strip() for word in self.words)
+
+
+def _caption(words: list[Word]) -> Caption:
+    return Caption(start=words[0].start, end=words[-1].end, words=words)
+
+
+def _line_length(words: list[Word]) -> int:
+    return sum(len(word.text.strip()) + 1 for word in words) - 1
+
+
+def _breaks_before(
+    line: list[Word],
+    word: Word,
+    max_chars: int,
+    max_duration: float,
+    max_pause: float,
+) -> bool:
+    return (
+        _line_length(line) + 1 + len(word.text.strip()) > max_chars
+        or word.end - line[0].start > max_duration
+        or word.start - line[-1].end > max_pause
+    )
+
+
+def _breaks_after(line: list[Word], max_chars: int) -> bool:
+    last = line[-1].text.strip()
+    if last[-1] in SENTENCE_END:
+        return True
+    # A clause break only ends the line once it is reasonably full, so
+    # short "Well," lines do not flash by on their own.
+    return last[-1] in CLAUSE_END and _line_length(line) >= max_chars // 2
+
+
+def group_words(
+    words: Iterable[Word],
+    max_chars: int = DEFAULT_MAX_CHARS,
+    max_duration: float = DEFAULT_MAX_DURATION,
+    max_pause: float = DEFAULT_MAX_PAUSE,
+) -> list[Caption]:
+    captions = []
+    line: list[Word] = []
+    for word in words:
+        if not word.text.strip():
+            continue
+        if line and _breaks_before(
+            line, word, max_chars, max_duration, max_pause
+        ):
+            captions.append(_caption(line))
+            line = []
+        line.append(word)
+        if _breaks_after(line, max_chars):
+            captions.append(_caption(line))
+            line = []
+    if line:
+        captions.append(_caption(line))
+    return captions
+
+
+def close_gaps(
+    captions: list[Caption], max_pause: float = DEFAULT_MAX_PAUSE
+) -> list[Caption]:
+    # Short silences between lines keep the previous line on screen instead
+    # of blinking to an empty frame.
+    for current, following in zip(captions, captions[1:]):
+        if 0 < following.start - current.end <= max_pause:
+            current.end = following.start
+    return captions
+
+
+def group_transcription(
+    transcription: Transcription,
+    max_chars: int = DEFAULT_MAX_CHARS,
+    max_duration: float = DEFAULT_MAX_DURATION,
+    max_pause: float = DEFAULT_MAX_PAUSE,
+) -> list[Caption]:
+    captions = []
+    for segment in transcription.segments:
+        captions += group_words(
+            segment.words, max_chars, max_duration, max_pause
+        )
+    return close_gaps(captions, max_pause)
+
+
+def word_captions(transcription: Transcription) -> list[Caption]:
+    return [
+        Caption(start=word.start, end=word.end, words=[word])
+        for segment in transcription.segments
+        for word in segment.words
+    ]
+
+
+def caption_timings(
+    captions: list[Caption], with_words: bool = True
+) -> list[dict]:
+    # Compact form for storage and clients: times in milliseconds, word
+    # timings line up with the space separated words of the text.
+    timings = []
+    for caption in captions:
+        timing = {
+            "start": round(caption.start * 1000),
+            "end": round(caption.end * 1000),
+            "text": caption.text,
+        }
+        if with_words:
+            timing["words"] = [
+                [round(word.start * 1000), round(word.end * 1000)]
+                for word in caption.words
+            ]
+        timings.append(timing)
+    return timings
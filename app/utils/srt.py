@@ -1,6 +1,7 @@
 from datetime import timedelta
 
 from app.models.transcription.transcription import Transcription
+from app.utils.captions import Caption, word_captions
 
 
 def format_timestamp(seconds: float) -> str:
@@ -13,17 +14,20 @@ def format_timestamp(seconds: float) -> str:
     )
 
 
-def generate_srt(transcription: Transcription) -> str:
+def generate_srt(
+    transcription: Transcription, captions: list[Caption] | None = None
+) -> str:
+    # One cue per word unless grouped captions are given.
+    if captions is None:
+        captions = word_captions(transcription)
     lines = []
-    idx = 1
-    for segment in transcription.segments:
-        for word in segment.words:
-            start = format_timestamp(word.start)
-            end = format_timestamp(word.end)
-            lines.append(f"{idx}")
-            lines.append(f"{start} --> {end}")
-            lines.append(word.text.strip())
-            lines.append("")
-            idx += 1
+    for idx, caption in enumerate(captions, start=1):
+        start = format_timestamp(caption.start)
+        end = format_timestamp(caption.end)
+        lines.append(f"{idx}")
+        lines.append(f"{start} --> {end}")
+        lines.append(caption.text)
+        lines.append("")
 
-    return "\n".join(lines)
+    # The trailing blank line closes the last cue for MoviePy's parser.
+    return "\n".join(lines) + "\n"
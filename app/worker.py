@@ -0,0 +1,253 @@
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import uuid
+from collections.abc import Callable, Sequence
+
+from sqlmodel import Session
+
+import app.services.audio as services_audio
+import app.services.jobs as services_jobs
+import app.services.movie as services_movie
+import app.services.reel as services_reel
+import app.services.render_jobs as services_render_jobs
+import app.services.storage_gc as services_storage_gc
+from app.core.config import settings
+from app.core.glyph_cache import glyph_cache
+from app.core.storage.backends import get_storage
+from app.db.session import engine
+from app.models.jobs.job_kind import JobKind
+from app.models.transcription.transcription_model import TranscriptionModel
+from app.schemas.audio import AudioCreate
+from app.schemas.reel import ReelBatchCreate, ReelCreate
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[
+    [Session, int, dict, int | None, Callable[[float], None]], dict
+]
+
+
+def _handle_render_reel(
+    db: Session,
+    job_id: int,
+    payload: dict,
+    user_id: int | None,
+    on_progress: Callable[[float], None],
+) -> dict:
+    reel = services_reel.render_reel(
+        db,
+        get_storage(),
+        ReelCreate(**payload["reel"]),
+        payload["movie_type"],
+        payload["lang"],
+        user_id,
+        on_progress=on_progress,
+        job_key=f"job:{job_id}",
+    )
+    return {"reel_id": reel.id, "glyph_cache": glyph_cache.stats()}
+
+
+def _handle_render_reel_batch(
+    db: Session,
+    job_id: int,
+    payload: dict,
+    user_id: int | None,
+    on_progress: Callable[[float], None],
+) -> dict:
+    results = services_render_jobs.run_render_batch(
+        db,
+        ReelBatchCreate(**payload["batch"]),
+        payload["movie_type"],
+        payload["langs"],
+        user_id,
+        on_progress=on_progress,
+        job_key=f"job:{job_id}",
+    )
+    return {"results": results, "glyph_cache": glyph_cache.stats()}
+
+
+def _handle_generate_audio(
+    db: Session,
+    job_id: int,
+    payload: dict,
+    user_id: int | None,
+    on_progress: Callable[[float], None],
+) -> dict:
+    audio = services_audio.create_audio(
+        db, get_storage(), AudioCreate(**payload["audio"]), user_id
+    )
+    return {"audio_id": audio.id}
+
+
+def _handle_transcribe_audio(
+    db: Session,
+    job_id: int,
+    payload: dict,
+    user_id: int | None,
+    on_progress: Callable[[float], None],
+) -> dict:
+    storage = get_storage()
+    audio = services_audio.get_audio(db, payload["audio_id"])
+    if audio is None:
+        raise ValueError(f"Audio {payload['audio_id']} not found")
+    with storage.download_to(audio.file_path.split("//")[-1]) as media:
+        srt = services_audio.transcribe_audio_file(
+            db,
+            storage,
+            audio.id,
+            media,
+            TranscriptionModel(payload["model"]),
+        )
+    return {"srt_id": srt.id}
+
+
+def _handle_transcode_mezzanine(
+    db: Session,
+    job_id: int,
+    payload: dict,
+    user_id: int | None,
+    on_progress: Callable[[float], None],
+) -> dict:
+    movie = services_movie.create_mezzanine(
+        db, get_storage(), payload["movie_id"]
+    )
+    return {"movie_id": movie.id}
+
+
+def _handle_collect_storage(
+    db: Session,
+    job_id: int,
+    payload: dict,
+    user_id: int | None,
+    on_progress: Callable[[float], None],
+) -> dict:
+    return services_storage_gc.collect(db, get_storage()).model_dump()
+
+
+def _handle_reconcile_storage(
+    db: Session,
+    job_id: int,
+    payload: dict,
+    user_id: int | None,
+    on_progress: Callable[[float], None],
+) -> dict:
+    return services_storage_gc.reconcile(db, get_storage()).model_dump()
+
+
+HANDLERS: dict[str, JobHandler] = {
+    JobKind.RenderReel: _handle_render_reel,
+    JobKind.RenderReelBatch: _handle_render_reel_batch,
+    JobKind.GenerateAudio: _handle_generate_audio,
+    JobKind.TranscribeAudio: _handle_transcribe_audio,
+    JobKind.TranscodeMezzanine: _handle_transcode_mezzanine,
+    JobKind.CollectStorage: _handle_collect_storage,
+    JobKind.ReconcileStorage: _handle_reconcile_storage,
+}
+
+
+class Worker:
+    def __init__(self, kinds: Sequence[str] | None = None):
+        self.kinds = [JobKind(kind).value for kind in kinds or HANDLERS]
+        self.worker_id = (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self._stopping = threading.Event()
+
+    def stop(self, *_):
+        logger.info("Worker %s stopping after current job", self.worker_id)
+        self._stopping.set()
+
+    def run(self):
+        logger.info("Worker %s handling %s", self.worker_id, self.kinds)
+        while not self._stopping.is_set():
+            with Session(engine) as db:
+                job = services_jobs.claim_job(db, self.worker_id, self.kinds)
+                claimed = (
+                    (job.id, job.kind, job.payload, job.author) if job else None
+                )
+            if claimed is None:
+                self._stopping.wait(settings.JOB_POLL_INTERVAL)
+                continue
+            self._process(*claimed)
+
+    def _heartbeat(
+        self, job_id: int, progress: dict, finished: threading.Event
+    ):
+        while not finished.wait(settings.JOB_HEARTBEAT_SECONDS):
+            with Session(engine) as db:
+                alive = services_jobs.heartbeat_job(
+                    db, job_id, self.worker_id, progress["value"]
+                )
+            if not alive:
+                logger.warning("Lost lease on job %s", job_id)
+                return
+
+    def _process(
+        self, job_id: int, kind: str, payload: dict, user_id: int | None
+    ):
+        logger.info("Running job %s (%s)", job_id, kind)
+        progress = {"value": 0.0}
+        finished = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat,
+            args=(job_id, progress, finished),
+            daemon=True,
+        )
+        heartbeat.start()
+
+        def report(fraction: float):
+            progress["value"] = round(fraction * 100, 1)
+
+        try:
+            handler = HANDLERS.get(kind)
+            if handler is None:
+                raise ValueError(f"No handler for job kind '{kind}'")
+            with Session(engine) as db:
+                result = handler(db, job_id, payload, user_id, report)
+        except Exception as e:
+            finished.set()
+            heartbeat.join()
+            logger.exception("Job %s failed", job_id)
+            with Session(engine) as db:
+                services_jobs.fail_job(
+                    db, job_id, self.worker_id, f"{type(e).__name__}: {e}"
+                )
+            return
+
+        finished.set()
+        heartbeat.join()
+        with Session(engine) as db:
+            if not services_jobs.complete_job(
+                db, job_id, self.worker_id, result
+            ):
+                logger.warning(
+                    "Job %s finished after its lease was taken over", job_id
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a background worker.")
+    parser.add_argument(
+        "--kinds",
+        nargs="+",
+        choices=[kind.value for kind in JobKind],
+        help="Job kinds to handle (default: all).",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    worker = Worker(args.kinds)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
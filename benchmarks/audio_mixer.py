@@ -0,0 +1,131 @@
+"""Compare the MoviePy and NumPy voice + music mixing paths.
+
+Run from the repository root:
+
+    python -m benchmarks.audio_mixer
+    python -m benchmarks.audio_mixer --voice voice.wav --music music.wav \
+        --duration 60 --runs 5
+
+Without input files a synthetic voice track and a short music loop are
+generated with ffmpeg. Both paths write the mixed track to a WAV file, which
+is what the encoder consumes.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from moviepy import AudioFileClip
+from moviepy.audio.AudioClip import CompositeAudioClip
+from moviepy.audio.fx import AudioLoop
+
+from app.core import audio_mixer
+from app.core.ffmpeg import run_ffmpeg
+
+SYNTHETIC_DURATION = 60
+SYNTHETIC_MUSIC_DURATION = 7
+
+
+def _make_synthetic_inputs(tmpdir: str, duration: int) -> dict[str, str]:
+    paths = {
+        "voice": os.path.join(tmpdir, "voice.wav"),
+        "music": os.path.join(tmpdir, "music.wav"),
+    }
+    run_ffmpeg(
+        [
+            "-f",
+            "lavfi",
+            "-i",
+            "sine=f=220:sample_rate=24000",
+            "-t",
+            str(duration - 2),
+            paths["voice"],
+        ]
+    )
+    run_ffmpeg(
+        [
+            "-f",
+            "lavfi",
+            "-i",
+            "sine=f=660",
+            "-ac",
+            "2",
+            "-t",
+            str(SYNTHETIC_MUSIC_DURATION),
+            paths["music"],
+        ]
+    )
+    return paths
+
+
+def _mix_moviepy(
+    output_path: str,
+    duration: float,
+    voice_path: str,
+    music_path: str,
+    music_volume: float,
+):
+    voice = AudioFileClip(voice_path)
+    music = (
+        AudioFileClip(music_path)
+        .with_volume_scaled(music_volume)
+        .with_effects([AudioLoop(duration=duration)])
+    )
+    mixed = CompositeAudioClip([voice, music]).with_duration(duration)
+    mixed.write_audiofile(
+        output_path, fps=audio_mixer.DEFAULT_SAMPLE_RATE, logger=None
+    )
+    for clip in (mixed, music, voice):
+        clip.close()
+
+
+def _mix_numpy(
+    output_path: str,
+    duration: float,
+    voice_path: str,
+    music_path: str,
+    music_volume: float,
+):
+    audio_mixer.write_mix(
+        output_path, duration, voice_path, music_path, music_volume
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--voice")
+    parser.add_argument("--music")
+    parser.add_argument("--duration", type=float, default=SYNTHETIC_DURATION)
+    parser.add_argument("--music-volume", type=float, default=0.2)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmpdir:
+        if args.voice and args.music:
+            paths = {"voice": args.voice, "music": args.music}
+        else:
+            paths = _make_synthetic_inputs(tmpdir, int(args.duration))
+        output_path = os.path.join(tmpdir, "mix.wav")
+
+        for name, mixer in (("moviepy", _mix_moviepy), ("numpy", _mix_numpy)):
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                mixer(
+                    output_path,
+                    args.duration,
+                    paths["voice"],
+                    paths["music"],
+                    args.music_volume,
+                )
+                timings.append(time.perf_counter() - start)
+            print(
+                f"{name:>8}: median {statistics.median(timings):7.3f}s"
+                f"  min {min(timings):7.3f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
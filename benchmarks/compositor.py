@@ -0,0 +1,97 @@
+"""Compare the MoviePy and in-place NumPy subtitle compositors.
+
+Run from the repository root:
+
+    python -m benchmarks.compositor
+    python -m benchmarks.compositor --movie reel_base.mp4 --srt voice.srt
+
+Without input files a synthetic 1080x1920 clip and word-level SRT are
+generated. The movie is used as already cropped to the reel size, so the
+timings cover decoding and compositing only, no encoding. Each compositor
+runs in a fresh process to get a separate peak RSS.
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.config import settings
+from app.core.ffmpeg import run_ffmpeg
+from app.core.reel_generator import ReelGenerator
+from benchmarks.render_engines import _synthetic_srt
+
+SYNTHETIC_DURATION = 20
+
+
+def _make_synthetic_inputs(tmpdir: str) -> dict[str, str]:
+    paths = {
+        "movie": os.path.join(tmpdir, "movie.mp4"),
+        "srt": os.path.join(tmpdir, "voice.srt"),
+    }
+    run_ffmpeg(
+        [
+            "-f",
+            "lavfi",
+            "-i",
+            "testsrc2=size=1080x1920:rate=24",
+            "-t",
+            str(SYNTHETIC_DURATION),
+            "-c:v",
+            "libx264",
+            paths["movie"],
+        ]
+    )
+    with open(paths["srt"], "w", encoding="utf-8") as f:
+        f.write(_synthetic_srt(SYNTHETIC_DURATION - 2))
+    return paths
+
+
+def _composite(
+    movie_path: str, srt_path: str, use_compositor: bool
+) -> tuple[int, float, float]:
+    settings.SUBTITLE_COMPOSITOR_ENABLED = use_compositor
+    generator = ReelGenerator()
+    final_clip, clips = generator._compose_video(
+        movie_path, srt_path, prescaled=True
+    )
+    frames = 0
+    start = time.perf_counter()
+    for _ in final_clip.iter_frames(fps=generator.fps, dtype="uint8"):
+        frames += 1
+    elapsed = time.perf_counter() - start
+    generator._cleanup([final_clip] + clips)
+    # ru_maxrss is in kilobytes on Linux.
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return frames, elapsed, peak_rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--movie")
+    parser.add_argument("--srt")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmpdir:
+        if args.movie and args.srt:
+            paths = {"movie": args.movie, "srt": args.srt}
+        else:
+            paths = _make_synthetic_inputs(tmpdir)
+
+        context = multiprocessing.get_context("spawn")
+        for name, use_compositor in (("moviepy", False), ("numpy", True)):
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                frames, elapsed, peak_rss = executor.submit(
+                    _composite, paths["movie"], paths["srt"], use_compositor
+                ).result()
+            print(
+                f"{name:>8}: {frames / elapsed:7.1f} frames/s"
+                f"  {elapsed:7.2f}s  peak RSS {peak_rss:7.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Compare reel render time of the MoviePy and ffmpeg engines.
+
+Run from the repository root:
+
+    python -m benchmarks.render_engines
+    python -m benchmarks.render_engines --movie clip.mp4 --audio voice.wav \
+        --srt voice.srt --music music.wav --runs 3
+
+Without input files a synthetic 1280x720 clip, voice track, music loop and
+word-level SRT are generated with ffmpeg.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from app.core.ffmpeg import run_ffmpeg
+from app.core.media import MediaHandle
+from app.core.reel_generator import ReelGenerator
+from app.models.reel_generator.render_engine import RenderEngine
+
+SYNTHETIC_DURATION = 20
+
+
+def _synthetic_srt(duration: int) -> str:
+    words = ["the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog"]
+    lines = []
+    for idx in range(duration * 2):
+        start, end = idx * 0.5, idx * 0.5 + 0.45
+        lines += [
+            str(idx + 1),
+            f"00:00:{int(start):02},{int(start % 1 * 1000):03} --> "
+            f"00:00:{int(end):02},{int(end % 1 * 1000):03}",
+            words[idx % len(words)],
+            "",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def _make_synthetic_inputs(tmpdir: str) -> dict[str, str]:
+    paths = {
+        "movie": os.path.join(tmpdir, "movie.mp4"),
+        "audio": os.path.join(tmpdir, "voice.wav"),
+        "music": os.path.join(tmpdir, "music.wav"),
+        "srt": os.path.join(tmpdir, "voice.srt"),
+    }
+    duration = str(SYNTHETIC_DURATION)
+    run_ffmpeg(
+        [
+            "-f",
+            "lavfi",
+            "-i",
+            "testsrc2=size=1280x720:rate=30",
+            "-t",
+            duration,
+            "-c:v",
+            "libx264",
+            paths["movie"],
+        ]
+    )
+    run_ffmpeg(
+        ["-f", "lavfi", "-i", "sine=f=220", "-t", duration, paths["audio"]]
+    )
+    run_ffmpeg(["-f", "lavfi", "-i", "sine=f=660", "-t", "7", paths["music"]])
+    with open(paths["srt"], "w", encoding="utf-8") as f:
+        f.write(_synthetic_srt(SYNTHETIC_DURATION - 2))
+    return paths
+
+
+def _media(path: str | None) -> MediaHandle | None:
+    return MediaHandle(path) if path else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--movie")
+    parser.add_argument("--audio")
+    parser.add_argument("--srt")
+    parser.add_argument("--music")
+    parser.add_argument("--music-volume", type=float, default=0.2)
+    parser.add_argument("--runs", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmpdir:
+        if args.movie:
+            paths = {
+                "movie": args.movie,
+                "audio": args.audio,
+                "srt": args.srt,
+                "music": args.music,
+            }
+        else:
+            paths = _make_synthetic_inputs(tmpdir)
+        inputs = {name: _media(path) for name, path in paths.items()}
+
+        for engine in RenderEngine:
+            generator = ReelGenerator(engine=engine)
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                output_path = generator.generate(
+                    movie=inputs["movie"],
+                    audio=inputs["audio"],
+                    srt=inputs["srt"],
+                    music=inputs["music"],
+                    music_volume=args.music_volume,
+                )
+                timings.append(time.perf_counter() - start)
+                size = os.path.getsize(output_path)
+                os.remove(output_path)
+            print(
+                f"{engine.value:>8}: median {statistics.median(timings):7.2f}s"
+                f"  min {min(timings):7.2f}s  output {size / 1e6:6.2f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+import app.db.models.blob  # noqa: F401
+import app.db.models.job  # noqa: F401
+import app.db.models.music  # noqa: F401
+import app.db.models.render_cache  # noqa: F401
+import app.db.models.storage_tombstone  # noqa: F401
+from app.db.models.audio import Audio
+from app.db.models.movie import Movie
+from app.db.models.reel import Reel
+from app.db.models.srt import Srt
+from app.db.models.user import User
+from app.db.session import get_session
+from app.services import auth as auth_services
+
+USER_ID = 1
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def seed(engine):
+    # Movies with reels, each reel with its audio and subtitles, so every
+    # relationship a read path follows has rows behind it.
+    def seed(movies: int, reels_per_movie: int = 2):
+        with Session(engine) as db:
+            if db.get(User, USER_ID) is None:
+                db.add(User(uidd=USER_ID, nick="u", email="u@x", password="x"))
+            for _ in range(movies):
+                movie = Movie(title="movie", author=USER_ID, type="mp4")
+                db.add(movie)
+                db.flush()
+                for _ in range(reels_per_movie):
+                    audio = Audio(
+                        title="audio",
+                        text="text",
+                        voice=0,
+                        language="a",
+                        speed=1.0,
+                        file_path="audio.wav",
+                        author=USER_ID,
+                    )
+                    db.add(audio)
+                    db.flush()
+                    db.add(Srt(audio_id=audio.id, file_path="audio.srt"))
+                    db.add(
+                        Reel(
+                            movie_id=movie.id,
+                            lang="a",
+                            author=USER_ID,
+                            audio_id=audio.id,
+                        )
+                    )
+            db.commit()
+
+    return seed
+
+
+@pytest.fixture
+def client(engine):
+    def client(router: APIRouter, prefix: str) -> TestClient:
+        app = FastAPI()
+        app.include_router(router, prefix=prefix)
+
+        def get_test_session():
+            with Session(engine) as session:
+                yield session
+
+        def get_test_user():
+            return User(
+                uidd=USER_ID, nick="u", email="u@x", password="x", role="ADMIN"
+            )
+
+        app.dependency_overrides[get_session] = get_test_session
+        app.dependency_overrides[auth_services.get_current_user] = get_test_user
+        return TestClient(app)
+
+    return client
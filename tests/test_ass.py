@@ -0,0 +1,78 @@
+from app.core.ffmpeg_renderer import FFmpegRenderer
+from app.core.reel_generator import ReelGenerator
+from app.models.transcription.transcription import (
+    Segment,
+    Transcription,
+    Word,
+)
+from app.utils.ass import (
+    EVENT_FIELDS,
+    STYLE_FIELDS,
+    escape_text,
+    format_timestamp,
+    generate_ass,
+)
+from app.utils.captions import Caption
+
+
+def test_format_timestamp():
+    assert format_timestamp(0) == "0:00:00.00"
+    assert format_timestamp(61.234) == "0:01:01.23"
+    assert format_timestamp(3723.456) == "1:02:03.46"
+    # Rounds to centiseconds before splitting, never "0:00:01.100".
+    assert format_timestamp(1.999) == "0:00:02.00"
+
+
+def test_escape_text():
+    assert escape_text(" {b}\nc ") == "\\{b\\}\\Nc"
+
+
+def _transcription() -> Transcription:
+    words = [
+        Word(text="Hi", start=0.0, end=0.5, confidence=1.0),
+        Word(text="{there}", start=0.5, end=1.25, confidence=1.0),
+    ]
+    segment = Segment(
+        id=0,
+        seek=0,
+        start=0,
+        end=1.25,
+        text="Hi there",
+        tokens=[],
+        temperature=0,
+        avg_logprob=0,
+        compression_ratio=0,
+        no_speech_prob=0,
+        confidence=1,
+        words=words,
+    )
+    return Transcription(text="Hi there", segments=[segment], language="en")
+
+
+def test_generate_ass_bakes_in_the_reel_style():
+    style = FFmpegRenderer(
+        ReelGenerator(video_width=720, video_height=1280)
+    ).subtitle_style()
+    lines = generate_ass(_transcription(), style).splitlines()
+    assert "PlayResX: 720" in lines
+    assert "PlayResY: 1280" in lines
+    style_line = next(line for line in lines if line.startswith("Style: "))
+    assert len(style_line.split(",")) == len(STYLE_FIELDS)
+    assert lines.count("Format: " + ", ".join(EVENT_FIELDS)) == 1
+    # One event per word by default.
+    assert [line for line in lines if line.startswith("Dialogue:")] == [
+        "Dialogue: 0,0:00:00.00,0:00:00.50,Default,,0,0,0,,Hi",
+        "Dialogue: 0,0:00:00.50,0:00:01.25,Default,,0,0,0,,\\{there\\}",
+    ]
+
+
+def test_generate_ass_uses_given_captions():
+    transcription = _transcription()
+    words = transcription.segments[0].words
+    style = FFmpegRenderer(ReelGenerator()).subtitle_style()
+    content = generate_ass(
+        transcription, style, [Caption(start=0, end=1.25, words=words)]
+    )
+    assert content.endswith(
+        "Dialogue: 0,0:00:00.00,0:00:01.25,Default,,0,0,0,,Hi \\{there\\}\n"
+    )
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.core import audio_mixer
+
+RATE = 8000
+CUT = 10 ** (-12 / 20)
+
+
+def _tone(seconds: float, amplitude: float, frequency: float = 440):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def _voice() -> np.ndarray:
+    # One second of silence, one of speech, one of silence.
+    silence = np.zeros(RATE, dtype=np.float32)
+    return np.concatenate([silence, _tone(1, 0.5), silence])
+
+
+@pytest.mark.parametrize("ducking_db", [12.0, -12.0])
+def test_ducking_gain_lowers_music_under_speech_only(ducking_db):
+    voice = np.stack([_voice()] * 2, axis=1)
+    gain = audio_mixer.ducking_gain(voice, RATE, ducking_db)
+    assert gain[int(1.5 * RATE)] == pytest.approx(CUT, rel=1e-3)
+    assert gain[int(0.5 * RATE)] == pytest.approx(1.0)
+    assert gain[int(2.5 * RATE)] == pytest.approx(1.0)
+    assert gain.max() <= 1.0 + 1e-6
+
+
+def _rms(samples: np.ndarray) -> float:
+    return float(np.sqrt(np.mean(samples**2)))
+
+
+@pytest.mark.parametrize("ducking_db, expected", [(0, 1.0), (-12.0, CUT)])
+def test_mix_ducks_music_under_voice(tmp_path, ducking_db, expected):
+    voice_path = str(tmp_path / "voice.wav")
+    music_path = str(tmp_path / "music.wav")
+    sf.write(voice_path, _voice(), RATE)
+    # Shorter than the clip, looped to fill it.
+    sf.write(music_path, _tone(0.5, 0.5, 110), RATE)
+
+    mixed = audio_mixer.mix(
+        3, voice_path, music_path, 0.5, ducking_db, sample_rate=RATE
+    )
+    assert mixed.shape == (3 * RATE, audio_mixer.DEFAULT_CHANNELS)
+    music = mixed[:, 0] - _voice()
+    before = _rms(music[int(0.2 * RATE) : int(0.8 * RATE)])
+    during = _rms(music[int(1.2 * RATE) : int(1.8 * RATE)])
+    after = _rms(music[int(2.2 * RATE) : int(2.8 * RATE)])
+    assert before == pytest.approx(0.25 / np.sqrt(2), rel=0.01)
+    assert during / before == pytest.approx(expected, rel=0.02)
+    assert after == pytest.approx(before, rel=0.01)
+
+
+def test_limit_keeps_peaks_under_the_ceiling():
+    loud = np.stack([_tone(1, 1.5)] * 2, axis=1)
+    limited = audio_mixer.limit(loud, RATE)
+    assert np.abs(limited).max() <= audio_mixer.LIMITER_CEILING + 1e-6
@@ -0,0 +1,20 @@
+import pytest
+
+from tests.utils import assert_num_queries
+
+# The audio service loads the TTS pipeline at import.
+pytest.importorskip("kokoro")
+
+from app.api.v1.endpoints import audios  # noqa: E402
+
+
+@pytest.mark.parametrize("count", [1, 5])
+def test_read_audios_query_count(engine, seed, client, count):
+    seed(1, reels_per_movie=count)
+    api = client(audios.router, "/audios")
+    # Audio, subtitles.
+    with assert_num_queries(engine, 2):
+        response = api.get("/audios/admin")
+    assert response.status_code == 200
+    assert len(response.json()) == count
+    assert all(audio["srtObject"] for audio in response.json())
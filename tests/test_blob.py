@@ -0,0 +1,109 @@
+import pytest
+from sqlmodel import Session, select
+
+from app.core.media import MediaHandle
+from app.core.storage.backends import LocalStorageBackend
+from app.db.models.blob import Blob
+from app.db.models.storage_tombstone import StorageTombstone
+from app.services import blob as services_blob
+
+
+class RecordingStorage(LocalStorageBackend):
+    def __init__(self, root: str):
+        super().__init__(root, "http://storage")
+        self.uploads = []
+        self.on_upload = None
+
+    def upload_files(self, files):
+        self.uploads.append([key for _, key in files])
+        if self.on_upload:
+            self.on_upload()
+        return super().upload_files(files)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return RecordingStorage(str(tmp_path / "storage"))
+
+
+@pytest.fixture
+def media(tmp_path):
+    path = tmp_path / "movie.mp4"
+    path.write_bytes(b"movie")
+    return MediaHandle(str(path))
+
+
+def _tombstones(db: Session) -> list[str]:
+    return [tombstone.key for tombstone in db.exec(select(StorageTombstone))]
+
+
+def test_same_content_is_uploaded_once(engine, storage, media, tmp_path):
+    thumbnail = tmp_path / "thumb.jpg"
+    thumbnail.write_bytes(b"thumb")
+    with Session(engine) as db:
+        first, _ = services_blob.acquire(db, storage, media, ".MP4")
+        second, [thumb_path] = services_blob.acquire(
+            db,
+            storage,
+            MediaHandle(media.path),
+            ".mp4",
+            [(MediaHandle(str(thumbnail)), "thumb.jpg")],
+        )
+
+        assert second.file_path == first.file_path
+        assert second.refcount == 2
+        assert first.key == f"blobs/{media.digest()}.mp4"
+        # The second upload only sends the files that are not the blob.
+        assert storage.uploads == [[first.key], ["thumb.jpg"]]
+        assert thumb_path == storage.public_url("thumb.jpg")
+
+
+def test_release_tombstones_the_last_reference(engine, storage, media):
+    with Session(engine) as db:
+        blob, _ = services_blob.acquire(db, storage, media, ".mp4")
+        services_blob.acquire(db, storage, media, ".mp4")
+
+        services_blob.release(db, blob.file_path)
+        db.commit()
+        assert db.get(Blob, blob.sha256).refcount == 1
+        assert _tombstones(db) == []
+
+        services_blob.release(db, blob.file_path)
+        db.commit()
+        assert db.get(Blob, blob.sha256) is None
+        assert _tombstones(db) == [blob.key]
+
+        # Uploading the content again revives the key queued for removal.
+        again, _ = services_blob.acquire(db, storage, media, ".mp4")
+        assert again.refcount == 1
+        assert _tombstones(db) == []
+
+
+def test_release_of_a_file_without_blob_tombstones_it(engine, storage):
+    with Session(engine) as db:
+        services_blob.release(db, storage.public_url("movies/1.mp4"))
+        services_blob.release(db, None)
+        db.commit()
+        assert _tombstones(db) == ["movies/1.mp4"]
+
+
+def test_concurrent_upload_of_the_same_content(engine, storage, media):
+    def register_first():
+        # Another request uploads the same content and registers it while
+        # this one is still uploading.
+        with Session(engine) as other:
+            services_blob._register(
+                other,
+                media.digest(),
+                services_blob.blob_key(media.digest(), ".mp4"),
+                storage.public_url("other.mp4"),
+                media.size,
+            )
+
+    storage.on_upload = register_first
+    with Session(engine) as db:
+        blob, _ = services_blob.acquire(db, storage, media, ".mp4")
+        # The losing request counts a reference on the registered blob.
+        assert blob.refcount == 2
+        assert blob.file_path == storage.public_url("other.mp4")
+        assert len(db.exec(select(Blob)).all()) == 1
@@ -0,0 +1,87 @@
+import os
+
+import pytest
+from fastapi import APIRouter, FastAPI, File, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+from app.api.v1.body_limit import FORM_OVERHEAD, body_limit_route
+from app.services.utils import check_duration, spool_upload
+
+LIMIT = 1024
+
+
+@pytest.fixture
+def api():
+    router = APIRouter(route_class=body_limit_route(lambda: LIMIT))
+
+    @router.post("/upload")
+    def upload(file: UploadFile = File(...)):
+        with spool_upload(file, ".wav", LIMIT) as media:
+            with media.open() as f:
+                content = f.read()
+            # The file the form was parsed into, not a copy of it.
+            return {
+                "in_place": media.path == file.file.name,
+                "size": len(content),
+            }
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def _form(size: int) -> dict:
+    return {"file": ("music.wav", b"x" * size, "audio/wav")}
+
+
+def test_upload_is_used_in_place(api):
+    response = api.post("/upload", files=_form(LIMIT))
+    assert response.status_code == 200
+    assert response.json() == {"in_place": True, "size": LIMIT}
+
+
+def test_named_upload_file_is_removed_with_the_form():
+    names = []
+    router = APIRouter(route_class=body_limit_route(lambda: LIMIT))
+
+    @router.post("/upload")
+    def upload(file: UploadFile = File(...)):
+        names.append(file.file.name)
+
+    app = FastAPI()
+    app.include_router(router)
+    assert TestClient(app).post("/upload", files=_form(10)).status_code == 200
+    assert not os.path.exists(names[0])
+
+
+def test_declared_length_over_limit_is_rejected(api):
+    response = api.post("/upload", files=_form(LIMIT + FORM_OVERHEAD + 1))
+    assert response.status_code == 413
+
+
+def test_streamed_body_over_limit_is_rejected(api):
+    # No Content-Length, the limit is enforced while the body streams in.
+    def body():
+        for _ in range(LIMIT + FORM_OVERHEAD):
+            yield b"x" * 64
+
+    response = api.post(
+        "/upload",
+        content=body(),
+        headers={"Content-Type": "multipart/form-data; boundary=b"},
+    )
+    assert response.status_code == 413
+
+
+def test_file_over_the_service_limit_is_rejected(api):
+    # Within the route limit thanks to the form overhead allowance, still
+    # larger than the file limit.
+    response = api.post("/upload", files=_form(LIMIT + 1))
+    assert response.status_code == 413
+
+
+def test_check_duration():
+    check_duration(10, 10)
+    with pytest.raises(HTTPException) as error:
+        check_duration(10.5, 10)
+    assert error.value.status_code == 400
@@ -0,0 +1,101 @@
+from app.models.transcription.transcription import (
+    Segment,
+    Transcription,
+    Word,
+)
+from app.utils.captions import (
+    caption_timings,
+    close_gaps,
+    group_transcription,
+    group_words,
+)
+
+
+def _words(*spec: tuple[str, float, float]) -> list[Word]:
+    return [
+        Word(text=text, start=start, end=end, confidence=1.0)
+        for text, start, end in spec
+    ]
+
+
+def _texts(captions) -> list[str]:
+    return [caption.text for caption in captions]
+
+
+def test_group_words_breaks_after_sentences():
+    words = _words(("Hi", 0, 0.2), ("there.", 0.2, 0.5), ("Bye", 0.6, 0.8))
+    assert _texts(group_words(words)) == ["Hi there.", "Bye"]
+
+
+def test_group_words_breaks_on_length():
+    words = _words(*[("word", i * 0.2, i * 0.2 + 0.2) for i in range(5)])
+    assert _texts(group_words(words, max_chars=10)) == [
+        "word word",
+        "word word",
+        "word",
+    ]
+
+
+def test_group_words_breaks_on_duration_and_pause():
+    words = _words(("a", 0, 0.5), ("b", 0.5, 2.5), ("c", 2.5, 3.5))
+    assert _texts(group_words(words, max_duration=3.0)) == ["a b", "c"]
+    words = _words(("a", 0, 0.2), ("b", 1.0, 1.2))
+    assert _texts(group_words(words, max_pause=0.6)) == ["a", "b"]
+
+
+def test_group_words_keeps_short_clauses_together():
+    words = _words(("Well,", 0, 0.2), ("I", 0.2, 0.3), ("see", 0.3, 0.5))
+    assert _texts(group_words(words)) == ["Well, I see"]
+    words = _words(*[("word,", i * 0.1, i * 0.1 + 0.1) for i in range(4)])
+    assert _texts(group_words(words, max_chars=12)) == [
+        "word, word,",
+        "word, word,",
+    ]
+
+
+def test_group_words_skips_blank_words():
+    words = _words(("a", 0, 0.1), (" ", 0.1, 0.2), ("b", 0.2, 0.3))
+    captions = group_words(words)
+    assert _texts(captions) == ["a b"]
+    assert len(captions[0].words) == 2
+
+
+def test_close_gaps_only_bridges_short_pauses():
+    words = _words(("a.", 0, 1), ("b.", 1.3, 2), ("c.", 3, 4))
+    captions = close_gaps(group_words(words), max_pause=0.6)
+    assert [(caption.start, caption.end) for caption in captions] == [
+        (0, 1.3),
+        (1.3, 2),
+        (3, 4),
+    ]
+
+
+def test_group_transcription_and_timings():
+    segment = Segment(
+        id=0,
+        seek=0,
+        start=0,
+        end=1,
+        text="Hi there.",
+        tokens=[],
+        temperature=0,
+        avg_logprob=0,
+        compression_ratio=0,
+        no_speech_prob=0,
+        confidence=1,
+        words=_words(("Hi", 0, 0.25), ("there.", 0.25, 0.5)),
+    )
+    transcription = Transcription(
+        text="Hi there.", segments=[segment, segment], language="en"
+    )
+    captions = group_transcription(transcription)
+    assert _texts(captions) == ["Hi there.", "Hi there."]
+    assert caption_timings(captions[:1]) == [
+        {
+            "start": 0,
+            "end": 500,
+            "text": "Hi there.",
+            "words": [[0, 250], [250, 500]],
+        }
+    ]
+    assert "words" not in caption_timings(captions, with_words=False)[0]
@@ -0,0 +1,108 @@
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from app.core.compositor import SubtitleCompositor
+from app.core.config import settings
+from app.core.glyph_cache import Glyph
+from app.core.reel_generator import ReelGenerator
+
+requires_ffmpeg = pytest.mark.skipif(
+    shutil.which(settings.FFMPEG_BINARY) is None, reason="ffmpeg not found"
+)
+
+SRT = """1
+00:00:00,200 --> 00:00:00,700
+First cue
+
+2
+00:00:01,000 --> 00:00:01,600
+Second, longer cue
+"""
+
+
+def _glyph(alpha: float) -> Glyph:
+    # A 2x4 box at (1, 2) of a 4x8 clip.
+    return Glyph(
+        rgb=np.full((2, 4, 3), 200, dtype=np.uint8),
+        mask=np.full((2, 4), alpha, dtype=np.float32),
+        top=1,
+        left=2,
+        size=(4, 8),
+    )
+
+
+def test_frames_without_a_cue_are_passed_through():
+    compositor = SubtitleCompositor(
+        [((1.0, 2.0), "a")], lambda text: _glyph(1.0), ("left", "top")
+    )
+    frame = np.zeros((10, 10, 3), dtype=np.uint8)
+    assert compositor.compose(frame, 0.5) is frame
+    assert compositor.compose(frame, 2.0) is frame
+
+
+def test_only_the_glyph_box_is_blended():
+    compositor = SubtitleCompositor(
+        [((0.0, 1.0), "a")], lambda text: _glyph(0.5), ("left", "top")
+    )
+    frame = np.full((10, 10, 3), 100, dtype=np.uint8)
+    out = compositor.compose(frame, 0.5)
+
+    expected = frame.copy()
+    expected[1:3, 2:6] = 150
+    assert np.array_equal(out, expected)
+    # The decoded frame itself is left alone.
+    assert (frame == 100).all()
+
+
+def test_glyph_is_clipped_at_the_frame_edge():
+    compositor = SubtitleCompositor(
+        [((0.0, 1.0), "a")], lambda text: _glyph(1.0), ("right", "bottom")
+    )
+    frame = np.zeros((4, 5, 3), dtype=np.uint8)
+    out = compositor.compose(frame, 0.5)
+    # The 8 wide clip is right aligned at x = -3, so the glyph starts one
+    # column left of the frame and three of its four columns are drawn.
+    assert (out[1:3, 0:3] == 200).all()
+    assert (out[:, 3:] == 0).all()
+    assert (out[0] == 0).all() and (out[3] == 0).all()
+
+
+@requires_ffmpeg
+def test_compositor_matches_composite_video_clip(tmp_path, monkeypatch):
+    movie = str(tmp_path / "movie.mp4")
+    subprocess.run(
+        [settings.FFMPEG_BINARY, "-y", "-f", "lavfi", "-i"]
+        + ["testsrc=size=180x320:rate=24:duration=2", "-pix_fmt", "yuv420p"]
+        + [movie],
+        check=True,
+        capture_output=True,
+    )
+    srt = tmp_path / "voice.srt"
+    srt.write_text(SRT, encoding="utf-8")
+    generator = ReelGenerator(
+        font_size=24, text_margin=20, video_width=180, video_height=320
+    )
+
+    frames = {}
+    for enabled in (False, True):
+        monkeypatch.setattr(settings, "SUBTITLE_COMPOSITOR_ENABLED", enabled)
+        final_clip, clips = generator._compose_video(
+            movie, str(srt), prescaled=True
+        )
+        # Before, during and between the cues.
+        frames[enabled] = [
+            final_clip.get_frame(t).astype(np.uint8)
+            for t in (0.1, 0.4, 0.8, 1.3)
+        ]
+        generator._cleanup([final_clip] + clips)
+
+    for moviepy_frame, numpy_frame in zip(frames[False], frames[True]):
+        assert np.array_equal(numpy_frame, moviepy_frame)
+    # Cues are drawn over the movie, frames between them are untouched.
+    base, clips = generator._compose_video(movie, None, prescaled=True)
+    assert not np.array_equal(frames[True][1], base.get_frame(0.4))
+    assert np.array_equal(frames[True][2], base.get_frame(0.8))
+    generator._cleanup([base] + clips)
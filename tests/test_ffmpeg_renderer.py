@@ -0,0 +1,297 @@
+import os
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from app.core.config import settings
+from app.core.ffmpeg import probe_duration
+from app.core.ffmpeg_renderer import HLS_PLAYLIST, TAIL_PADDING, FFmpegRenderer
+from app.core.media import MediaHandle
+from app.core.reel_generator import ReelGenerator
+from app.models.reel_generator.render_engine import RenderEngine
+
+requires_ffmpeg = pytest.mark.skipif(
+    shutil.which(settings.FFMPEG_BINARY) is None, reason="ffmpeg not found"
+)
+
+
+@pytest.fixture
+def renderer():
+    generator = ReelGenerator(
+        video_width=108, video_height=192, engine=RenderEngine.FFmpeg
+    )
+    return FFmpegRenderer(generator)
+
+
+def _option(command: list[str], name: str) -> str:
+    return command[command.index(name) + 1]
+
+
+def test_build_command_always_sets_duration(renderer):
+    command = renderer.build_command(
+        "out.mp4", "movie.mp4", "voice.wav", None, "music.wav", 0.2, 7.0
+    )
+    assert "-shortest" not in command
+    assert _option(command, "-t") == "7.000"
+
+
+def test_build_command_keeps_music_after_voice(renderer):
+    command = renderer.build_command(
+        "out.mp4", "movie.mp4", "voice.wav", None, "music.wav", 0.2, 7.0
+    )
+    graph = _option(command, "-filter_complex")
+    assert "aloop=loop=-1" in graph
+    assert "amix=inputs=2:duration=longest" in graph
+
+
+def test_build_command_without_audio(renderer):
+    command = renderer.build_command(
+        "out.mp4", "movie.mp4", None, None, None, 0.2, 3.0
+    )
+    assert command.count("-i") == 1
+    assert command.count("-map") == 1
+
+
+def _lavfi(path: str, source: str, *args: str) -> str:
+    subprocess.run(
+        [
+            settings.FFMPEG_BINARY,
+            "-y",
+            "-f",
+            "lavfi",
+            "-i",
+            source,
+            *args,
+            path,
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return path
+
+
+def _mean_volume(path: str, start: float) -> float:
+    result = subprocess.run(
+        [settings.FFMPEG_BINARY, "-ss", str(start), "-i", path]
+        + ["-af", "volumedetect", "-f", "null", "-"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(re.search(r"mean_volume: (-?[\d.]+) dB", result.stderr)[1])
+
+
+@requires_ffmpeg
+def test_render_without_subtitles_finishes(renderer, tmp_path):
+    movie = _lavfi(
+        str(tmp_path / "movie.mp4"),
+        "testsrc=size=160x120:rate=24:duration=2",
+        "-pix_fmt",
+        "yuv420p",
+    )
+    voice = _lavfi(
+        str(tmp_path / "voice.wav"), "sine=frequency=440:duration=0.5"
+    )
+    music = _lavfi(
+        str(tmp_path / "music.wav"), "sine=frequency=220:duration=0.3"
+    )
+    output = str(tmp_path / "out.mp4")
+    command = renderer.build_command(
+        output, movie, voice, None, music, 0.5, 2 + TAIL_PADDING
+    )
+    # An unbounded graph never ends, the timeout turns that into a failure.
+    subprocess.run(
+        [settings.FFMPEG_BINARY, "-hide_banner", "-y", *command],
+        check=True,
+        capture_output=True,
+        timeout=60,
+    )
+    assert probe_duration(output) == pytest.approx(2 + TAIL_PADDING, abs=0.1)
+    # The music is still audible well after the voice has ended.
+    assert _mean_volume(output, 1.5) > -40
+
+
+def test_build_remux_command_copies_video(renderer):
+    command = renderer.build_remux_command(
+        "out.mp4", "reel.mp4", "voice.wav", "music.wav", 0.2, 5.0
+    )
+    assert _option(command, "-c:v") == "copy"
+    assert _option(command, "-t") == "5.000"
+    graph = _option(command, "-filter_complex")
+    assert "amix=inputs=2:duration=longest" in graph
+
+
+@requires_ffmpeg
+def test_remux_keeps_music_after_voice(tmp_path):
+    generator = ReelGenerator(
+        video_width=108, video_height=192, engine=RenderEngine.FFmpeg
+    )
+    video = _lavfi(
+        str(tmp_path / "reel.mp4"),
+        "testsrc=size=108x192:rate=24:duration=3",
+        "-pix_fmt",
+        "yuv420p",
+    )
+    voice = _lavfi(
+        str(tmp_path / "voice.wav"), "sine=frequency=440:duration=0.5"
+    )
+    music = _lavfi(
+        str(tmp_path / "music.wav"), "sine=frequency=220:duration=0.3"
+    )
+    output = generator.remux(
+        MediaHandle(video), MediaHandle(voice), MediaHandle(music), 0.5
+    )
+    try:
+        assert probe_duration(output) == pytest.approx(3, abs=0.1)
+        assert _mean_volume(output, 1.5) > -40
+    finally:
+        os.remove(output)
+
+
+def test_build_batch_command_decodes_the_movie_once(renderer):
+    command = renderer.build_batch_command(
+        "movie.mp4",
+        [
+            ("voice1.wav", None, "music.wav", 0.3, None),
+            ("voice2.wav", None, None, 0.2, None),
+        ],
+        ["out1.mp4", "out2.mp4"],
+        [5.0, 4.0],
+    )
+    inputs = [command[i + 1] for i, arg in enumerate(command) if arg == "-i"]
+    assert inputs == ["movie.mp4", "voice1.wav", "music.wav", "voice2.wav"]
+    graph = _option(command, "-filter_complex")
+    assert graph.count("split=2") == 1
+    assert "[1:a]" in graph and "[3:a]" in graph
+    assert "-shortest" not in command
+    durations = [command[i + 1] for i, arg in enumerate(command) if arg == "-t"]
+    assert durations == ["5.000", "4.000"]
+    assert command[-1] == "out2.mp4" and "out1.mp4" in command
+
+
+def _music_volume(path: str, start: float) -> float:
+    # The 150 Hz music without the 2 kHz voice, over half a second.
+    result = subprocess.run(
+        [settings.FFMPEG_BINARY, "-ss", str(start), "-t", "0.5", "-i", path]
+        + ["-af", "lowpass=f=300,lowpass=f=300,volumedetect"]
+        + ["-f", "null", "-"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(re.search(r"mean_volume: (-?[\d.]+) dB", result.stderr)[1])
+
+
+@requires_ffmpeg
+def test_ffmpeg_engine_ducks_music_under_voice(tmp_path, monkeypatch):
+    generator = ReelGenerator(
+        video_width=108, video_height=192, engine=RenderEngine.FFmpeg
+    )
+    movie = _lavfi(
+        str(tmp_path / "movie.mp4"),
+        "testsrc=size=108x192:rate=24:duration=3",
+        "-pix_fmt",
+        "yuv420p",
+    )
+    voice = _lavfi(
+        str(tmp_path / "voice.wav"), "sine=frequency=2000:duration=1"
+    )
+    music = _lavfi(
+        str(tmp_path / "music.wav"), "sine=frequency=150:duration=0.5"
+    )
+
+    def render(ducking_db: float) -> tuple[float, float]:
+        monkeypatch.setattr(settings, "MUSIC_DUCKING_DB", ducking_db)
+        output = generator.generate(
+            MediaHandle(movie), MediaHandle(voice), music=MediaHandle(music)
+        )
+        try:
+            return _music_volume(output, 0.25), _music_volume(output, 2)
+        finally:
+            os.remove(output)
+
+    plain_during, plain_after = render(0)
+    ducked_during, ducked_after = render(12.0)
+    # Relative to the music after the voice ends, which is never ducked.
+    assert plain_during == pytest.approx(plain_after, abs=1)
+    assert ducked_after - ducked_during > 8
+
+
+@pytest.mark.parametrize(
+    "has_audio, stream_map",
+    [(True, "v:0,a:0 v:1,a:1 v:2,a:2"), (False, "v:0 v:1 v:2")],
+)
+def test_build_hls_command(has_audio, stream_map, monkeypatch):
+    monkeypatch.setattr(settings, "HLS_SEGMENT_SECONDS", 2)
+    renderer = FFmpegRenderer(ReelGenerator(engine=RenderEngine.FFmpeg))
+    command = renderer.build_hls_command("out", "reel.mp4", has_audio)
+
+    graph = _option(command, "-filter_complex")
+    assert graph.count("split=3") == 1
+    assert "scale=-2:1280" in graph and "scale=-2:854" in graph
+    assert _option(command, "-var_stream_map") == stream_map
+    assert ("-c:a" in command) == has_audio
+    # A keyframe opens every 2 s segment.
+    assert _option(command, "-g") == _option(command, "-keyint_min") == "48"
+    assert _option(command, "-sc_threshold") == "0"
+    assert _option(command, "-hls_segment_type") == "fmp4"
+    assert _option(command, "-hls_playlist_type") == "vod"
+    assert _option(command, "-master_pl_name") == HLS_PLAYLIST
+
+
+def test_hls_ladder_skips_renditions_above_the_reel(renderer):
+    # A 192 px reel is not upscaled, it gets one rendition at its height.
+    command = renderer.build_hls_command("out", "reel.mp4", False)
+    graph = _option(command, "-filter_complex")
+    assert "split=1" in graph and "scale=-2:192" in graph
+    assert _option(command, "-b:v:0") == settings.HLS_VARIANTS[-1].split(":")[1]
+
+
+@requires_ffmpeg
+def test_package_hls_writes_fmp4_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "HLS_SEGMENT_SECONDS", 1)
+    monkeypatch.setattr(settings, "HLS_VARIANTS", ["192:400k", "96:200k"])
+    generator = ReelGenerator(
+        video_width=108, video_height=192, engine=RenderEngine.FFmpeg
+    )
+    video = _lavfi(
+        str(tmp_path / "reel.mp4"),
+        "testsrc=size=108x192:rate=24:duration=3",
+        "-pix_fmt",
+        "yuv420p",
+    )
+    output_dir = generator.package_hls(video)
+    try:
+        with open(os.path.join(output_dir, HLS_PLAYLIST)) as f:
+            master = f.read()
+        assert "0/index.m3u8" in master and "1/index.m3u8" in master
+        for variant in ("0", "1"):
+            names = sorted(os.listdir(os.path.join(output_dir, variant)))
+            assert f"init_{variant}.mp4" in names and "index.m3u8" in names
+            segments = [name for name in names if name.endswith(".m4s")]
+            assert len(segments) == 3
+    finally:
+        shutil.rmtree(output_dir)
+
+
+@requires_ffmpeg
+def test_reel_is_written_with_faststart(renderer, tmp_path):
+    movie = _lavfi(
+        str(tmp_path / "movie.mp4"),
+        "testsrc=size=160x120:rate=24:duration=1",
+        "-pix_fmt",
+        "yuv420p",
+    )
+    output = str(tmp_path / "out.mp4")
+    command = renderer.build_command(output, movie, None, None, None, 0.2, 1.0)
+    subprocess.run(
+        [settings.FFMPEG_BINARY, "-hide_banner", "-y", *command],
+        check=True,
+        capture_output=True,
+    )
+    with open(output, "rb") as f:
+        data = f.read()
+    # The index comes first, playback starts before the download ends.
+    assert data.index(b"moov") < data.index(b"mdat")
@@ -0,0 +1,81 @@
+import numpy as np
+from moviepy import ImageClip
+
+from app.core.glyph_cache import GlyphCache
+
+# Each glyph is a 10x20 opaque box on a 50x80 canvas: 10 * 20 bytes per RGB
+# channel plus a float32 mask.
+GLYPH_BYTES = 10 * 20 * 3 + 10 * 20 * 4
+
+
+def _renderer(value: int, calls: list):
+    def render():
+        calls.append(value)
+        rgb = np.zeros((50, 80, 3), dtype=np.uint8)
+        rgb[5:15, 30:50] = value
+        mask = np.zeros((50, 80))
+        mask[5:15, 30:50] = 1.0
+        return ImageClip(rgb).with_mask(ImageClip(mask, is_mask=True))
+
+    return render
+
+
+def test_hit_rebuilds_the_rendered_clip():
+    cache = GlyphCache(max_bytes=10 * GLYPH_BYTES)
+    calls = []
+    first = cache.get_or_render("a", _renderer(200, calls))
+    again = cache.get_or_render("a", _renderer(200, calls))
+
+    assert calls == [200]
+    assert np.array_equal(again.get_frame(0), first.get_frame(0))
+    assert np.array_equal(again.mask.get_frame(0), first.mask.get_frame(0))
+
+
+def test_only_the_bounding_box_is_kept():
+    cache = GlyphCache(max_bytes=10 * GLYPH_BYTES)
+    glyph = cache.get_glyph("a", _renderer(200, []))
+    assert (glyph.top, glyph.left, glyph.size) == (5, 30, (50, 80))
+    assert glyph.rgb.shape == (10, 20, 3)
+    assert glyph.nbytes == GLYPH_BYTES
+    assert cache.stats()["bytes"] == GLYPH_BYTES
+
+
+def test_least_recently_used_glyph_is_evicted():
+    cache = GlyphCache(max_bytes=2 * GLYPH_BYTES)
+    calls = []
+    cache.get_glyph("a", _renderer(1, calls))
+    cache.get_glyph("b", _renderer(2, calls))
+    cache.get_glyph("a", _renderer(1, calls))
+    cache.get_glyph("c", _renderer(3, calls))
+
+    # "b" was used least recently, "a" is still cached.
+    cache.get_glyph("a", _renderer(1, calls))
+    cache.get_glyph("b", _renderer(2, calls))
+    assert calls == [1, 2, 3, 2]
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] == 2 * GLYPH_BYTES
+    assert stats["evictions"] == 2
+
+
+def test_glyph_larger_than_the_cache_is_not_stored():
+    cache = GlyphCache(max_bytes=GLYPH_BYTES - 1)
+    calls = []
+    cache.get_glyph("a", _renderer(1, calls))
+    cache.get_glyph("a", _renderer(1, calls))
+    assert calls == [1, 1]
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["evictions"] == 0
+
+
+def test_stats_count_hits_and_misses():
+    cache = GlyphCache(max_bytes=10 * GLYPH_BYTES)
+    for key in ("a", "a", "a", "b"):
+        cache.get_glyph(key, _renderer(1, []))
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+    assert stats["hit_rate"] == 0.5
+    assert stats["max_bytes"] == 10 * GLYPH_BYTES
+
+    cache.clear()
+    assert (cache.stats()["entries"], cache.stats()["bytes"]) == (0, 0)
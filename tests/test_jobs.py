@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.db.models.job import Job
+from app.models.jobs.job_status import JobStatus
+from app.services import jobs as services_jobs
+
+
+def test_claim_skips_jobs_waiting_for_backoff(engine):
+    with Session(engine) as db:
+        later = services_jobs.enqueue_job(db, "render", {})
+        later.run_at = datetime.utcnow() + timedelta(minutes=1)
+        due = services_jobs.enqueue_job(db, "render", {})
+        db.commit()
+
+        job = services_jobs.claim_job(db, "w1")
+        assert job.id == due.id
+        assert job.status == JobStatus.Running.value
+        assert job.attempts == 1
+        assert services_jobs.claim_job(db, "w2") is None
+
+
+def test_claim_filters_kinds(engine):
+    with Session(engine) as db:
+        services_jobs.enqueue_job(db, "render", {})
+        assert services_jobs.claim_job(db, "w1", ["collect"]) is None
+        assert services_jobs.claim_job(db, "w1", ["render"]) is not None
+
+
+def test_fail_requeues_with_backoff_then_dead_letters(engine):
+    with Session(engine) as db:
+        job_id = services_jobs.enqueue_job(db, "render", {}, max_attempts=2).id
+
+        job = services_jobs.claim_job(db, "w1")
+        assert services_jobs.fail_job(db, job_id, "w1", "boom")
+        job = db.get(Job, job_id)
+        assert job.status == JobStatus.Queued.value
+        assert job.run_at > datetime.utcnow()
+        assert services_jobs.claim_job(db, "w1") is None
+
+        job.run_at = datetime.utcnow()
+        db.commit()
+        services_jobs.claim_job(db, "w1")
+        assert services_jobs.fail_job(db, job_id, "w1", "boom")
+        job = db.get(Job, job_id)
+        assert job.status == JobStatus.Dead.value
+        assert [j.id for j in services_jobs.get_dead_jobs(db)] == [job_id]
+
+
+def test_fail_needs_the_lease(engine):
+    with Session(engine) as db:
+        job_id = services_jobs.enqueue_job(db, "render", {}).id
+        services_jobs.claim_job(db, "w1")
+        assert not services_jobs.fail_job(db, job_id, "w2", "boom")
+
+
+def _expire(db: Session, job_id: int):
+    job = db.get(Job, job_id)
+    job.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+
+
+def test_expired_lease_counts_as_a_failed_attempt(engine):
+    with Session(engine) as db:
+        job_id = services_jobs.enqueue_job(db, "render", {}).id
+        services_jobs.claim_job(db, "w1")
+        _expire(db, job_id)
+
+        # Requeued behind a backoff, not handed straight to another worker.
+        assert services_jobs.claim_job(db, "w2") is None
+        job = db.get(Job, job_id)
+        assert job.status == JobStatus.Queued.value
+        assert job.error == "Lease expired"
+        assert job.locked_by is None
+        assert not services_jobs.complete_job(db, job_id, "w1")
+
+
+def test_expired_lease_on_last_attempt_dead_letters(engine):
+    with Session(engine) as db:
+        job_id = services_jobs.enqueue_job(db, "render", {}, max_attempts=1).id
+        services_jobs.claim_job(db, "w1")
+        _expire(db, job_id)
+
+        assert services_jobs.claim_job(db, "w2") is None
+        job = db.get(Job, job_id)
+        assert job.status == JobStatus.Dead.value
+        assert job.attempts == 1
+        assert job.finished_at is not None
+
+
+def test_queue_only_endpoints_need_the_queue_backend(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_BACKEND", "local")
+    with pytest.raises(HTTPException) as error:
+        services_jobs.require_queue_backend()
+    assert error.value.status_code == 503
+
+    monkeypatch.setattr(settings, "JOB_BACKEND", services_jobs.QUEUE_BACKEND)
+    services_jobs.require_queue_backend()
@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.storage.backends import StorageObject
+from app.services.media import is_not_modified, parse_range
+
+OBJ = StorageObject(
+    key="reel.mp4",
+    size=1000,
+    updated_at=datetime(2026, 1, 2, 3, 4, 5, 678000),
+    etag='"abc"',
+)
+LAST_MODIFIED = "Fri, 02 Jan 2026 03:04:05 GMT"
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("bytes=0-99", (0, 99)),
+        ("bytes=900-", (900, 999)),
+        ("bytes=-100", (900, 999)),
+        ("bytes=-5000", (0, 999)),
+        ("bytes=500-5000", (500, 999)),
+        ("bytes=-", None),
+        ("bytes=0-1,5-6", None),
+        ("items=0-1", None),
+    ],
+)
+def test_parse_range(header, expected):
+    assert parse_range({"range": header}, OBJ) == expected
+
+
+def test_parse_range_without_header():
+    assert parse_range({}, OBJ) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=10-5"])
+def test_parse_range_not_satisfiable(header):
+    with pytest.raises(HTTPException) as error:
+        parse_range({"range": header}, OBJ)
+    assert error.value.status_code == 416
+    assert error.value.headers["Content-Range"] == "bytes */1000"
+
+
+@pytest.mark.parametrize(
+    "if_range, expected",
+    [
+        ('"abc"', (0, 9)),
+        ('"old"', None),
+        (LAST_MODIFIED, (0, 9)),
+        ("Thu, 01 Jan 2026 00:00:00 GMT", None),
+    ],
+)
+def test_parse_range_if_range(if_range, expected):
+    headers = {"range": "bytes=0-9", "if-range": if_range}
+    assert parse_range(headers, OBJ) == expected
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({}, False),
+        ({"if-none-match": '"abc"'}, True),
+        ({"if-none-match": 'W/"abc", "def"'}, True),
+        ({"if-none-match": "*"}, True),
+        ({"if-none-match": '"def"'}, False),
+        ({"if-modified-since": LAST_MODIFIED}, True),
+        ({"if-modified-since": "Thu, 01 Jan 2026 00:00:00 GMT"}, False),
+        ({"if-modified-since": "not a date"}, False),
+        # If-None-Match wins over If-Modified-Since.
+        (
+            {"if-none-match": '"def"', "if-modified-since": LAST_MODIFIED},
+            False,
+        ),
+    ],
+)
+def test_is_not_modified(headers, expected):
+    assert is_not_modified(headers, OBJ) is expected
@@ -0,0 +1,153 @@
+import shutil
+import subprocess
+
+import pytest
+from fastapi import BackgroundTasks
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.ffmpeg import probe_media
+from app.core.media import MediaHandle
+from app.core.storage.backends import LocalStorageBackend
+from app.db.models.job import Job
+from app.db.models.movie import Movie
+from app.models.jobs.job_kind import JobKind
+from app.models.movie.mezzanine_status import MezzanineStatus
+from app.schemas.reel import ReelCreate
+from app.services import (
+    jobs as services_jobs,
+    movie as services_movie,
+    reel as services_reel,
+)
+from tests.conftest import USER_ID
+
+requires_ffmpeg = pytest.mark.skipif(
+    shutil.which(settings.FFMPEG_BINARY) is None, reason="ffmpeg not found"
+)
+
+
+@pytest.fixture
+def movie(engine, seed) -> int:
+    seed(1, reels_per_movie=0)
+    with Session(engine) as db:
+        db_movie = db.get(Movie, 1)
+        db_movie.file_path = "http://storage//1.mp4"
+        db.commit()
+    return 1
+
+
+@pytest.fixture
+def upload(tmp_path) -> MediaHandle:
+    path = tmp_path / "upload.mp4"
+    path.write_bytes(b"movie")
+    return MediaHandle(str(path), owned=True)
+
+
+def test_mezzanine_is_transcoded_after_the_response(
+    engine, movie, upload, monkeypatch
+):
+    monkeypatch.setattr(settings, "MEZZANINE_ENABLED", True)
+    monkeypatch.setattr(settings, "JOB_BACKEND", "local")
+    tasks = BackgroundTasks()
+    with Session(engine) as db:
+        db_movie = db.get(Movie, movie)
+        services_movie.schedule_mezzanine(db, tasks, db_movie, upload)
+        assert db_movie.mezzanine_status == MezzanineStatus.Pending.value
+
+    [task] = tasks.tasks
+    assert task.func is services_movie._create_mezzanine_task
+    assert task.args[0] == movie
+    # The task owns the upload now, the request no longer deletes it.
+    assert task.args[1].path == upload.path
+    assert task.args[1].owned and not upload.owned
+
+
+def test_mezzanine_is_queued_with_the_queue_backend(
+    engine, movie, upload, monkeypatch
+):
+    monkeypatch.setattr(settings, "MEZZANINE_ENABLED", True)
+    monkeypatch.setattr(settings, "JOB_BACKEND", services_jobs.QUEUE_BACKEND)
+    tasks = BackgroundTasks()
+    with Session(engine) as db:
+        db_movie = db.get(Movie, movie)
+        services_movie.schedule_mezzanine(db, tasks, db_movie, upload)
+        [job] = db.exec(select(Job)).all()
+        assert job.kind == JobKind.TranscodeMezzanine.value
+        assert job.payload == {"movie_id": movie}
+    assert tasks.tasks == []
+    assert upload.owned
+
+
+def test_mezzanine_disabled(engine, movie, upload, monkeypatch):
+    monkeypatch.setattr(settings, "MEZZANINE_ENABLED", False)
+    tasks = BackgroundTasks()
+    with Session(engine) as db:
+        db_movie = db.get(Movie, movie)
+        services_movie.schedule_mezzanine(db, tasks, db_movie, upload)
+        assert db_movie.mezzanine_status is None
+    assert tasks.tasks == []
+
+
+@pytest.mark.parametrize(
+    "status, source",
+    [
+        (MezzanineStatus.Ready, ("1_mezzanine.mp4", True)),
+        (MezzanineStatus.Pending, ("1.mp4", False)),
+        (MezzanineStatus.Failed, ("1.mp4", False)),
+    ],
+)
+def test_renders_use_a_ready_mezzanine(engine, movie, status, source):
+    with Session(engine) as db:
+        db_movie = db.get(Movie, movie)
+        db_movie.mezzanine_path = "http://storage//1_mezzanine.mp4"
+        db_movie.mezzanine_status = status.value
+        db.commit()
+        assert services_reel.get_movie_source(db, movie, "mp4") == source
+
+
+def test_render_reel_passes_the_prescaled_source(engine, movie, monkeypatch):
+    calls = {}
+
+    def download_reel_inputs(db, storage, reel_info, movie_key, stack):
+        calls["movie_key"] = movie_key
+        return MediaHandle(movie_key), None, None, None, None
+
+    def create_reel(*args, prescaled=False, **kwargs):
+        calls["prescaled"] = prescaled
+        return "reel"
+
+    monkeypatch.setattr(
+        services_reel, "download_reel_inputs", download_reel_inputs
+    )
+    monkeypatch.setattr(services_reel, "create_reel", create_reel)
+    with Session(engine) as db:
+        db_movie = db.get(Movie, movie)
+        db_movie.mezzanine_path = "http://storage//1_mezzanine.mp4"
+        db_movie.mezzanine_status = MezzanineStatus.Ready.value
+        db.commit()
+        reel_info = ReelCreate(movie_id=movie, audio_id=None, music_id=None)
+        services_reel.render_reel(db, None, reel_info, "mp4", "a", USER_ID)
+    assert calls == {"movie_key": "1_mezzanine.mp4", "prescaled": True}
+
+
+@requires_ffmpeg
+def test_create_mezzanine_crops_to_the_reel_size(engine, movie, tmp_path):
+    source = str(tmp_path / "source.mp4")
+    subprocess.run(
+        [settings.FFMPEG_BINARY, "-y", "-f", "lavfi", "-i"]
+        + ["testsrc=size=320x180:rate=30:duration=1", "-pix_fmt", "yuv420p"]
+        + [source],
+        check=True,
+        capture_output=True,
+    )
+    storage = LocalStorageBackend(str(tmp_path / "storage"), "http://storage")
+    with Session(engine) as db:
+        db_movie = services_movie.create_mezzanine(
+            db, storage, movie, MediaHandle(source)
+        )
+        assert db_movie.mezzanine_status == MezzanineStatus.Ready.value
+        assert db_movie.mezzanine_path == storage.public_url("1_mezzanine.mp4")
+
+    info = probe_media(storage.local_path("1_mezzanine.mp4"))
+    assert (info.width, info.height) == (1080, 1920)
+    assert info.fps == pytest.approx(24)
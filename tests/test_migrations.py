@@ -0,0 +1,46 @@
+from sqlalchemy import inspect
+from sqlmodel import Session, select
+
+from app.db.migrations import ADDED_COLUMNS, add_missing_columns
+
+
+def _drop_added_columns(engine):
+    # Back to the tables as deployed before the columns existed.
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for attribute in ADDED_COLUMNS:
+            column = attribute.property.columns[0]
+            table = column.table.name
+            for index in inspector.get_indexes(table):
+                if column.name in index["column_names"]:
+                    connection.exec_driver_sql(f'DROP INDEX "{index["name"]}"')
+            connection.exec_driver_sql(
+                f'ALTER TABLE "{table}" DROP COLUMN "{column.name}"'
+            )
+
+
+def test_add_missing_columns(engine):
+    _drop_added_columns(engine)
+    add_missing_columns(engine)
+
+    inspector = inspect(engine)
+    for attribute in ADDED_COLUMNS:
+        column = attribute.property.columns[0]
+        table = column.table
+        names = {c["name"] for c in inspector.get_columns(table.name)}
+        assert column.name in names
+        if column.index:
+            indexed = {
+                name
+                for index in inspector.get_indexes(table.name)
+                for name in index["column_names"]
+            }
+            assert column.name in indexed
+    with Session(engine) as db:
+        for attribute in ADDED_COLUMNS:
+            db.exec(select(attribute.class_)).all()
+
+
+def test_add_missing_columns_is_idempotent(engine):
+    add_missing_columns(engine)
+    add_missing_columns(engine)
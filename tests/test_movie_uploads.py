@@ -0,0 +1,180 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.api.v1.endpoints import movie_uploads
+from app.core.config import settings
+from app.db.models.movie import Movie
+from app.db.models.movie_upload import MovieUpload
+from app.services import movie_upload as services_movie_upload
+from tests.conftest import USER_ID
+
+DATA = bytes(range(256)) * 40
+CHUNK = 1024
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # A database file with a connection per thread, chunks sent in parallel
+    # each get their own session as they would against the real database.
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'uploads.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def api(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "MOVIE_UPLOAD_DIR", str(tmp_path / "parts"))
+    return client(movie_uploads.router, "/uploads")
+
+
+@pytest.fixture
+def ingested(monkeypatch):
+    # Stands in for probing and storing the movie, keeps what was assembled.
+    received = []
+
+    def ingest_movie(db, user_id, storage, media, movie_info, tasks=None):
+        with open(media.path, "rb") as f:
+            received.append(f.read())
+        movie = Movie(title=movie_info.title, author=user_id, type="mp4")
+        db.add(movie)
+        db.commit()
+        db.refresh(movie)
+        return movie
+
+    monkeypatch.setattr(
+        services_movie_upload.services_movie, "ingest_movie", ingest_movie
+    )
+    return received
+
+
+def _create(api, size: int = len(DATA)) -> str:
+    response = api.post(
+        "/uploads/", json={"title": "t", "filename": "m.mp4", "size": size}
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _send(api, upload_id: str, offset: int, data: bytes):
+    return api.patch(
+        f"/uploads/{upload_id}",
+        content=data,
+        headers={"Upload-Offset": str(offset)},
+    )
+
+
+def _chunks() -> list[tuple[int, bytes]]:
+    return [
+        (offset, DATA[offset : offset + CHUNK])
+        for offset in range(0, len(DATA), CHUNK)
+    ]
+
+
+def test_chunks_out_of_order_assemble_in_order(api, ingested):
+    upload_id = _create(api)
+    for offset, data in reversed(_chunks()):
+        assert _send(api, upload_id, offset, data).status_code == 200
+
+    response = api.post(f"/uploads/{upload_id}/finalize")
+    assert response.status_code == 201
+    assert ingested == [DATA]
+    # The chunks are gone once the movie exists.
+    assert api.get(f"/uploads/{upload_id}").status_code == 404
+    assert not os.path.exists(services_movie_upload._upload_dir(upload_id))
+
+
+def test_parallel_chunks(api, ingested):
+    upload_id = _create(api)
+    with ThreadPoolExecutor(4) as pool:
+        responses = list(
+            pool.map(lambda chunk: _send(api, upload_id, *chunk), _chunks())
+        )
+    assert all(response.status_code == 200 for response in responses)
+
+    assert api.post(f"/uploads/{upload_id}/finalize").status_code == 201
+    assert ingested == [DATA]
+
+
+def test_head_reports_offset_and_ranges(api):
+    upload_id = _create(api)
+    _send(api, upload_id, 2 * CHUNK, DATA[2 * CHUNK : 3 * CHUNK])
+    response = api.head(f"/uploads/{upload_id}")
+    assert response.headers["Upload-Offset"] == "0"
+    assert response.headers["Upload-Length"] == str(len(DATA))
+
+    _send(api, upload_id, 0, DATA[:CHUNK])
+    response = api.get(f"/uploads/{upload_id}")
+    assert response.headers["Upload-Offset"] == str(CHUNK)
+    assert response.json()["ranges"] == [[0, CHUNK], [2 * CHUNK, 3 * CHUNK]]
+
+    # Filling the gap joins the ranges and moves the offset past them.
+    _send(api, upload_id, CHUNK, DATA[CHUNK : 2 * CHUNK])
+    response = api.head(f"/uploads/{upload_id}")
+    assert response.headers["Upload-Offset"] == str(3 * CHUNK)
+
+
+def test_retried_chunk_replaces_the_earlier_copy(api, ingested):
+    upload_id = _create(api)
+    for offset, data in _chunks():
+        _send(api, upload_id, offset, data)
+    response = _send(api, upload_id, 0, DATA[:CHUNK])
+    assert response.status_code == 200
+    assert response.json()["ranges"] == [[0, len(DATA)]]
+
+    assert api.post(f"/uploads/{upload_id}/finalize").status_code == 201
+    assert ingested == [DATA]
+
+
+def test_overlapping_chunk_is_rejected(api):
+    upload_id = _create(api)
+    _send(api, upload_id, 0, DATA[:CHUNK])
+    response = _send(api, upload_id, CHUNK // 2, DATA[CHUNK // 2 : 2 * CHUNK])
+    assert response.status_code == 409
+    assert api.get(f"/uploads/{upload_id}").json()["ranges"] == [[0, CHUNK]]
+    # The rejected chunk leaves no file behind.
+    assert os.listdir(services_movie_upload._upload_dir(upload_id)) == [
+        os.path.basename(services_movie_upload._chunk_path(upload_id, 0))
+    ]
+
+
+def test_chunk_past_the_end_is_rejected(api):
+    upload_id = _create(api, size=CHUNK)
+    assert _send(api, upload_id, 1, DATA[:CHUNK]).status_code == 400
+
+
+def test_incomplete_upload_is_not_finalized(api, ingested):
+    upload_id = _create(api)
+    _send(api, upload_id, 0, DATA[:CHUNK])
+    _send(api, upload_id, 2 * CHUNK, DATA[2 * CHUNK : 3 * CHUNK])
+
+    response = api.post(f"/uploads/{upload_id}/finalize")
+    assert response.status_code == 409
+    assert ingested == []
+    # The chunks are kept so the upload can still be completed.
+    assert api.get(f"/uploads/{upload_id}").json()["offset"] == CHUNK
+
+
+def test_expired_uploads_are_cleaned_up(api, engine):
+    expired_id = _create(api)
+    _send(api, expired_id, 0, DATA[:CHUNK])
+    live_id = _create(api)
+    with Session(engine) as db:
+        upload = db.get(MovieUpload, expired_id)
+        upload.expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+
+    assert api.get(f"/uploads/{expired_id}").status_code == 404
+    response = api.post("/uploads/admin/expire")
+    assert response.json() == {"expired": 1}
+    assert not os.path.exists(services_movie_upload._upload_dir(expired_id))
+    with Session(engine) as db:
+        assert db.get(MovieUpload, expired_id) is None
+        assert db.get(MovieUpload, live_id).author == USER_ID
@@ -0,0 +1,37 @@
+import pytest
+
+from app.api.v1.endpoints import movies
+from tests.utils import assert_num_queries
+
+
+@pytest.mark.parametrize("count", [1, 5])
+def test_read_user_movies_query_count(engine, seed, client, count):
+    seed(count)
+    api = client(movies.router, "/movies")
+    # Movies, reels, audio, subtitles.
+    with assert_num_queries(engine, 4):
+        response = api.get("/movies/")
+    assert response.status_code == 200
+    assert len(response.json()) == count
+    assert all(len(movie["reels"]) == 2 for movie in response.json())
+
+
+def test_read_user_movie_query_count(engine, seed, client):
+    seed(1, reels_per_movie=5)
+    api = client(movies.router, "/movies")
+    with assert_num_queries(engine, 4):
+        response = api.get("/movies/1")
+    assert response.status_code == 200
+    reels = response.json()["reels"]
+    assert len(reels) == 5
+    assert all(reel["audio"]["srtObject"] for reel in reels)
+
+
+@pytest.mark.parametrize("count", [1, 5])
+def test_read_movies_query_count(engine, seed, client, count):
+    seed(count)
+    api = client(movies.router, "/movies")
+    with assert_num_queries(engine, 4):
+        response = api.get("/movies/admin/")
+    assert response.status_code == 200
+    assert len(response.json()) == count
@@ -0,0 +1,120 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import ffmpeg
+from app.core.config import settings
+from app.core.media import MediaHandle
+from app.services.movie import probe_movie
+
+requires_ffprobe = pytest.mark.skipif(
+    shutil.which(settings.FFPROBE_BINARY) is None
+    or shutil.which(settings.FFMPEG_BINARY) is None,
+    reason="ffmpeg not found",
+)
+
+# Trimmed ffprobe -show_format -show_streams output of a phone recording.
+PHONE_PROBE = {
+    "streams": [
+        {"codec_type": "data", "codec_name": "bin_data"},
+        {
+            "codec_type": "video",
+            "codec_name": "hevc",
+            "width": 1920,
+            "height": 1080,
+            "r_frame_rate": "30/1",
+            "avg_frame_rate": "30000/1001",
+            "side_data_list": [
+                {"side_data_type": "Display Matrix", "rotation": -90}
+            ],
+        },
+        {"codec_type": "audio", "codec_name": "aac"},
+        {"codec_type": "video", "codec_name": "mjpeg", "width": 320},
+    ],
+    "format": {"duration": "12.345000", "bit_rate": "8123456"},
+}
+
+
+def _probe(monkeypatch, probe: dict) -> ffmpeg.MediaInfo:
+    monkeypatch.setattr(ffmpeg, "_run_ffprobe", lambda args: json.dumps(probe))
+    return ffmpeg.probe_media("movie.mp4")
+
+
+def test_probe_reads_the_first_video_stream(monkeypatch):
+    info = _probe(monkeypatch, PHONE_PROBE)
+    assert info == ffmpeg.MediaInfo(
+        duration=12.345,
+        bit_rate=8123456,
+        codec="hevc",
+        width=1920,
+        height=1080,
+        fps=pytest.approx(29.97, abs=0.01),
+        rotation=90,
+        has_audio=True,
+    )
+
+
+@pytest.mark.parametrize(
+    "stream, rotation",
+    [
+        ({"side_data_list": [{"rotation": -90}]}, 90),
+        ({"side_data_list": [{"rotation": 90}]}, 270),
+        ({"side_data_list": [{"rotation": 180}]}, 180),
+        # Older muxers only write the tag, already clockwise.
+        ({"tags": {"rotate": "90"}}, 90),
+        ({"tags": {"rotate": "-90"}}, 270),
+        ({}, 0),
+    ],
+)
+def test_rotation_is_clockwise_degrees(monkeypatch, stream, rotation):
+    probe = {"streams": [{"codec_type": "video", **stream}], "format": {}}
+    assert _probe(monkeypatch, probe).rotation == rotation
+
+
+def test_missing_values(monkeypatch):
+    probe = {
+        "streams": [
+            {
+                "codec_type": "video",
+                "codec_name": "vp9",
+                "r_frame_rate": "25/1",
+                "avg_frame_rate": "0/0",
+            }
+        ],
+        "format": {"bit_rate": "N/A"},
+    }
+    info = _probe(monkeypatch, probe)
+    assert (info.duration, info.bit_rate) == (0, None)
+    assert (info.width, info.height) == (None, None)
+    # avg_frame_rate is unknown, the stream's base rate is used.
+    assert info.fps == 25
+    assert not info.has_audio
+
+
+@requires_ffprobe
+def test_probe_real_movie(tmp_path):
+    path = str(tmp_path / "movie.mp4")
+    subprocess.run(
+        [settings.FFMPEG_BINARY, "-y", "-f", "lavfi", "-i"]
+        + ["testsrc=size=160x120:rate=25:duration=1", "-f", "lavfi", "-i"]
+        + ["sine=duration=1", "-pix_fmt", "yuv420p", "-shortest", path],
+        check=True,
+        capture_output=True,
+    )
+    info = probe_movie(MediaHandle(path))
+    assert (info.codec, info.width, info.height) == ("h264", 160, 120)
+    assert info.fps == 25
+    assert info.duration == pytest.approx(1, abs=0.1)
+    assert info.has_audio
+
+
+@requires_ffprobe
+def test_probe_rejects_files_without_video(tmp_path):
+    path = tmp_path / "movie.mp4"
+    path.write_bytes(b"not a movie")
+    with pytest.raises(HTTPException) as error:
+        probe_movie(MediaHandle(str(path)))
+    assert error.value.status_code == 400
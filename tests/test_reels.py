@@ -0,0 +1,147 @@
+import os
+
+import pytest
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.storage.backends import LocalStorageBackend
+from app.db.models.reel import Reel
+from app.schemas.reel import ReelCreate
+from app.services import reel as services_reel
+from tests.conftest import USER_ID
+from tests.utils import assert_num_queries
+
+# The reel endpoints import the TTS pipeline through the audio service, the
+# read paths they call are tested directly.
+
+
+@pytest.mark.parametrize("count", [1, 5])
+def test_get_reels_by_user_query_count(engine, seed, count):
+    seed(1, reels_per_movie=count)
+    with Session(engine) as db:
+        # Reels, audio, subtitles.
+        with assert_num_queries(engine, 3):
+            reels = services_reel.get_reels_by_user(db, USER_ID)
+    assert len(reels) == count
+    assert all(reel.audio.srtObject for reel in reels)
+
+
+@pytest.mark.parametrize("count", [1, 5])
+def test_get_reels_query_count(engine, seed, count):
+    seed(1, reels_per_movie=count)
+    with Session(engine) as db:
+        with assert_num_queries(engine, 3):
+            reels = services_reel.get_reels(db)
+    assert len(reels) == count
+
+
+def test_get_reel_by_user_query_count(engine, seed):
+    seed(1)
+    with Session(engine) as db:
+        with assert_num_queries(engine, 3):
+            reel = services_reel.get_reel_by_user(db, USER_ID, 1)
+    assert reel.audio.srtObject
+
+
+class FakeStorage:
+    def __init__(self):
+        self.uploads = []
+
+    def upload_file(self, media, key):
+        self.uploads.append(key)
+        return f"local://{key}"
+
+
+def test_retried_render_job_returns_the_saved_reel(
+    engine, seed, monkeypatch, tmp_path
+):
+    seed(1, reels_per_movie=0)
+    monkeypatch.setattr(settings, "RENDER_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "HLS_ENABLED", False)
+    reel_info = ReelCreate(movie_id=1, audio_id=None, music_id=None)
+    storage = FakeStorage()
+    with Session(engine) as db:
+        # The first attempt died after the row was committed, before the
+        # upload finished.
+        db.add(Reel(movie_id=1, lang="a", author=USER_ID, job_key="job:7"))
+        db.commit()
+
+        reel_path = tmp_path / "reel.mp4"
+        reel_path.write_bytes(b"reel")
+        saved = services_reel._save_reel(
+            db,
+            storage,
+            reel_info,
+            "a",
+            USER_ID,
+            str(reel_path),
+            {},
+            None,
+            job_key="job:7",
+        )
+        assert storage.uploads == [f"reel_{saved.id}.mp4"]
+        assert len(db.exec(select(Reel)).all()) == 1
+
+        # A finished reel is returned without downloading or rendering.
+        reel = services_reel.render_reel(
+            db, None, reel_info, "mp4", "a", USER_ID, job_key="job:7"
+        )
+        assert reel.id == saved.id
+        assert storage.uploads == [f"reel_{saved.id}.mp4"]
+
+
+class FakeGenerator:
+    def __init__(self, tmp_path, fail=False):
+        self.tmp_path = tmp_path
+        self.fail = fail
+        self.packaged = []
+
+    def package_hls(self, video_path):
+        if self.fail:
+            raise RuntimeError("ffmpeg failed")
+        self.packaged.append(video_path)
+        output_dir = self.tmp_path / f"hls_{len(self.packaged)}"
+        (output_dir / "0").mkdir(parents=True)
+        (output_dir / "master.m3u8").write_text("#EXTM3U")
+        (output_dir / "0" / "index.m3u8").write_text("#EXTM3U")
+        return str(output_dir)
+
+
+def test_reels_with_the_same_parameters_share_one_package(
+    engine, seed, monkeypatch, tmp_path
+):
+    seed(1, reels_per_movie=2)
+    generator = FakeGenerator(tmp_path)
+    monkeypatch.setattr(services_reel, "_build_generator", lambda: generator)
+    storage = LocalStorageBackend(str(tmp_path / "storage"), "http://storage")
+    with Session(engine) as db:
+        first, second = db.exec(select(Reel).order_by(Reel.id)).all()
+        first.playlist_path = services_reel._package_reel(
+            db, storage, first, "first.mp4", "abc", None
+        )
+        db.commit()
+        shared = services_reel._package_reel(
+            db, storage, second, "second.mp4", "abc", None
+        )
+        assert shared == first.playlist_path
+
+    assert shared == storage.public_url("hls/abc/master.m3u8")
+    assert generator.packaged == ["first.mp4"]
+    assert os.path.exists(storage.local_path("hls/abc/0/index.m3u8"))
+    # The package is uploaded, the local output is removed.
+    assert not os.path.exists(tmp_path / "hls_1")
+
+
+def test_failed_packaging_keeps_the_mp4(engine, seed, monkeypatch, tmp_path):
+    seed(1, reels_per_movie=1)
+    generator = FakeGenerator(tmp_path, fail=True)
+    monkeypatch.setattr(services_reel, "_build_generator", lambda: generator)
+    storage = LocalStorageBackend(str(tmp_path / "storage"), "http://storage")
+    with Session(engine) as db:
+        reel = db.exec(select(Reel)).first()
+        assert (
+            services_reel._package_reel(
+                db, storage, reel, "reel.mp4", "abc", None
+            )
+            is None
+        )
@@ -0,0 +1,163 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.core.config import settings
+from app.core.media import MediaHandle
+from app.core.reel_generator import ReelGenerator
+from app.core.storage.backends import LocalStorageBackend
+from app.db.models.render_cache import RenderCacheCounter, RenderCacheEntry
+from app.schemas.reel import ReelCreate
+from app.services import (
+    reel as services_reel,
+    render_cache as services_render_cache,
+)
+from tests.conftest import USER_ID
+
+
+def test_render_cache_key_ignores_param_order():
+    key = services_render_cache.render_cache_key({"a": 1, "b": "x"})
+    assert key == services_render_cache.render_cache_key({"b": "x", "a": 1})
+    assert key != services_render_cache.render_cache_key({"a": 2, "b": "x"})
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    handles = []
+    for name in ("movie", "audio", "music"):
+        path = tmp_path / name
+        path.write_bytes(name.encode())
+        handles.append(MediaHandle(str(path)))
+    return handles
+
+
+def _keys(movie, audio, music) -> tuple[str, str]:
+    params = services_reel._render_params(
+        ReelGenerator(), movie, audio, None, music, 0.2
+    )
+    return (
+        services_render_cache.render_cache_key(params),
+        services_reel._video_key(params),
+    )
+
+
+@pytest.mark.parametrize(
+    "name, value",
+    [("MUSIC_DUCKING_DB", -12.0), ("AUDIO_PREMIX_ENABLED", False)],
+)
+def test_mix_settings_change_the_reel_key_only(
+    inputs, monkeypatch, name, value
+):
+    key, video_key = _keys(*inputs)
+    monkeypatch.setattr(settings, name, value)
+    changed_key, changed_video_key = _keys(*inputs)
+    assert changed_key != key
+    assert changed_video_key == video_key
+
+
+def test_mix_settings_ignored_without_music(inputs, monkeypatch):
+    movie, audio, _ = inputs
+    key, _ = _keys(movie, audio, None)
+    monkeypatch.setattr(settings, "MUSIC_DUCKING_DB", -12.0)
+    assert _keys(movie, audio, None)[0] == key
+
+
+def test_lookup_counts_hits_and_misses(engine):
+    with Session(engine) as db:
+        db.add(
+            RenderCacheEntry(key="k", storage_path="s", file_path="f", size=1)
+        )
+        db.commit()
+        assert services_render_cache.lookup(db, "missing") is None
+        assert services_render_cache.lookup(db, "k").hits == 1
+        assert services_render_cache.lookup(db, "k").hits == 2
+        stats = services_render_cache.get_stats(db)
+        assert (stats.hits, stats.misses) == (2, 1)
+
+
+def test_counter_created_concurrently_is_incremented(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(
+            RenderCacheEntry(key="k", storage_path="s", file_path="f", size=1)
+        )
+        db.commit()
+
+    lock_counter = services_render_cache._lock_counter
+
+    def lose_race(db, name):
+        # Another process creates the counter between our read and insert.
+        monkeypatch.setattr(
+            services_render_cache, "_lock_counter", lock_counter
+        )
+        with Session(engine) as other:
+            other.add(RenderCacheCounter(name=name, value=1))
+            other.commit()
+        return None
+
+    monkeypatch.setattr(services_render_cache, "_lock_counter", lose_race)
+    with Session(engine) as db:
+        assert services_render_cache.lookup(db, "k").hits == 1
+    with Session(engine) as db:
+        assert db.exec(select(RenderCacheCounter.value)).all() == [2]
+    engine.dispose()
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorageBackend(str(tmp_path / "storage"), "http://storage")
+
+
+def _reel_file(tmp_path, size: int) -> str:
+    path = tmp_path / "reel.mp4"
+    path.write_bytes(b"r" * size)
+    return str(path)
+
+
+def test_store_skips_reels_larger_than_the_cache(
+    engine, storage, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(settings, "RENDER_CACHE_MAX_BYTES", 10)
+    with Session(engine) as db:
+        reel_path = _reel_file(tmp_path, 11)
+        assert services_render_cache.store(db, storage, "k", reel_path) is None
+        assert db.exec(select(RenderCacheEntry)).all() == []
+        assert storage.list_files() == []
+
+
+def test_new_entry_evicts_older_ones_after_the_copy(
+    engine, seed, storage, tmp_path, monkeypatch
+):
+    seed(1, reels_per_movie=0)
+    monkeypatch.setattr(settings, "RENDER_CACHE_MAX_BYTES", 10)
+    monkeypatch.setattr(settings, "HLS_ENABLED", False)
+    with Session(engine) as db:
+        db.add(
+            RenderCacheEntry(
+                key="old",
+                storage_path="render_cache/old.mp4",
+                file_path="f",
+                size=5,
+                last_used_at=datetime.utcnow() - timedelta(hours=1),
+            )
+        )
+        db.commit()
+
+        reel = services_reel._save_reel(
+            db,
+            storage,
+            ReelCreate(movie_id=1, audio_id=None, music_id=None),
+            "a",
+            USER_ID,
+            _reel_file(tmp_path, 8),
+            {"movie": "digest"},
+            None,
+        )
+        key = services_render_cache.render_cache_key({"movie": "digest"})
+        assert [entry.key for entry in db.exec(select(RenderCacheEntry))] == [
+            key
+        ]
+        assert storage.exists(f"reel_{reel.id}.mp4")
+        assert storage.exists(f"render_cache/{key}.mp4")
@@ -0,0 +1,177 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.db.models.job import Job
+from app.db.models.reel import Reel
+from app.models.jobs.job_kind import JobKind
+from app.models.jobs.job_status import JobStatus
+from app.schemas.reel import (
+    ReelBatchCreate,
+    ReelBatchResult,
+    ReelCreate,
+    ReelRead,
+)
+from app.services import (
+    jobs as services_jobs,
+    render_jobs as services_render_jobs,
+)
+from tests.conftest import USER_ID
+
+BATCH = ReelBatchCreate(
+    movie_id=1, variants=[{"audio_id": 1}, {"audio_id": 2}, {"audio_id": 3}]
+)
+
+
+def test_batch_is_queued_as_one_job(engine, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_BACKEND", services_jobs.QUEUE_BACKEND)
+    with Session(engine) as db:
+        read = services_render_jobs.submit_render_batch_job(
+            db, BATCH, "mp4", ["a", "a", "a"], USER_ID
+        )
+        job = db.get(Job, int(read.id))
+        assert job.kind == JobKind.RenderReelBatch.value
+        assert job.payload["batch"]["variants"][2]["audio_id"] == 3
+        assert services_render_jobs.get_render_job(db, read.id, USER_ID)
+        jobs = services_render_jobs.get_render_jobs_by_user(db, USER_ID)
+        assert [job.id for job in jobs] == [read.id]
+
+
+def test_run_render_batch_reports_each_variant(engine, monkeypatch):
+    def render_reel_batch(
+        db, storage, batch, movie_type, langs, user_id, job_key=None
+    ):
+        # Completion order, the second variant fails.
+        reel = Reel(movie_id=1, lang="a", author=USER_ID)
+        db.add(reel)
+        db.commit()
+        read = ReelRead.model_validate(reel)
+        yield ReelBatchResult(index=2, audio_id=3, reel=read)
+        yield ReelBatchResult(index=1, audio_id=2, error="boom")
+        yield ReelBatchResult(index=0, audio_id=1, reel=read)
+
+    monkeypatch.setattr(
+        services_render_jobs.services_reel,
+        "render_reel_batch",
+        render_reel_batch,
+    )
+    monkeypatch.setattr(services_render_jobs, "get_storage", lambda: None)
+    monkeypatch.setattr(settings, "JOB_BACKEND", services_jobs.QUEUE_BACKEND)
+    progress = []
+    with Session(engine) as db:
+        results = services_render_jobs.run_render_batch(
+            db, BATCH, "mp4", ["a"] * 3, USER_ID, progress.append
+        )
+        assert progress == [1 / 3, 2 / 3, 1]
+        assert [result["index"] for result in results] == [0, 1, 2]
+
+        job = services_jobs.enqueue_job(
+            db, JobKind.RenderReelBatch.value, {}, USER_ID
+        )
+        job.result = {"results": results}
+        db.commit()
+        read = services_render_jobs.get_render_job(db, str(job.id), USER_ID)
+        assert [result.error for result in read.results] == [None, "boom", None]
+        assert read.results[0].reel.id == results[0]["reel_id"]
+
+
+@pytest.fixture
+def local_pool(monkeypatch):
+    # Threads stand in for the spawned processes, the job bookkeeping
+    # around the pool is the same.
+    executor = ThreadPoolExecutor(max_workers=2)
+    progress = {}
+    monkeypatch.setattr(settings, "JOB_BACKEND", "local")
+    monkeypatch.setattr(services_render_jobs, "_jobs", {})
+    monkeypatch.setattr(services_render_jobs, "_get_executor", lambda: executor)
+    monkeypatch.setattr(services_render_jobs, "_get_progress", lambda: progress)
+    yield
+    executor.shutdown(cancel_futures=True)
+
+
+def _wait_until_finished(job_id: str):
+    job = services_render_jobs._jobs[job_id]
+    deadline = time.monotonic() + 5
+    while job.finished_at is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.finished_at is not None
+
+
+def test_pool_uses_spawned_workers(monkeypatch):
+    monkeypatch.setattr(settings, "RENDER_WORKERS", 3)
+    services_render_jobs._get_executor.cache_clear()
+    try:
+        executor = services_render_jobs._get_executor()
+        assert executor._mp_context.get_start_method() == "spawn"
+        assert executor._max_workers == 3
+    finally:
+        services_render_jobs.shutdown()
+        services_render_jobs._get_executor.cache_clear()
+
+
+def test_local_job_reports_progress_then_the_reel(
+    engine, seed, local_pool, monkeypatch
+):
+    seed(1, reels_per_movie=1)
+    started, release = threading.Event(), threading.Event()
+
+    def run_render_job(job_id, reel_info, movie_type, lang, user_id, progress):
+        progress[job_id] = 40.0
+        started.set()
+        release.wait(5)
+        return 1
+
+    monkeypatch.setattr(services_render_jobs, "_run_render_job", run_render_job)
+    reel_info = ReelCreate(movie_id=1, audio_id=None, music_id=None)
+    with Session(engine) as db:
+        read = services_render_jobs.submit_render_job(
+            db, reel_info, "mp4", "a", USER_ID
+        )
+        assert started.wait(5)
+        job = services_render_jobs.get_render_job(db, read.id, USER_ID)
+        assert (job.status, job.progress) == (JobStatus.Running, 40.0)
+        # Other users do not see the job.
+        assert services_render_jobs.get_render_job(db, read.id, 2) is None
+
+        release.set()
+        _wait_until_finished(read.id)
+        job = services_render_jobs.get_render_job(db, read.id, USER_ID)
+        assert (job.status, job.progress) == (JobStatus.Finished, 100.0)
+        assert job.reel.id == 1
+
+
+def test_full_local_queue_returns_503(engine, local_pool, monkeypatch):
+    release = threading.Event()
+
+    def run_render_job(job_id, reel_info, movie_type, lang, user_id, progress):
+        release.wait(5)
+        return None
+
+    monkeypatch.setattr(services_render_jobs, "_run_render_job", run_render_job)
+    monkeypatch.setattr(settings, "RENDER_QUEUE_LIMIT", 2)
+    reel_info = ReelCreate(movie_id=1, audio_id=None, music_id=None)
+    with Session(engine) as db:
+        submitted = [
+            services_render_jobs.submit_render_job(
+                db, reel_info, "mp4", "a", USER_ID
+            )
+            for _ in range(2)
+        ]
+        with pytest.raises(HTTPException) as error:
+            services_render_jobs.submit_render_job(
+                db, reel_info, "mp4", "a", USER_ID
+            )
+        assert error.value.status_code == 503
+
+        # Finished jobs no longer count against the limit.
+        release.set()
+        for read in submitted:
+            _wait_until_finished(read.id)
+        services_render_jobs.submit_render_job(
+            db, reel_info, "mp4", "a", USER_ID
+        )
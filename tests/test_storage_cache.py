@@ -0,0 +1,23 @@
+import os
+
+from app.core.storage.backends import LocalStorageBackend
+from app.core.storage.cache import CachedStorageBackend
+
+
+def test_eviction_keeps_fill_locks(tmp_path):
+    backend = LocalStorageBackend(str(tmp_path / "storage"), "http://storage")
+    backend.upload_file(b"a" * 10, "a.bin")
+    backend.upload_file(b"b" * 10, "b.bin")
+    cache = CachedStorageBackend(backend, str(tmp_path / "cache"), 15)
+
+    with cache.download_to("a.bin"):
+        pass
+    lock_path = os.path.join(cache._locks, f"{cache._name('a.bin')}.lock")
+    assert os.path.exists(lock_path)
+    with cache.download_to("b.bin"):
+        pass
+
+    assert cache.evictions == 1
+    # A process blocked on the old lock file and one opening the path anew
+    # must still exclude each other.
+    assert os.path.exists(lock_path)
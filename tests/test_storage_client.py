@@ -0,0 +1,76 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.storage.backends import SupabaseStorageBackend
+from app.core.storage.client import AsyncStorageClient
+
+
+def _client(handler) -> AsyncStorageClient:
+    client = AsyncStorageClient("bucket", "http://supabase", "key", 2, 5)
+    client._client = httpx.AsyncClient(
+        base_url=client.base_url, transport=httpx.MockTransport(handler)
+    )
+    return client
+
+
+def _head(handler, path: str = "a.mp4"):
+    return asyncio.run(_client(handler).head(path))
+
+
+def test_head_returns_headers():
+    headers = _head(lambda request: httpx.Response(200, headers={"etag": "x"}))
+    assert headers["etag"] == "x"
+
+
+@pytest.mark.parametrize("status", [400, 404])
+def test_head_missing_object(status):
+    assert _head(lambda request: httpx.Response(status)) is None
+
+
+def test_head_raises_server_errors():
+    with pytest.raises(httpx.HTTPStatusError):
+        _head(lambda request: httpx.Response(503))
+
+
+def test_head_raises_transport_errors():
+    def handler(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    with pytest.raises(httpx.ConnectError):
+        _head(handler)
+
+
+def _serve_signed(body: bytes):
+    def handler(request):
+        if request.method == "POST":
+            assert request.url.path == "/storage/v1/object/sign/bucket/a.mp4"
+            return httpx.Response(
+                200, json={"signedURL": "/object/sign/bucket/a.mp4?token=t"}
+            )
+        assert request.url.path == "/storage/v1/object/sign/bucket/a.mp4"
+        assert request.url.params["token"] == "t"
+        start, end = request.headers["range"].removeprefix("bytes=").split("-")
+        end = int(end) if end else len(body) - 1
+        return httpx.Response(206, content=body[int(start) : end + 1])
+
+    return handler
+
+
+def test_backend_streams_through_signed_url():
+    backend = SupabaseStorageBackend(
+        "bucket", "http://supabase", "header.payload.signature"
+    )
+    backend.async_client = _client(_serve_signed(b"0123456789"))
+    assert b"".join(backend.stream("a.mp4", 2, 5)) == b"2345"
+    assert b"".join(backend.stream("a.mp4", 7)) == b"789"
+
+
+def test_backend_stream_wraps_errors():
+    backend = SupabaseStorageBackend(
+        "bucket", "http://supabase", "header.payload.signature"
+    )
+    backend.async_client = _client(lambda request: httpx.Response(500))
+    with pytest.raises(Exception, match="a.mp4"):
+        list(backend.stream("a.mp4"))
@@ -0,0 +1,83 @@
+import pytest
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.storage.backends import LocalStorageBackend
+from app.db.models.movie import Movie
+from app.db.models.reel import Reel
+from app.db.models.storage_tombstone import StorageTombstone
+from app.services import storage_gc
+from tests.conftest import USER_ID
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorageBackend(str(tmp_path), "http://storage")
+
+
+def test_expand_lists_prefixes_and_keeps_referenced(storage):
+    for key in ("hls/1/master.m3u8", "hls/1/seg_0.m4s", "hls/2/master.m3u8"):
+        storage.upload_file(b"x", key)
+    batch = [
+        StorageTombstone(key="reels/1.mp4"),
+        StorageTombstone(key="reels/2.mp4"),
+        StorageTombstone(key="hls/1/"),
+        StorageTombstone(key="hls/2/"),
+    ]
+    keys, kept = storage_gc._expand(storage, batch, {"reels/2.mp4", "hls/2/"})
+    assert sorted(keys) == [
+        "hls/1/master.m3u8",
+        "hls/1/seg_0.m4s",
+        "reels/1.mp4",
+    ]
+    assert kept == 2
+
+
+def test_collect_keeps_objects_written_again(engine, storage):
+    for key in ("a.mp4", "b.mp4", "hls/1/master.m3u8", "hls/2/master.m3u8"):
+        storage.upload_file(b"x", key)
+    with Session(engine) as db:
+        movie = Movie(
+            title="movie",
+            author=USER_ID,
+            type="mp4",
+            file_path=storage.public_url("b.mp4"),
+        )
+        db.add(movie)
+        db.flush()
+        db.add(
+            Reel(
+                movie_id=movie.id,
+                lang="a",
+                author=USER_ID,
+                playlist_path=storage.public_url("hls/2/master.m3u8"),
+            )
+        )
+        storage_gc.tombstone(db, ["a.mp4", "b.mp4", "hls/1/", "hls/2/"])
+        db.commit()
+
+        result = storage_gc.collect(db, storage)
+
+        assert (result.removed, result.kept, result.failed) == (2, 2, 0)
+        assert not storage.exists("a.mp4")
+        assert not storage.exists("hls/1/master.m3u8")
+        assert storage.exists("b.mp4")
+        assert storage.exists("hls/2/master.m3u8")
+        assert db.exec(select(StorageTombstone)).all() == []
+
+
+def test_collect_gives_up_after_max_attempts(engine, storage, monkeypatch):
+    def fail(keys):
+        raise OSError("storage down")
+
+    monkeypatch.setattr(storage, "delete_files", fail)
+    with Session(engine) as db:
+        storage_gc.tombstone(db, ["a.mp4"])
+        db.commit()
+        for _ in range(settings.STORAGE_GC_MAX_ATTEMPTS):
+            assert storage_gc.collect(db, storage).failed == 1
+        # An exhausted tombstone is no longer picked up.
+        assert storage_gc.collect(db, storage).failed == 0
+        entry = db.get(StorageTombstone, "a.mp4")
+        assert entry.attempts == settings.STORAGE_GC_MAX_ATTEMPTS
+        assert entry.error == "OSError: storage down"
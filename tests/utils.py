@@ -0,0 +1,28 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from sqlalchemy import Engine, event
+
+
+@contextmanager
+def count_queries(engine: Engine) -> Iterator[list[str]]:
+    # Collects every statement sent to the database inside the block.
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+@contextmanager
+def assert_num_queries(engine: Engine, expected: int) -> Iterator[None]:
+    with count_queries(engine) as statements:
+        yield
+    queries = "\n".join(statements)
+    message = f"Expected {expected} queries, got {len(statements)}:\n{queries}"
+    assert len(statements) == expected, message